@@ -0,0 +1,174 @@
+# ab_testing.py
+"""
+A/B-Routing und Shadow-Evaluation von Modell-Versionen.
+
+Ist in der Registry ein Kandidat gesetzt (python model_registry.py candidate
+v0003 0.1), bekommt ein fester Anteil der User dessen Vorhersagen. Das
+jeweils andere Modell läuft im Schatten auf denselben skalierten Features
+mit, das kostet nur ein zusätzliches Matrix-Vektor-Produkt.
+
+Beide Vorhersagen und später das Feedback-Rating landen als Records fester
+Länge in einem Append-only-Log, das evaluate() auswertet.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from plan_model import TARGETS
+
+AB_LOG_PATH = os.path.join('logs', 'ab_log.bin')
+
+ARM_ACTIVE = 0
+ARM_CANDIDATE = 1
+
+KIND_PREDICTION = 0
+KIND_FEEDBACK = 1
+
+# 66 Bytes pro Record, Vorhersagen in der Reihenfolge von plan_model.TARGETS
+AB_RECORD = np.dtype([
+    ('kind', 'u1'),
+    ('arm', 'u1'),
+    ('active', 'u2'),
+    ('candidate', 'u2'),
+    ('timestamp', 'f8'),
+    ('request_id', 'u8'),
+    ('user', 'u8'),
+    ('served', 'f4', (len(TARGETS),)),
+    ('shadow', 'f4', (len(TARGETS),)),
+    ('rating', 'f4')
+])
+
+
+def version_number(version) -> int:
+    """'v0003' → 3, legacy/None → 0 (passt in das u2-Feld des Records)."""
+    if not version or not version.startswith('v'):
+        return 0
+    return int(version[1:])
+
+
+def user_hash(user_id, salt='') -> int:
+    """Stabiler 64-bit Hash, damit ein User immer im selben Arm landet."""
+    digest = hashlib.blake2b(f"{salt}:{user_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class ABRouter:
+    """Verteilt Requests auf aktive und Kandidaten-Version und schreibt das Log."""
+
+    def __init__(self, log_path=AB_LOG_PATH):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def assign_arm(self, user_id, candidate_version, fraction: float) -> int:
+        if candidate_version is None or fraction <= 0:
+            return ARM_ACTIVE
+        # Salt = Kandidat, damit jeder neue Test die User neu mischt
+        bucket = user_hash(user_id, candidate_version) / 2 ** 64
+        return ARM_CANDIDATE if bucket < fraction else ARM_ACTIVE
+
+    def predict(self, active, candidate, fraction, user_id, features, cluster=None):
+        """
+        Liefert (ausgelieferte Version, Intervalle, request_id).
+
+        active/candidate sind LoadedModel-Objekte aus der Registry,
+        candidate darf None sein.
+        """
+        arm = self.assign_arm(user_id, candidate.version if candidate else None, fraction)
+        served, shadow = (candidate, active) if arm == ARM_CANDIDATE else (active, candidate)
+
+        intervals = served.predictor.predict_interval(features, cluster)
+        served_values = [intervals[target][0] for target in TARGETS]
+
+        shadow_values = np.full(len(TARGETS), np.nan)
+        if shadow is not None:
+            if shadow.predictor.same_scaling(served.predictor):
+                scaled = served.predictor.scale_features(features)
+            else:
+                scaled = shadow.predictor.scale_features(features)
+            shadow_values = shadow.predictor.predict_scaled(scaled, cluster)
+
+        request_id = int.from_bytes(os.urandom(8), 'little')
+        record = np.zeros(1, dtype=AB_RECORD)
+        record['kind'] = KIND_PREDICTION
+        record['arm'] = arm
+        record['active'] = version_number(active.version)
+        record['candidate'] = version_number(candidate.version) if candidate else 0
+        record['timestamp'] = time.time()
+        record['request_id'] = request_id
+        record['user'] = user_hash(user_id)
+        record['served'] = served_values
+        record['shadow'] = shadow_values
+        record['rating'] = np.nan
+        self._append(record)
+        return served, intervals, request_id
+
+    def log_feedback(self, request_id, rating: float):
+        """Hängt das Feedback-Rating zu einer früheren Vorhersage an."""
+        record = np.zeros(1, dtype=AB_RECORD)
+        record['kind'] = KIND_FEEDBACK
+        record['timestamp'] = time.time()
+        record['request_id'] = request_id
+        record['served'] = np.nan
+        record['shadow'] = np.nan
+        record['rating'] = rating
+        self._append(record)
+
+    def _append(self, record: np.ndarray):
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+                self._file = open(self.log_path, 'ab')
+            self._file.write(record.tobytes())
+            self._file.flush()
+
+
+def read_log(log_path=AB_LOG_PATH) -> np.ndarray:
+    if not os.path.exists(log_path):
+        return np.zeros(0, dtype=AB_RECORD)
+    return np.fromfile(log_path, dtype=AB_RECORD)
+
+
+def evaluate(log_path=AB_LOG_PATH) -> pd.DataFrame:
+    """
+    Wertet das Log pro Experiment (aktive × Kandidaten-Version) und Arm aus:
+    Anzahl Pläne, Feedback-Quote, Ø Rating und Ø Abweichung zum Schatten-Modell.
+    """
+    log = read_log(log_path)
+    predictions = log[log['kind'] == KIND_PREDICTION]
+    feedback = log[log['kind'] == KIND_FEEDBACK]
+    if len(predictions) == 0:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame({
+        'active': predictions['active'],
+        'candidate': predictions['candidate'],
+        'arm': np.where(predictions['arm'] == ARM_CANDIDATE, 'candidate', 'active'),
+        'request_id': predictions['request_id']
+    })
+    for t, target in enumerate(TARGETS):
+        frame[f'diff_{target}'] = np.abs(predictions['served'][:, t] - predictions['shadow'][:, t])
+
+    ratings = pd.DataFrame({'request_id': feedback['request_id'], 'rating': feedback['rating']})
+    ratings = ratings.drop_duplicates('request_id', keep='last')
+    frame = frame.merge(ratings, on='request_id', how='left')
+
+    summary = frame.groupby(['active', 'candidate', 'arm']).agg(
+        plans=('request_id', 'size'),
+        feedback=('rating', 'count'),
+        avg_rating=('rating', 'mean'),
+        **{f'Ø |Δ| {target}': (f'diff_{target}', 'mean') for target in TARGETS}
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    summary = evaluate()
+    if summary.empty:
+        print("Noch keine Einträge im A/B-Log.")
+    else:
+        print(summary.round(2).to_string())
@@ -0,0 +1,337 @@
+# anki_parser.py
+"""
+Auslesen von Anki-Statistik-PDFs (ohne Streamlit, damit auch Worker-Threads
+und Skripte den Parser importieren können).
+
+Der Parser läuft in einem Durchgang über den Text: ein vorkompiliertes
+Muster aus allen Sprachpaketen (LocalePack, aktuell Deutsch und Englisch)
+liefert Abschnittsüberschriften und Kennzahl-Zeilen als Tokens. Neue
+Sprachen brauchen nur ein weiteres LocalePack in LOCALE_PACKS.
+"""
+import re
+from dataclasses import dataclass
+
+import pdfplumber
+
+
+class ParsingCancelled(Exception):
+    """Die Verarbeitung wurde über das Cancel-Event abgebrochen."""
+
+
+def extract_text_from_pdf(file, on_page=None, cancel_event=None) -> str:
+    """
+    Text aller Seiten. on_page(pages_done, pages_total) wird nach jeder Seite
+    aufgerufen; ist cancel_event gesetzt, wird vor der nächsten Seite abgebrochen.
+    """
+    pages_text = []
+    with pdfplumber.open(file) as pdf:
+        pages_total = len(pdf.pages)
+        for i, page in enumerate(pdf.pages):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ParsingCancelled()
+            pages_text.append(page.extract_text() or "")
+            page.flush_cache()
+            if on_page is not None:
+                on_page(i + 1, pages_total)
+    return "\n".join(pages_text)
+
+
+@dataclass(frozen=True)
+class LocalePack:
+    """
+    Beschriftungen einer Anki-Sprache. Die Muster enthalten {num} als
+    Platzhalter für eine Zahl (mit Tausendertrennern).
+    """
+    name: str
+    decimal: str
+    sections: dict
+    total: str
+    days: str
+    average: str
+    correct: str
+
+
+GERMAN = LocalePack(
+    name='de',
+    decimal=',',
+    sections={
+        'Heute': 'today', 'Fällig': 'future', 'Zukünftig fällig': 'future', 'Kalender': 'calendar',
+        'Wiederholungen': 'reviews', 'Kartenzählung': 'counts', 'Kartenintervalle': 'intervals',
+        'Stündliche Aufschlüsselung': 'hourly', 'Antwortknöpfe': 'answers', 'Antworttasten': 'answers'
+    },
+    total=r"Insgesamt:\s*({num})\s*Wiederholungen",
+    days=r"Lerntage:\s*({num})\s*von\s*({num})",
+    average=r"Durchschnitt[^:\n]*:\s*({num})\s*Wiederholungen/Tag",
+    correct=r"Korrekt:\s*({num})\s*/\s*({num})"
+)
+
+ENGLISH = LocalePack(
+    name='en',
+    decimal='.',
+    sections={
+        'Today': 'today', 'Future Due': 'future', 'Calendar': 'calendar', 'Reviews': 'reviews',
+        'Card Counts': 'counts', 'Review Intervals': 'intervals', 'Hourly Breakdown': 'hourly',
+        'Answer Buttons': 'answers'
+    },
+    total=r"Total:\s*({num})\s*reviews",
+    days=r"Days studied:\s*({num})\s*of\s*({num})",
+    average=r"Average[^:\n]*:\s*({num})\s*reviews/day",
+    correct=r"Correct:\s*({num})\s*/\s*({num})"
+)
+
+LOCALE_PACKS = (GERMAN, ENGLISH)
+
+# Zahl mit optionalen Tausendertrennern (Punkt, Komma, (schmale) Leerzeichen)
+NUMBER = r"\d(?:[\d.,\u00a0\u202f ]*\d)?"
+FIELDS = ('total', 'days', 'average', 'correct')
+
+
+def build_scanner(packs=LOCALE_PACKS):
+    """
+    Ein einziges vorkompiliertes Muster für alle Sprachen. Jede Alternative
+    beginnt mit einem festen Wort, so kann die Regex-Engine Positionen ohne
+    passenden Anfangsbuchstaben überspringen. Die Zahlen stehen in benannten
+    Gruppen <sprache>_<feld>_<i>; Überschriften haben keine Gruppe und
+    müssen allein auf ihrer Zeile stehen.
+    """
+    alternatives = []
+    headers = {}
+    for pack in packs:
+        headers.update(pack.sections)
+        for field_name in FIELDS:
+            pattern = getattr(pack, field_name)
+            for i in range(pattern.count('{num}')):
+                pattern = pattern.replace('({num})', f'(?P<{pack.name}_{field_name}_{i}>{NUMBER})', 1)
+            alternatives.append(pattern)
+    # Längere Überschriften zuerst ("Zukünftig fällig" vor "Fällig")
+    alternatives += [re.escape(header) + r'[ \t]*$' for header in sorted(headers, key=len, reverse=True)]
+    return re.compile('|'.join(alternatives), re.MULTILINE), headers, {pack.name: pack for pack in packs}
+
+
+SCANNER, SECTION_HEADERS, PACKS_BY_NAME = build_scanner()
+PERCENT = re.compile(r"(\d+[.,]\d+)\s*%")
+
+
+def _to_int(num_str: str) -> int:
+    digits_only = re.sub(r"[^\d]", "", num_str)
+    return int(digits_only) if digits_only else 0
+
+
+def _to_float(num_str: str, decimal: str) -> float:
+    thousands = '.' if decimal == ',' else ','
+    cleaned = re.sub(r"[\s\u00a0\u202f]", "", num_str).replace(thousands, "")
+    return float(cleaned.replace(decimal, "."))
+
+
+def extract_features_from_text(text: str) -> dict:
+    """
+    Extrahiert die Kennzahlen in einem Durchlauf über den Text.
+
+    Werte aus dem passenden Abschnitt (Wiederholungen bzw. Antwortknöpfe)
+    haben Vorrang; nur wenn dort nichts steht, greifen die Treffer aus dem
+    restlichen Dokument.
+    """
+    section = None
+    found = {field_name: ([], []) for field_name in FIELDS}  # (im Abschnitt, sonstwo)
+    anchors = {'total': 'reviews', 'days': 'reviews', 'average': 'reviews', 'correct': 'answers'}
+
+    for match in SCANNER.finditer(text):
+        if match.lastgroup is None:
+            # Überschrift nur am Zeilenanfang (sonst z.B. "... 12 Reviews")
+            line_start = text.rfind('\n', 0, match.start()) + 1
+            if not text[line_start:match.start()].strip():
+                section = SECTION_HEADERS[match.group().strip()]
+            continue
+        locale, field_name, _ = match.lastgroup.split('_')
+        values = [match.group(f'{locale}_{field_name}_{i}') for i in range(2 if field_name in ('days', 'correct') else 1)]
+        in_section, elsewhere = found[field_name]
+        (in_section if section == anchors[field_name] else elsewhere).append((PACKS_BY_NAME[locale], values))
+
+    def hits(field_name):
+        in_section, elsewhere = found[field_name]
+        return in_section or elsewhere
+
+    # 1) Gesamtzahl der Wiederholungen
+    if not hits('total'):
+        raise ValueError("Konnte die Gesamtzahl der Wiederholungen ('Insgesamt: ... Wiederholungen') nicht finden.")
+    total_reviews = max(_to_int(values[0]) for _, values in hits('total'))
+
+    # 2) Lerntage / Zeitraum
+    if hits('days'):
+        _, (active, period) = hits('days')[0]
+        days_active, days_total = _to_int(active), _to_int(period)
+    elif hits('average'):
+        pack, (average,) = hits('average')[0]
+        avg_per_day = _to_float(average, pack.decimal)
+        # Schätzung des Zeitraums, wir nehmen an, dass an fast allen Tagen gelernt wurde
+        days_total = int(round(total_reviews / avg_per_day)) if avg_per_day > 0 else 1
+        days_active = days_total
+    else:
+        days_total = days_active = 1
+
+    # 3) Erinnerungsquote: richtige / alle Antworten aus den Antwortknöpfen
+    correct = sum(_to_int(values[0]) for _, values in hits('correct'))
+    answered = sum(_to_int(values[1]) for _, values in hits('correct'))
+    percents = [] if answered > 0 else [float(p.replace(',', '.')) for p in PERCENT.findall(text)]
+    if answered > 0:
+        accuracy = correct / answered
+    elif percents:
+        # Fallback wie bisher (eigener Scan): größter plausibler Prozentwert
+        candidates = [v for v in percents if 50.0 <= v <= 100.0]
+        accuracy = (max(candidates) if candidates else max(percents)) / 100.0
+    else:
+        raise ValueError("Konnte keine Erinnerungsquote (Korrekt-Zeile oder Prozentwerte) finden.")
+
+    return derive_features(total_reviews, days_active, days_total, accuracy)
+
+
+def derive_features(total_reviews, days_active, days_total, accuracy) -> dict:
+    """Abgeleitete Kennzahlen für clusters.assign_cluster_from_features."""
+    return {
+        "total_reviews": total_reviews,
+        "days_active": days_active,
+        "days_total": days_total,
+        "learning_days_ratio": days_active / days_total if days_total > 0 else 0.0,
+        "reviews_per_learning_day": total_reviews / days_active if days_active > 0 else 0.0,
+        "daily_reviews": total_reviews / days_total if days_total > 0 else 0.0,
+        "accuracy": accuracy,
+    }
+
+
+def extract_features_legacy(text: str) -> dict:
+    """Bisheriger Parser (mehrere Regex-Scans, nur Deutsch); Referenz für den Benchmark."""
+
+    # Helper: alles außer Ziffern entfernen
+    def to_int(num_str: str) -> int:
+        digits_only = re.sub(r"[^\d]", "", num_str)
+        return int(digits_only) if digits_only else 0
+
+    # 1) Gesamtzahl der Wiederholungen
+    matches_total = re.findall(r"Insgesamt:\s*([\d\s\.,]+)\s*Wiederholungen", text)
+    if not matches_total:
+        raise ValueError("Konnte 'Insgesamt: ... Wiederholungen' nicht im PDF finden.")
+    total_reviews = max(to_int(m) for m in matches_total)
+
+    # 2) Lerntage / Zeitraum
+    days_active = None
+    days_total = None
+
+    # Variante 1: klassische Zeile "Lerntage: X von Y"
+    m_days = re.search(r"Lerntage:\s*([\d\s\.,]+)\s*von\s*([\d\s\.,]+)", text)
+    if m_days:
+        days_active = to_int(m_days.group(1))
+        days_total = to_int(m_days.group(2))
+    else:
+        # Variante 2: nur Durchschnitt vorhanden → "Durchschnitt: 4 Wiederholungen/Tag"
+        m_avg = re.search(r"Durchschnitt:\s*([\d\s\.,]+)\s*Wiederholungen/Tag", text)
+        if m_avg:
+            avg_per_day = float(m_avg.group(1).replace(",", "."))
+            # Schätzung des Zeitraums
+            days_total = int(round(total_reviews / avg_per_day)) if avg_per_day > 0 else 1
+            days_active = days_total  # wir nehmen an, dass an fast allen Tagen gelernt wurde
+        else:
+            # Minimal-Fallback, falls alles fehlt
+            days_total = 1
+            days_active = 1
+
+    # 3) Erinnerungsquote (Accuracy) – universell aus allen Prozentzahlen
+    pct_matches = re.findall(r"(\d+,\d+)\s*%", text)
+    if not pct_matches:
+        raise ValueError("Konnte keine Prozentwerte (Erinnerungsquote) im PDF finden.")
+
+    values = [float(p.replace(",", ".")) for p in pct_matches]
+    candidates = [v for v in values if 50.0 <= v <= 100.0]
+    if candidates:
+        accuracy_pct = max(candidates)
+    else:
+        accuracy_pct = max(values)
+    accuracy = accuracy_pct / 100.0
+
+    # 4) Abgeleitete Kennzahlen
+    learning_days_ratio = days_active / days_total if days_total > 0 else 0.0
+    reviews_per_learning_day = total_reviews / days_active if days_active > 0 else 0.0
+    daily_reviews = total_reviews / days_total if days_total > 0 else 0.0
+
+    return {
+        "total_reviews": total_reviews,
+        "days_active": days_active,
+        "days_total": days_total,
+        "learning_days_ratio": learning_days_ratio,
+        "reviews_per_learning_day": reviews_per_learning_day,
+        "daily_reviews": daily_reviews,
+        "accuracy": accuracy,
+    }
+
+
+def extract_features_from_anki_pdf(file, on_page=None, cancel_event=None) -> dict:
+    """Liest eine Anki-Statistik-PDF und extrahiert Kennzahlen."""
+    return extract_features_from_text(extract_text_from_pdf(file, on_page, cancel_event))
+
+
+def sample_statistics_text(rng, locale='de', filler_lines=200) -> tuple:
+    """Synthetischer Text einer Anki-Statistikseite plus erwartete Kennzahlen (für Benchmark und Prüfung)."""
+    total = int(rng.integers(500, 80000))
+    period = int(rng.integers(30, 366))
+    active = int(rng.integers(1, period + 1))
+    answered = [int(rng.integers(50, 20000)) for _ in range(3)]
+    correct = [int(a * rng.uniform(0.6, 0.98)) for a in answered]
+    if locale == 'de':
+        fmt = lambda n: f"{n:,}".replace(',', '.')
+        dec = lambda x: f"{x:.1f}".replace('.', ',')
+        lines = ["Heute", "Heute 45 Karten in 12 Minuten gelernt (16,0 s/Karte)", "Zukünftig fällig",
+                 f"Insgesamt: {fmt(total // 3)} Wiederholungen", "Wiederholungen",
+                 f"Lerntage: {active} von {period} ({100 * active // period}%)",
+                 f"Insgesamt: {fmt(total)} Wiederholungen",
+                 f"Durchschnitt für Lerntage: {dec(total / active)} Wiederholungen/Tag",
+                 "Antwortknöpfe"]
+        lines += [f"Korrekt: {fmt(c)}/{fmt(a)} ({dec(100 * c / a)} %)" for c, a in zip(correct, answered)]
+        filler = "Lernen {i} Karten, Fälligkeit in {j} Tagen, Anteil {k},{l} %"
+    else:
+        fmt = lambda n: f"{n:,}"
+        lines = ["Today", "Studied 45 cards in 12 minutes today (16.0s/card)", "Future Due",
+                 f"Total: {fmt(total // 3)} reviews", "Reviews",
+                 f"Days studied: {active} of {period} ({100 * active // period}%)",
+                 f"Total: {fmt(total)} reviews",
+                 f"Average for days studied: {total / active:.1f} reviews/day",
+                 "Answer Buttons"]
+        lines += [f"Correct: {fmt(c)}/{fmt(a)} ({100 * c / a:.1f}%)" for c, a in zip(correct, answered)]
+        filler = "Learning {i} cards, due in {j} days, share {k}.{l}%"
+    lines += [filler.format(i=i, j=i % 30, k=i % 50, l=i % 10) for i in range(filler_lines)]
+    expected = derive_features(total, active, period, sum(correct) / sum(answered))
+    return "\n".join(lines), expected
+
+
+if __name__ == "__main__":
+    import time
+
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    corpus = {locale: [sample_statistics_text(rng, locale) for _ in range(300)] for locale in ('de', 'en')}
+    print("📄 Benchmark Anki-Parser (300 Texte je Sprache)")
+
+    # Single-Pass-Parser gegen die erzeugten Sollwerte prüfen
+    for locale, samples in corpus.items():
+        for text, expected in samples:
+            parsed = extract_features_from_text(text)
+            assert parsed.keys() == expected.keys()
+            for key, value in expected.items():
+                assert np.isclose(parsed[key], value), f"{locale} {key}: {parsed[key]} != {value}"
+    print("   ✅ Kennzahlen stimmen mit den Sollwerten überein")
+
+    for locale, samples in corpus.items():
+        texts = [text for text, _ in samples]
+        megabytes = sum(len(t.encode()) for t in texts) / 1e6
+        for name, parser in (('Single-Pass', extract_features_from_text), ('Legacy', extract_features_legacy)):
+            parsed = 0
+            start = time.perf_counter()
+            for _ in range(5):
+                for text in texts:
+                    try:
+                        parser(text)
+                        parsed += 1
+                    except ValueError:
+                        pass
+            elapsed = time.perf_counter() - start
+            print(f"   {locale} {name:<12} {5 * megabytes / elapsed:6.1f} MB/s  "
+                  f"{5 * len(texts) / elapsed:8.0f} Texte/s  erkannt: {parsed / 5:.0f}/{len(texts)}")
@@ -1,10 +1,33 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import pickle
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
+import hmac
+import os
 import time
+import uuid
+
+from ab_testing import ABRouter
+from anki_pdf_import import show_anki_import
+from chart_downsampling import ZOOM_LEVELS, rating_series
+from clusters import CLUSTERS, ClusterKey, assign_cluster_from_history
+from cohort_analytics import CohortAnalytics, CohortWriter
+from drift_monitor import DriftMonitor, expected_rating
+from history_aggregates import load_aggregates, save_aggregates
+from history_store import FEEDBACK_REASONS, append_entry, append_history, load_history, make_entry, valid_user_id
+from history_table import PAGE_SIZES, SORT_COLUMNS, HistoryIndex, page_count
+from model_registry import ModelRegistry
+from plan_model import (
+    TARGET_UNITS, best_slot, build_feature_vector, contribution_tips, explain_prediction, low_confidence_targets,
+    what_if_grid
+)
+from reminder_scheduler import JournalLocked, JsonlSink, MemorySink, ReminderScheduler
+from schedule_solver import solve_schedule
+from study_planner import StudyPlanner, UserProfile
+from timer_log import (
+    COMPLETE, PAUSE, RESET, RESUME, SKIP, START, STOP, TimerLog, block_metrics, focus_summary, session_metrics
+)
 
 # Seiten-Konfiguration
 st.set_page_config(
@@ -13,27 +36,98 @@ st.set_page_config(
     layout="wide"
 )
 
+TIME_OF_DAY_LABELS = {
+    'morning': '🌅 Morgen (6-12 Uhr)',
+    'afternoon': '☀️ Nachmittag (12-18 Uhr)',
+    'evening': '🌆 Abend (18-22 Uhr)',
+    'night': '🌙 Nacht (22-6 Uhr)'
+}
+
 # Modelle laden
 @st.cache_resource
-def load_models():
-    """Lädt die trainierten ML-Modelle"""
+def load_registry():
+    """Modell-Registry einmal pro Server-Prozess; neue Versionen werden im laufenden Betrieb übernommen"""
     try:
-        with open('learning_models.pkl', 'rb') as f:
-            models = pickle.load(f)
-        return models
+        return ModelRegistry()
     except FileNotFoundError:
         st.error("⚠️ Modell-Datei nicht gefunden! Bitte führe zuerst `train_model.py` aus.")
         return None
 
-# Initialisierung
-if 'models' not in st.session_state:
-    st.session_state.models = load_models()
+@st.cache_resource
+def load_study_planner(version, _predictor):
+    """Mehrtages-Planer mit gemeinsamem Vorhersage-Cache pro Modell-Version"""
+    return StudyPlanner(_predictor)
+
+@st.cache_resource
+def load_ab_router():
+    """A/B-Routing mit gemeinsamem Append-only-Log für alle Sessions"""
+    return ABRouter()
+
+@st.cache_resource
+def load_drift_monitor():
+    """Serverweite Drift-Statistiken (Residuen von Vorhersage vs. Feedback)"""
+    return DriftMonitor()
+
+@st.cache_resource
+def load_reminder_inbox():
+    """Zugestellte Erinnerungen pro User, bis die App sie anzeigt"""
+    return MemorySink()
+
+@st.cache_resource
+def load_reminder_scheduler():
+    """Erinnerungs-Scheduler mit Journal; der Thread schläft bis zur nächsten fälligen Erinnerung.
+    None, wenn `reminder_scheduler.py run` das Journal schon besitzt (es darf nur einer zustellen)."""
+    try:
+        return ReminderScheduler(sinks=[load_reminder_inbox(), JsonlSink()]).start()
+    except JournalLocked:
+        return None
+
+@st.cache_resource
+def load_cohort_analytics():
+    """Kohorten-Zusammenfassungen pro Tages-Partition, werden inkrementell aufgefrischt"""
+    return CohortAnalytics()
+
+@st.cache_resource
+def load_cohort_writer():
+    """Gepufferte Schreibzugriffe auf den Kohorten-Store (ab 256 Sessions oder alle 30 s)"""
+    return CohortWriter()
 
+@st.cache_resource
+def load_timer_log():
+    """Gepuffertes Timer-Event-Log, wird gesammelt im Hintergrund geschrieben"""
+    return TimerLog()
+
+@st.cache_data(max_entries=256)
+def load_rating_chart(user_id, history_version, zoom, _history):
+    """Downgesampelter Rating-Verlauf; history_version = Anzahl Sessions"""
+    return rating_series(_history, zoom)
+
+@st.cache_resource(max_entries=64)
+def load_history_index(user_id, history_version, _history):
+    """Sortier-Index der Historie, einmal pro Historien-Version"""
+    return HistoryIndex(_history)
+
+# Initialisierung (aktive Version bei jedem Rerun prüfen, kostet nur ein os.stat)
+registry = load_registry()
+active_model = registry.current() if registry is not None else None
+st.session_state.models = active_model.models if active_model is not None else None
+st.session_state.predictor = active_model.predictor if active_model is not None else None
+
+# Stabile User-ID (per ?user=... wiedererkennbar), u.a. für das A/B-Routing.
+# Sie landet in Dateipfaden und Journalen, daher ungültige Werte durch eine neue ID ersetzen.
+if 'user_id' not in st.session_state:
+    requested_user = st.query_params.get('user')
+    st.session_state.user_id = requested_user if valid_user_id(requested_user) else uuid.uuid4().hex
+# In die URL schreiben: mit demselben Link kommen Historie und Erinnerungen beim nächsten Besuch wieder an
+if st.query_params.get('user') != st.session_state.user_id:
+    st.query_params['user'] = st.session_state.user_id
+
+# Historie im kompakten Schema (siehe history_store.py), pro User gespeichert
 if 'user_history' not in st.session_state:
-    st.session_state.user_history = pd.DataFrame(columns=[
-        'timestamp', 'total_duration', 'time_of_day', 'concentration_baseline',
-        'days_since_last', 'previous_rating', 'actual_rating', 'feedback'
-    ])
+    st.session_state.user_history = load_history(st.session_state.user_id)
+# Inkrementell gepflegte Kennzahlen für das Statistik-Dashboard
+if 'user_aggregates' not in st.session_state:
+    st.session_state.user_aggregates = load_aggregates(st.session_state.user_id, st.session_state.user_history)
 
 # Timer State
 if 'timer_running' not in st.session_state:
@@ -51,6 +145,11 @@ if 'show_celebration' not in st.session_state:
 if 'remaining_at_pause' not in st.session_state:
     st.session_state.remaining_at_pause = 0
 
+# Fällige Erinnerungen an die nächste Session (reminder_scheduler.py) beim nächsten Rerun anzeigen
+load_reminder_scheduler()
+for reminder in load_reminder_inbox().pop(st.session_state.user_id):
+    st.toast(reminder.message, icon="⏰")
+
 # Prüfen ob Modelle geladen wurden
 if st.session_state.models is None:
     st.stop()
@@ -59,12 +158,18 @@ if st.session_state.models is None:
 st.title("AI-gestützter Lernplan Generator")
 st.markdown("Erstelle optimierte Lernpläne basierend auf deinem Lernverhalten und KI-Vorhersagen")
 
+# Kohorten-Ansicht nur mit ?admin=<LERNPLAN_ADMIN_TOKEN>; ohne konfigurierten Token gar nicht
+admin_token = os.environ.get('LERNPLAN_ADMIN_TOKEN')
+show_admin = bool(admin_token) and hmac.compare_digest(
+    st.query_params.get('admin', '').encode(), admin_token.encode()
+)
+
 # Navigation über Sidebar
 with st.sidebar:
     st.markdown("### Navigation")
     view_mode = st.radio(
         "Welche Ansicht möchtest du sehen?",
-        options=["Startseite", "Lernplan", "Statistiken"],
+        options=["Startseite", "Lernplan", "Statistiken", "Anki-Import"] + (["Kohorten"] if show_admin else []),
         index=0,
         key="view_mode"
     )
@@ -87,12 +192,7 @@ if view_mode == "Lernplan":
     time_of_day = st.sidebar.selectbox(
         "Zu welcher Tageszeit lernst du?",
         options=['morning', 'afternoon', 'evening', 'night'],
-        format_func=lambda x: {
-            'morning': '🌅 Morgen (6-12 Uhr)',
-            'afternoon': '☀️ Nachmittag (12-18 Uhr)',
-            'evening': '🌆 Abend (18-22 Uhr)',
-            'night': '🌙 Nacht (22-6 Uhr)'
-        }[x]
+        format_func=lambda x: TIME_OF_DAY_LABELS[x]
     )
 
     # Input: Konzentrationslevel
@@ -131,6 +231,19 @@ if view_mode == "Lernplan":
             step=0.5
         )
 
+    # Input: Lerntyp (aus Anki-Import oder bisheriger Historie)
+    detected_cluster = st.session_state.get('anki_cluster') or assign_cluster_from_history(st.session_state.user_history)
+    cluster_choice = st.sidebar.selectbox(
+        "Welcher Lerntyp bist du?",
+        options=['auto'] + [key.value for key in ClusterKey],
+        format_func=lambda x: (
+            f"🤖 Automatisch ({CLUSTERS[detected_cluster].name if detected_cluster else 'unbekannt'})"
+            if x == 'auto' else CLUSTERS[ClusterKey(x)].name
+        ),
+        help="Automatisch nutzt deinen Anki-Import oder deine bisherigen Sessions"
+    )
+    cluster = detected_cluster if cluster_choice == 'auto' else ClusterKey(cluster_choice)
+
     # Button: Lernplan generieren
     generate_plan = st.sidebar.button("🚀 Lernplan generieren", type="primary")
 else:
@@ -140,58 +253,40 @@ else:
     concentration = None
     days_since = None
     previous_rating = None
+    cluster = None
     generate_plan = False
 
 if view_mode == "Lernplan" and generate_plan:
     
     # Features vorbereiten
-    features = pd.DataFrame([{
-        'total_session_duration': total_duration,
-        'time_morning': 1 if time_of_day == 'morning' else 0,
-        'time_afternoon': 1 if time_of_day == 'afternoon' else 0,
-        'time_evening': 1 if time_of_day == 'evening' else 0,
-        'time_night': 1 if time_of_day == 'night' else 0,
-        'concentration_baseline': concentration,
-        'days_since_last_session': days_since,
-        'previous_session_rating': previous_rating
-    }])
-    
-    # Skalieren
-    models = st.session_state.models
-    features_scaled = models['scaler'].transform(features)
+    features = build_feature_vector(total_duration, time_of_day, concentration, days_since, previous_rating)
     
-    # Vorhersagen
-    pred_work = int(round(models['work_duration'].predict(features_scaled)[0]))
-    pred_break = int(round(models['break_duration'].predict(features_scaled)[0]))
-    pred_next = models['next_session'].predict(features_scaled)[0]
+    # Vorhersagen mit 90%-Intervall (Koeffizienten-Satz des Clusters, sonst global).
+    # Läuft ein A/B-Test, entscheidet der Router welche Version ausliefert, die andere läuft im Schatten mit.
+    served_model, intervals, request_id = load_ab_router().predict(
+        active_model, registry.candidate(), registry.candidate_fraction,
+        st.session_state.user_id, features, cluster
+    )
+    pred_work = int(round(intervals['work_duration'][0]))
+    pred_break = int(round(intervals['break_duration'][0]))
+    pred_next = intervals['next_session'][0]
     
     # Sicherstellen dass Vorhersagen sinnvoll sind
     pred_work = max(15, min(45, pred_work))
     pred_break = max(5, min(15, pred_break))
     
-    # Anzahl Blöcke so berechnen dass Gesamtzeit passt
-    cycle_duration = pred_work + pred_break
-    pred_blocks = max(1, int((total_duration + pred_break) / cycle_duration))
-    
-    # Schedule erstellen
-    schedule = []
-    total_calculated = 0
-    
-    for block in range(pred_blocks):
-        schedule.append({
-            'type': 'Lernen',
-            'duration': pred_work,
-            'block': block + 1
-        })
-        total_calculated += pred_work
-        
-        if block < pred_blocks - 1:
-            schedule.append({
-                'type': 'Pause',
-                'duration': pred_break,
-                'block': block + 1
-            })
-            total_calculated += pred_break
+    # Blöcke und Pausen (variabel, mit langer Pause) passend zur Wunschdauer optimieren
+    schedule = solve_schedule(total_duration, pred_work, pred_break)
+    pred_blocks = sum(1 for item in schedule if item['type'] == 'Lernen')
+    total_calculated = sum(item['duration'] for item in schedule)
+
+    # Erinnerung zur vorhergesagten nächsten Session (ersetzt eine offene des Users)
+    reminder_due = datetime.now() + timedelta(minutes=total_calculated, hours=min(max(pred_next, 0), 72))
+    reminder_scheduler = load_reminder_scheduler()
+    if reminder_scheduler is not None:
+        reminder_scheduler.schedule(st.session_state.user_id, reminder_due.timestamp())
+    else:
+        reminder_due = None
     
     # In Session State speichern
     st.session_state.current_plan = {
@@ -203,7 +298,22 @@ if view_mode == "Lernplan" and generate_plan:
         'actual_duration': total_calculated,
         'time_of_day': time_of_day,
         'concentration': concentration,
-        'schedule': schedule
+        'cluster': cluster.value if cluster else None,
+        'intervals': {target: (low, high) for target, (_, low, high) in intervals.items()} if served_model.predictor.has_uncertainty else None,
+        'low_confidence': low_confidence_targets(intervals) if served_model.predictor.has_uncertainty else [],
+        'model_version': served_model.version,
+        # Erwartetes Rating des ausgelieferten Modells, Bezug für die Drift-Überwachung
+        'expected_rating': expected_rating(served_model.predictor, features),
+        'request_id': request_id,
+        'schedule': schedule,
+        'reminder_due': reminder_due,
+        # Beiträge der Faktoren zur Ridge-Vorhersage (skalierte Features × Koeffizienten)
+        'explanation': explain_prediction(served_model.predictor, features, cluster),
+        'explanation_base': served_model.predictor.baseline(cluster),
+        'explained_by_trees': served_model.predictor.trees is not None,
+        # Alle Tageszeit × Dauer-Kombinationen in einem Batch bewerten
+        'what_if': what_if_grid(served_model.predictor, concentration, days_since, previous_rating)
+        if served_model.predictor.has_rating else None
     }
     
     # Timer zurücksetzen
@@ -213,6 +323,20 @@ if view_mode == "Lernplan" and generate_plan:
     st.session_state.pause_time = 0
     st.session_state.show_celebration = False
 
+# Hilfsfunktion für Vorhersage-Intervalle (auf den erlaubten Bereich begrenzt)
+def format_interval(interval, lower, upper, digits=0):
+    low, high = (min(max(value, lower), upper) for value in interval)
+    return f"{low:.{digits}f}–{high:.{digits}f}"
+
+# Timer-Übergang für den aktuellen Block ins Event-Log (nur gepuffert, siehe timer_log.py)
+def log_timer_event(event):
+    plan = st.session_state.current_plan
+    block_index = st.session_state.current_block_index
+    item = plan['schedule'][block_index]
+    load_timer_log().record(
+        st.session_state.user_id, plan.get('request_id'), block_index, item['type'], event, item['duration']
+    )
+
 # Hilfsfunktion für die Willkommensseite
 def render_welcome_content():
     st.header("Willkommen beim AI Lernplan Generator")
@@ -252,76 +376,89 @@ elif view_mode == "Statistiken":
     if len(history) == 0:
         st.info("Noch keine Daten vorhanden. Gib nach deiner ersten Session Feedback, um Statistiken aufzubauen.")
     else:
-        sessions_completed = len(history)
-        avg_rating = history['actual_rating'].mean()
-        avg_duration = history['total_duration'].mean()
-        last_session_time = history.iloc[-1]['timestamp']
-        last_session_str = last_session_time.strftime("%d.%m.%Y %H:%M") if hasattr(last_session_time, 'strftime') else str(last_session_time)
+        aggregates = st.session_state.user_aggregates
+        last_session_str = pd.Timestamp(aggregates.last_timestamp).strftime("%d.%m.%Y %H:%M")
 
         col_stats = st.columns(3)
-        col_stats[0].metric("Absolvierte Sessions", sessions_completed)
-        col_stats[1].metric("Ø Session-Rating", f"{avg_rating:.1f}/10")
-        col_stats[2].metric("Ø Sessiondauer", f"{avg_duration:.0f} min")
+        col_stats[0].metric("Absolvierte Sessions", aggregates.count)
+        col_stats[1].metric("Ø Session-Rating", f"{aggregates.avg_rating:.1f}/10")
+        col_stats[2].metric("Ø Sessiondauer", f"{aggregates.avg_duration:.0f} min")
+
+        col_rolling = st.columns(3)
+        for col, days in zip(col_rolling[:2], (7, 30)):
+            rolling = aggregates.rolling_mean(days)
+            col.metric(f"Ø Rating {days} Tage", f"{rolling:.1f}/10" if pd.notna(rolling) else "–")
+        col_rolling[2].metric(
+            "Lern-Streak", f"{aggregates.current_streak()} Tage",
+            help=f"Längste Serie: {aggregates.longest_streak} Tage"
+        )
         st.caption(f"Letzte Session: {last_session_str}")
 
-        chart_df = history[['timestamp', 'actual_rating']].copy().sort_values('timestamp')
-        chart_df['timestamp'] = chart_df['timestamp'].astype(str)
-        chart_df = chart_df.set_index('timestamp')
         st.subheader("Rating-Verlauf")
+        chart_zoom = st.radio("Zoom", options=list(ZOOM_LEVELS), horizontal=True, key='chart_zoom')
+        chart_df = load_rating_chart(st.session_state.user_id, aggregates.count, chart_zoom, history)
         st.line_chart(chart_df, height=280)
 
         st.subheader("Session-Historie")
-        history_display = history.copy()
-        history_display['timestamp'] = pd.to_datetime(history_display['timestamp'], errors='coerce')
-        history_display['Datum'] = history_display['timestamp'].apply(
-            lambda ts: ts.strftime("%d.%m") if pd.notna(ts) else ""
-        )
-        history_display['Uhrzeit'] = history_display['timestamp'].apply(
-            lambda ts: ts.strftime("%H.%M") if pd.notna(ts) else ""
+        history_index = load_history_index(st.session_state.user_id, aggregates.count, history)
+        with st.expander("🔎 Filtern & Sortieren"):
+            col_filter1, col_filter2, col_filter3 = st.columns(3)
+            with col_filter1:
+                first_day = history_index.sorted_timestamps[0].astype('datetime64[D]').item()
+                last_day = history_index.sorted_timestamps[-1].astype('datetime64[D]').item()
+                date_range = st.date_input(
+                    "Zeitraum", value=(first_day, last_day), min_value=first_day, max_value=last_day,
+                    key='history_dates'
+                )
+                filter_times = st.multiselect(
+                    "Tageszeit", options=list(TIME_OF_DAY_LABELS),
+                    format_func=lambda x: TIME_OF_DAY_LABELS[x], key='history_times'
+                )
+            with col_filter2:
+                filter_rating = st.slider("Rating", 1.0, 10.0, (1.0, 10.0), step=0.5, key='history_rating')
+                filter_reason = st.selectbox("Feedback-Grund", options=["Alle"] + FEEDBACK_REASONS, key='history_reason')
+            with col_filter3:
+                sort_label = st.selectbox("Sortieren nach", options=list(SORT_COLUMNS), key='history_sort')
+                sort_descending = st.checkbox("Absteigend", value=True, key='history_descending')
+                page_size = st.selectbox("Zeilen pro Seite", options=PAGE_SIZES, index=1, key='history_page_size')
+
+        # Unvollständiger Zeitraum (nur Startdatum gewählt) → bis zum Ende
+        date_start = date_range[0] if len(date_range) > 0 else None
+        date_end = date_range[1] if len(date_range) > 1 else None
+        positions = history_index.query(
+            start=date_start, end=date_end, times_of_day=filter_times, rating_range=filter_rating,
+            reason=None if filter_reason == "Alle" else filter_reason,
+            sort_by=SORT_COLUMNS[sort_label], descending=sort_descending
         )
-        history_display = history_display[[
-            'Datum', 'Uhrzeit', 'total_duration', 'time_of_day', 'concentration_baseline',
-            'days_since_last', 'previous_rating', 'actual_rating', 'feedback'
-        ]]
-        history_display = history_display.rename(columns={
-            'total_duration': 'Dauer (min)',
-            'time_of_day': 'Tageszeit',
-            'concentration_baseline': 'Konzentration',
-            'days_since_last': 'Tage seither',
-            'previous_rating': 'Vorheriges Rating',
-            'actual_rating': 'Aktuelles Rating',
-            'feedback': 'Feedback'
-        })
-        st.dataframe(history_display, use_container_width=True, hide_index=True)
+        total_pages = page_count(len(positions), page_size)
+        if st.session_state.get('history_page', 1) > total_pages:
+            st.session_state.history_page = total_pages
+        history_page = st.number_input("Seite", min_value=1, max_value=total_pages, value=1, step=1, key='history_page')
+        st.dataframe(history_index.page(positions, history_page, page_size), use_container_width=True, hide_index=True)
+        st.caption(f"Seite {history_page} von {total_pages} · {len(positions)} von {len(history_index)} Sessions")
+
+        # Feedback-Gründe: reine Bit-Operationen auf der Bitmaske
+        if any(aggregates.reason_count):
+            st.subheader("Feedback-Gründe")
+            col_reasons1, col_reasons2 = st.columns(2)
+            with col_reasons1:
+                frequencies = aggregates.reason_frequencies()
+                st.bar_chart(frequencies[frequencies > 0], height=280)
+            with col_reasons2:
+                impact = aggregates.reason_rating_impact()
+                st.dataframe(
+                    impact[impact['Nennungen'] > 0].round(2).sort_values('Differenz'),
+                    use_container_width=True
+                )
+                st.caption("Wie stark hängt ein Grund mit schlechteren Ratings zusammen?")
 
         st.subheader("Kalender nach Tageszeit & Wochentag")
         weekday_labels = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
         time_labels = ["Morgen", "Mittag", "Abend", "Nacht"]
-        calendar_df = pd.DataFrame(index=time_labels, columns=weekday_labels, dtype=float)
-
-        history_for_calendar = history.copy()
-        history_for_calendar['timestamp'] = pd.to_datetime(history_for_calendar['timestamp'], errors='coerce')
-
-        weekday_map = {0: "Mo", 1: "Di", 2: "Mi", 3: "Do", 4: "Fr", 5: "Sa", 6: "So"}
-        time_map = {
-            'morning': "Morgen",
-            'afternoon': "Mittag",
-            'evening': "Abend",
-            'night': "Nacht"
-        }
-
-        for _, entry in history_for_calendar.iterrows():
-            timestamp = entry.get('timestamp')
-            time_of_day_value = entry.get('time_of_day')
-            rating_value = entry.get('actual_rating')
-            if pd.isna(timestamp) or pd.isna(time_of_day_value) or pd.isna(rating_value):
-                continue
-
-            weekday_label = weekday_map.get(timestamp.weekday())
-            time_label = time_map.get(time_of_day_value)
-
-            if weekday_label in calendar_df.columns and time_label in calendar_df.index:
-                calendar_df.loc[time_label, weekday_label] = rating_value
+        # Letztes Rating je Zelle, direkt aus den Kennzahlen
+        calendar_df = aggregates.calendar()
+        calendar_df.index = time_labels
+        calendar_df.columns = weekday_labels
 
         styled_calendar = calendar_df.style.background_gradient(
             axis=None,
@@ -335,9 +472,118 @@ elif view_mode == "Statistiken":
 
         st.dataframe(styled_calendar, use_container_width=True)
 
+    # Tatsächliche Fokuszeit aus dem Timer-Event-Log (vektorisiert pro Block/Session)
+    focus_sessions = session_metrics(block_metrics(load_timer_log().read(st.session_state.user_id)))
+    if len(focus_sessions) > 0:
+        st.subheader("Fokuszeit (Timer)")
+        focus = focus_summary(focus_sessions)
+        col_focus = st.columns(4)
+        col_focus[0].metric(
+            "Fokuszeit gesamt", f"{focus['focus_min']:.0f} min", help=f"Geplant: {focus['planned_min']:.0f} min"
+        )
+        col_focus[1].metric("Fokus vs. Plan", f"{focus['focus_ratio']:.0%}" if pd.notna(focus['focus_ratio']) else "–")
+        col_focus[2].metric("Skip-Rate", f"{focus['skip_rate']:.0%}" if pd.notna(focus['skip_rate']) else "–")
+        col_focus[3].metric(
+            "Ø Pause je Lernblock",
+            f"{focus['pause_per_block']:.1f} min" if pd.notna(focus['pause_per_block']) else "–"
+        )
+        recent = focus_sessions.tail(20)
+        focus_chart = pd.DataFrame({
+            'Geplant': recent['planned_min'].to_numpy(),
+            'Fokussiert': recent['focus_min'].to_numpy()
+        }, index=recent['start'].dt.strftime("%d.%m. %H:%M"))
+        st.bar_chart(focus_chart, height=260, stack=False)
+        st.caption("Geplante vs. tatsächlich gelaufene Lernzeit der letzten Sessions (Minuten)")
+
+    # Modell-Drift über alle User (inkrementell bei jedem Feedback aktualisiert)
+    st.subheader("Modell-Drift")
+    drift_monitor = load_drift_monitor()
+    # Nur Versionen, die gerade ausgeliefert werden (aktiv + A/B-Kandidat)
+    candidate_model = registry.candidate() if registry is not None else None
+    served_versions = [model.version for model in (active_model, candidate_model) if model is not None]
+    retrain_signal = drift_monitor.retrain_signal(served_versions)
+    if retrain_signal:
+        st.warning(
+            f"⚠️ Retrain empfohlen (seit {retrain_signal['raised_at']}): "
+            f"Feedback weicht deutlich von der Vorhersage ab in {', '.join(retrain_signal['segments'])}."
+        )
+    drift_summary = drift_monitor.summary(served_versions)
+    if not drift_summary.empty:
+        st.caption("Ø Fehler = tatsächliches Rating − vom Modell erwartetes Rating, je Modellversion, Tageszeit und Lerntyp")
+        st.dataframe(drift_summary, use_container_width=True, hide_index=True)
+    else:
+        st.caption("Noch keine Feedbacks für die Drift-Überwachung vorhanden.")
+
+elif view_mode == "Anki-Import":
+    # Setzt st.session_state.anki_cluster für die Lerntyp-Auswahl im Lernplan
+    show_anki_import()
+
+elif view_mode == "Kohorten":
+    st.header("🛠️ Kohorten-Analyse")
+    analytics = load_cohort_analytics()
+    analytics.refresh()
+
+    if not analytics.summaries:
+        st.info("Noch keine Sessions im Kohorten-Store. Bestehende Historien übernehmen: `python cohort_analytics.py ingest`")
+    else:
+        daily = analytics.daily()
+        cohort_users = analytics.user_stats()
+        col_cohort = st.columns(4)
+        col_cohort[0].metric("User", f"{len(cohort_users):,}".replace(",", "."))
+        col_cohort[1].metric("Sessions", f"{daily['Sessions'].sum():,}".replace(",", "."))
+        col_cohort[2].metric(
+            "Ø Rating", f"{cohort_users['rating_sum'].sum() / cohort_users['sessions'].sum():.1f}/10"
+        )
+        col_cohort[3].metric("Tage", len(daily))
+        st.caption(
+            f"{analytics.last_refresh['changed']} Tages-Partitionen neu zusammengefasst "
+            f"({analytics.last_refresh['seconds'] * 1000:.0f} ms)"
+        )
+
+        st.subheader("Ø Rating nach Tageszeit & Wochentag")
+        heatmap_means, heatmap_counts = analytics.heatmap()
+        heatmap_means.index = heatmap_counts.index = ["Morgen", "Mittag", "Abend", "Nacht"]
+        st.dataframe(
+            heatmap_means.style.background_gradient(axis=None, cmap="RdYlGn", vmin=1, vmax=10)
+            .format(lambda v: f"{v:.2f}" if pd.notna(v) else ""),
+            use_container_width=True
+        )
+        with st.expander("Anzahl Sessions je Zelle"):
+            st.dataframe(heatmap_counts, use_container_width=True)
+
+        st.subheader("Verlauf")
+        st.line_chart(daily[['Sessions', 'Aktive User']], height=260)
+        st.line_chart(daily[['Ø Rating']], height=200)
+
+        st.subheader("Lerntypen")
+        col_clusters1, col_clusters2 = st.columns(2)
+        cluster_table = analytics.cluster_distribution()
+        with col_clusters1:
+            st.bar_chart(cluster_table['User'], height=260)
+        with col_clusters2:
+            st.dataframe(
+                cluster_table.style.format({'Anteil User': "{:.0%}", 'Ø Rating': "{:.2f}", 'Ø Dauer': "{:.0f} min"}),
+                use_container_width=True
+            )
+            st.caption("– = weniger als 3 Sessions, noch kein Lerntyp")
+
+        st.subheader("Plantreue (Timer)")
+        adherence = analytics.adherence()
+        if adherence.empty:
+            st.caption("Noch keine Timer-Events vorhanden.")
+        else:
+            st.dataframe(
+                adherence.style.format({
+                    'Fokus vs. Plan': "{:.0%}", 'Skip-Rate': "{:.0%}", 'Ø Pause je Lernblock': "{:.1f} min"
+                }, na_rep="–"),
+                use_container_width=True
+            )
+
 else:
     if 'current_plan' in st.session_state:
         plan = st.session_state.current_plan
+        work_lengths = [item['duration'] for item in plan['schedule'] if item['type'] == 'Lernen']
+        break_lengths = [item['duration'] for item in plan['schedule'] if item['type'] == 'Pause' and not item.get('long')]
         
         # Metriken anzeigen
         col1, col2, col3, col4, col5 = st.columns(5)
@@ -346,10 +592,14 @@ else:
             st.metric("Lernblöcke", f"{plan['blocks']}")
         
         with col2:
-            st.metric("Lernblock-Dauer", f"{plan['work_duration']} min")
+            work_label = f"{min(work_lengths)}–{max(work_lengths)}" if min(work_lengths) != max(work_lengths) else f"{work_lengths[0]}"
+            st.metric("Lernblock-Dauer", f"{work_label} min")
         
         with col3:
-            st.metric("Pausen-Dauer", f"{plan['break_duration']} min")
+            if break_lengths and min(break_lengths) != max(break_lengths):
+                st.metric("Pausen-Dauer", f"{min(break_lengths)}–{max(break_lengths)} min")
+            else:
+                st.metric("Pausen-Dauer", f"{break_lengths[0] if break_lengths else plan['break_duration']} min")
         
         with col4:
             st.metric("Tatsächliche Dauer", f"{plan['actual_duration']} min")
@@ -357,6 +607,27 @@ else:
         with col5:
             st.metric("Nächste Session in", f"{plan['next_session_hours']:.1f} h")
 
+        if plan.get('reminder_due'):
+            st.caption(f"⏰ Erinnerung an die nächste Session: {plan['reminder_due']:%d.%m. um %H:%M} Uhr")
+        if plan.get('intervals'):
+            intervals = plan['intervals']
+            st.caption(
+                "90%-Intervalle: "
+                f"Lernblock {format_interval(intervals['work_duration'], 15, 45)} min · "
+                f"Pause {format_interval(intervals['break_duration'], 5, 15)} min · "
+                f"Nächste Session {format_interval(intervals['next_session'], 0, 72, digits=1)} h"
+            )
+        if plan.get('low_confidence'):
+            labels = {'work_duration': 'Lernblock-Dauer', 'break_duration': 'Pausen-Dauer', 'next_session': 'nächste Session'}
+            st.warning(
+                "⚠️ Unsichere Vorhersage für " + ", ".join(labels[target] for target in plan['low_confidence'])
+                + ". Deine Eingaben liegen außerhalb dessen, was das Modell gut kennt – der Plan ist nur eine grobe Orientierung."
+            )
+
+        if plan.get('cluster'):
+            profile = CLUSTERS[ClusterKey(plan['cluster'])]
+            st.caption(f"Lerntyp: **{profile.name}** – {profile.recommendation}")
+
         # TIMER BEREICH
         st.markdown("---")
 
@@ -419,6 +690,7 @@ else:
             with col_btn1:
                 if not st.session_state.timer_running:
                     if st.button("▶️ Start", use_container_width=True, key="start_btn"):
+                        log_timer_event(START)
                         st.session_state.timer_running = True
                         st.session_state.timer_start_time = time.time()
                         st.session_state.pause_time = 0
@@ -427,11 +699,13 @@ else:
                 else:
                     if not st.session_state.timer_paused:
                         if st.button("⏸️ Pause", use_container_width=True, key="pause_btn"):
+                            log_timer_event(PAUSE)
                             st.session_state.timer_paused = True
                             st.session_state.remaining_at_pause = remaining_seconds
                             st.rerun()
                     else:
                         if st.button("▶️ Weiter", use_container_width=True, key="continue_btn"):
+                            log_timer_event(RESUME)
                             st.session_state.timer_paused = False
                             elapsed_pause = time.time() - st.session_state.timer_start_time
                             st.session_state.pause_time = elapsed_pause - (current_item['duration'] * 60 - st.session_state.remaining_at_pause)
@@ -440,6 +714,7 @@ else:
 
             with col_btn2:
                 if st.button("⏭️ Skip", use_container_width=True, key="skip_btn"):
+                    log_timer_event(SKIP)
                     st.session_state.show_celebration = True
                     st.session_state.current_block_index += 1
                     st.session_state.timer_running = False
@@ -449,6 +724,7 @@ else:
 
             with col_btn3:
                 if st.button("🔄 Reset", use_container_width=True, key="reset_btn"):
+                    log_timer_event(RESET)
                     st.session_state.timer_running = False
                     st.session_state.timer_start_time = None
                     st.session_state.timer_paused = False
@@ -457,6 +733,7 @@ else:
 
             with col_btn4:
                 if st.button("⏹️ Beenden", use_container_width=True, key="stop_btn"):
+                    log_timer_event(STOP)
                     st.session_state.current_block_index = 0
                     st.session_state.timer_running = False
                     st.session_state.timer_paused = False
@@ -468,6 +745,7 @@ else:
 
                 # Button für nächsten Block
                 if st.button("➡️ Weiter zum nächsten Block", use_container_width=True, type="primary", key="next_block_btn"):
+                    log_timer_event(COMPLETE)
                     st.session_state.show_celebration = True
                     st.session_state.current_block_index += 1
                     st.session_state.timer_running = False
@@ -505,7 +783,7 @@ else:
             schedule_display.append({
                 'Nr.': i + 1,
                 'Status': status,
-                'Aktivität': item['type'],
+                'Aktivität': 'Lange Pause' if item.get('long') else item['type'],
                 'Dauer': f"{item['duration']} min"
             })
 
@@ -583,18 +861,18 @@ else:
         st.plotly_chart(fig, use_container_width=True)
 
         # Info über Zeitabweichung
-        time_diff = abs(plan['total_duration'] - plan['actual_duration'])
-        if time_diff > 5:
-            st.info(f"ℹ️ Die tatsächliche Session-Dauer ({plan['actual_duration']} min) weicht von deiner Wunschdauer ({plan['total_duration']} min) ab. Das liegt an der Optimierung der Lernblock-Längen für maximale Effizienz.")
+        time_diff = plan['actual_duration'] - plan['total_duration']
+        if abs(time_diff) > 5:
+            st.info(f"ℹ️ Die tatsächliche Session-Dauer ({plan['actual_duration']} min) weicht um {time_diff:+d} min von deiner Wunschdauer ({plan['total_duration']} min) ab. Mit Lernblöcken von 15–45 min und Pausen von 5–15 min lässt sie sich nicht genauer treffen.")
 
         # Tipps basierend auf Vorhersagen
         st.subheader("Personalisierte Tipps")
 
-        tips = []
-        if plan['concentration'] < 5:
-            tips.append("⚠️ Niedrige Konzentration erkannt. Versuche kurze Lernblöcke mit längeren Pausen.")
-        if plan['time_of_day'] == 'night':
-            tips.append("🌙 Spätabends zu lernen kann ineffizient sein. Überlege, ob eine frühere Zeit möglich ist.")
+        # Tipps aus den stärksten Einflussfaktoren, ergänzt um Hinweise zum Plan selbst.
+        # Kommen die Werte aus dem Gradient-Boosting, passen die linearen Beiträge nicht
+        # zu den angezeigten Zahlen – dann keine Tipps daraus.
+        explanation = plan.get('explanation')
+        tips = contribution_tips(explanation) if explanation is not None and not plan.get('explained_by_trees') else []
         if plan['blocks'] > 5:
             tips.append("🔋 Viele Lernblöcke geplant! Denk an ausreichend Flüssigkeit und Snacks.")
         if plan['next_session_hours'] < 6:
@@ -606,6 +884,112 @@ else:
         else:
             st.success("✅ Dein Lernplan sieht optimal aus! Viel Erfolg!")
 
+        # Erklärung: Beitrag jedes Faktors gegenüber den Ø-Eingaben aller User
+        if explanation is not None:
+            with st.expander("🧮 Warum diese Werte?"):
+                explain_labels = {
+                    'work_duration': "Lernblock-Dauer",
+                    'break_duration': "Pausen-Dauer",
+                    'next_session': "Nächste Session"
+                }
+                explain_target = st.radio(
+                    "Vorhersage",
+                    options=list(explain_labels.keys()),
+                    format_func=lambda x: explain_labels[x],
+                    horizontal=True,
+                    key="explain_target"
+                )
+                unit = TARGET_UNITS[explain_target]
+                effects = explanation[explain_target].sort_values()
+                base = float(plan['explanation_base'][list(explanation.columns).index(explain_target)])
+
+                explain_fig = go.Figure(go.Bar(
+                    x=effects.values,
+                    y=effects.index,
+                    orientation='h',
+                    marker=dict(color=['#4CAF50' if value >= 0 else '#F44336' for value in effects.values]),
+                    text=[f"{value:+.1f} {unit}" for value in effects.values],
+                    textposition='auto',
+                    hovertemplate='%{y}: %{x:+.2f} ' + unit + '<extra></extra>'
+                ))
+                explain_fig.update_layout(
+                    height=60 + 40 * len(effects),
+                    margin=dict(l=10, r=10, t=10, b=30),
+                    xaxis_title=f"Beitrag ({unit})",
+                    showlegend=False
+                )
+                st.plotly_chart(explain_fig, use_container_width=True)
+                st.caption(
+                    f"Bei Ø-Eingaben aller User: {base:.1f} {unit} → mit deinen Angaben: {base + effects.sum():.1f} {unit} "
+                    "(lineares Modell, vor dem Begrenzen auf den erlaubten Bereich)."
+                    + (" Die angezeigten Werte stammen aus dem Gradient-Boosting-Modell." if plan.get('explained_by_trees') else "")
+                )
+
+        # What-if: bester Zeitpunkt laut Rating-Modell
+        if plan.get('what_if') is not None:
+            with st.expander("🔍 Wann lernst du am besten?"):
+                what_if = plan['what_if']
+                best = best_slot(what_if, plan['total_duration'])
+                current = what_if[
+                    (what_if['time_of_day'] == plan['time_of_day']) & (what_if['total_duration'] == plan['total_duration'])
+                ]['expected_rating']
+                current_rating = float(current.iloc[0]) if len(current) else None
+
+                if best['time_of_day'] == plan['time_of_day'] and best['total_duration'] == plan['total_duration']:
+                    st.success(f"✅ Deine Wahl ist bereits optimal (erwartetes Rating {best['expected_rating']:.1f}/10).")
+                else:
+                    st.info(
+                        f"💡 Empfehlung: **{TIME_OF_DAY_LABELS[best['time_of_day']]}**, **{best['total_duration']} min** "
+                        f"– erwartetes Rating {best['expected_rating']:.1f}/10"
+                        + (f" statt {current_rating:.1f}/10." if current_rating is not None else ".")
+                    )
+
+                what_if_table = what_if.pivot(index='time_of_day', columns='total_duration', values='expected_rating')
+                what_if_table = what_if_table.reindex(list(TIME_OF_DAY_LABELS.keys()))
+                what_if_table.index = [TIME_OF_DAY_LABELS[t] for t in what_if_table.index]
+                st.dataframe(
+                    what_if_table.style.background_gradient(axis=None, cmap="RdYlGn", vmin=1, vmax=10).format("{:.1f}"),
+                    use_container_width=True
+                )
+                st.caption("Erwartetes Rating je Tageszeit (Zeilen) und Session-Dauer in Minuten (Spalten)")
+
+        # Mehrwöchiger Kalender ab der empfohlenen nächsten Session
+        with st.expander("📅 Mehrwöchiger Lernplan"):
+            planning_days = st.slider("Wie viele Tage sollen geplant werden?", min_value=7, max_value=30, value=14, step=7)
+            preferred_times = st.multiselect(
+                "Zu welchen Tageszeiten möchtest du lernen?",
+                options=list(TIME_OF_DAY_LABELS.keys()),
+                default=[plan['time_of_day']],
+                format_func=lambda x: TIME_OF_DAY_LABELS[x]
+            )
+            planner_user = UserProfile(
+                user_id='me',
+                concentration=plan['concentration'],
+                cluster=plan.get('cluster'),
+                preferred_times=tuple(preferred_times) or (plan['time_of_day'],),
+                session_duration=plan['total_duration'],
+                days_since=int(plan['next_session_hours'] // 24),
+                previous_rating=float(previous_rating)
+            )
+            # Dieselbe Version wie für den Plan oben (A/B-Router), nicht pauschal die aktive
+            planner_model = registry.get(plan['model_version'])
+            calendar = load_study_planner(planner_model.version, planner_model.predictor).plan(
+                [planner_user],
+                start=datetime.now() + timedelta(minutes=plan['actual_duration'], hours=plan['next_session_hours']),
+                days=planning_days,
+                explain=True
+            )
+            calendar_display = pd.DataFrame({
+                'Datum': calendar['start'].dt.strftime("%a %d.%m"),
+                'Uhrzeit': calendar['start'].dt.strftime("%H:%M") + "–" + calendar['end'].dt.strftime("%H:%M"),
+                'Tageszeit': calendar['time_of_day'].map(TIME_OF_DAY_LABELS),
+                'Lernblöcke': calendar['blocks'],
+                'Dauer': calendar['duration'].astype(str) + " min",
+                'Haupteinfluss Blocklänge': calendar['main_factor']
+                + calendar['main_factor_effect'].map(lambda value: f" ({value:+.0f} min)")
+            })
+            st.dataframe(calendar_display, use_container_width=True, hide_index=True)
+
         # Feedback nach der Session
         st.subheader("Session-Feedback")
         st.markdown("*Nach deiner Lernsession kannst du Feedback geben, um die KI zu verbessern:*")
@@ -621,36 +1005,39 @@ else:
 
             feedback_reasons = st.multiselect(
                 "Falls es nicht optimal lief, was waren die Gründe?",
-                options=[
-                    "Zu lange Lernblöcke",
-                    "Zu kurze Pausen",
-                    "Zu späte Uhrzeit",
-                    "Zu frühe Uhrzeit",
-                    "Zu wenig Schlaf",
-                    "Ablenkungen",
-                    "Schwieriges Thema",
-                    "Andere"
-                ]
+                options=FEEDBACK_REASONS
             )
 
             submitted = st.form_submit_button("💾 Feedback speichern")
 
             if submitted:
-                new_entry = pd.DataFrame([{
-                    'timestamp': datetime.now(),
-                    'total_duration': plan['total_duration'],
-                    'time_of_day': plan['time_of_day'],
-                    'concentration_baseline': plan['concentration'],
-                    'days_since_last': days_since,
-                    'previous_rating': previous_rating,
-                    'actual_rating': actual_rating,
-                    'feedback': ', '.join(feedback_reasons)
-                }])
-
-                st.session_state.user_history = pd.concat(
-                    [st.session_state.user_history, new_entry],
-                    ignore_index=True
+                new_entry = make_entry(
+                    datetime.now(), plan['total_duration'], plan['time_of_day'], plan['concentration'],
+                    days_since, previous_rating, actual_rating, feedback_reasons
+                )
+
+                st.session_state.user_history = append_entry(st.session_state.user_history, new_entry)
+                # Nur die neue Zeile anhängen (Part-Datei), kein Rewrite der ganzen Historie
+                append_history(st.session_state.user_id, new_entry)
+                entry = new_entry.iloc[0]
+                st.session_state.user_aggregates.update(
+                    entry['timestamp'], entry['total_duration'], entry['time_of_day'],
+                    entry['actual_rating'], entry['feedback']
                 )
+                save_aggregates(st.session_state.user_id, st.session_state.user_aggregates)
+                # Zusätzlich in den Tages-partitionierten Kohorten-Store (Admin-Auswertung)
+                load_cohort_writer().append(new_entry.assign(user_id=st.session_state.user_id))
+
+                # Residuum gegen das ausgelieferte Modell für die Drift-Überwachung (O(1) pro Feedback)
+                if plan.get('expected_rating') is not None:
+                    load_drift_monitor().update(
+                        plan['model_version'], plan['time_of_day'], plan.get('cluster'),
+                        actual_rating - plan['expected_rating'], feedback_reasons
+                    )
+
+                # Rating zur Vorhersage ins A/B-Log schreiben
+                if 'request_id' in plan:
+                    load_ab_router().log_feedback(plan['request_id'], actual_rating)
 
                 st.success("✅ Feedback gespeichert! Die KI lernt mit jedem Feedback dazu.")
 
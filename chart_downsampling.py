@@ -0,0 +1,99 @@
+# chart_downsampling.py
+"""
+Serverseitiges Downsampling für den Rating-Verlauf.
+
+Lange Historien werden nicht mehr komplett an den Browser geschickt:
+- Zoom "Sessions": Largest-Triangle-Three-Buckets (LTTB) auf den einzelnen
+  Ratings, behält die optisch markanten Punkte.
+- Zoom "Tag"/"Woche"/"Monat": Zeit-Buckets mit min/Ø/max Rating.
+
+In beiden Fällen bleibt der Chart bei höchstens MAX_CHART_POINTS Punkten.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_CHART_POINTS = 300
+
+ZOOM_LEVELS = {
+    'Sessions': None,
+    'Tag': 'D',
+    'Woche': 'W-MON',
+    'Monat': 'MS'
+}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indizes der Punkte, die LTTB behält (x aufsteigend sortiert).
+    Erster und letzter Punkt sind immer dabei.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket-Grenzen für die inneren Punkte 1 .. n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Schwerpunkt des nächsten Buckets (bzw. letzter Punkt)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Fläche des Dreiecks (vorheriger Punkt, Kandidat, Schwerpunkt)
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def rating_series(history: pd.DataFrame, zoom='Sessions', max_points=MAX_CHART_POINTS) -> pd.DataFrame:
+    """
+    Chart-Daten für den Rating-Verlauf mit Zeitindex.
+
+    Sessions → Spalte 'Rating'; Zeit-Buckets → Spalten 'Min', 'Ø', 'Max'.
+    """
+    ordered = history[['timestamp', 'actual_rating']].dropna().sort_values('timestamp', kind='stable')
+    timestamps = ordered['timestamp'].to_numpy()
+    ratings = ordered['actual_rating'].to_numpy(dtype=np.float64)
+
+    freq = ZOOM_LEVELS[zoom]
+    if freq is None:
+        keep = lttb_indices(timestamps.astype(np.int64), ratings, max_points)
+        return pd.DataFrame({'Rating': ratings[keep]}, index=pd.DatetimeIndex(timestamps[keep], name='Zeitpunkt'))
+
+    buckets = (
+        pd.Series(ratings, index=pd.DatetimeIndex(timestamps))
+        .resample(freq, label='left', closed='left')
+        .agg(['min', 'mean', 'max'])
+        .dropna()
+    )
+    buckets.columns = ['Min', 'Ø', 'Max']
+    buckets.index.name = 'Zeitpunkt'
+    if len(buckets) > max_points:
+        keep = lttb_indices(buckets.index.asi8, buckets['Ø'].to_numpy(), max_points)
+        buckets = buckets.iloc[keep]
+    return buckets
+
+
+if __name__ == "__main__":
+    import time
+
+    from simulate_users import simulate_population, to_history_frame
+
+    history = to_history_frame(simulate_population(n_users=1, n_days=3 * 365, n_workers=1))
+    print(f"📈 {len(history)} Sessions")
+    for zoom in ZOOM_LEVELS:
+        start = time.perf_counter()
+        series = rating_series(history, zoom)
+        print(f"   {zoom:<8} {len(series):>4} Punkte  {(time.perf_counter() - start) * 1000:.1f} ms")
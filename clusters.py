@@ -2,6 +2,9 @@
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+import pandas as pd
+
 
 class ClusterKey(str, Enum):
     SPRINTER = "sprinter"
@@ -14,7 +17,17 @@ class ClusterProfile:
     key: ClusterKey
     name: str
     description: str
-    recommendation: str
+    # Fokus- und Pausenlänge in Minuten; innerhalb der Solver-Grenzen (15–45 / 5–15,
+    # siehe schedule_solver.py). generate_training_data.py erzeugt die Labels daraus.
+    work_range: tuple
+    break_range: tuple
+
+    @property
+    def recommendation(self) -> str:
+        return (
+            f"Empfohlene Blocklänge: {self.work_range[0]}–{self.work_range[1]} Minuten Fokus, "
+            f"{self.break_range[0]}–{self.break_range[1]} Minuten Pause."
+        )
 
 
 CLUSTERS = {
@@ -25,7 +38,8 @@ CLUSTERS = {
             "Lernt oft und in eher kurzen Einheiten. Viele Wiederholungen, "
             "kürzere Intervalle und eher hohe Lernfrequenz."
         ),
-        recommendation="Empfohlene Blocklänge: 20–30 Minuten Fokus, 5 Minuten Pause."
+        work_range=(20, 30),
+        break_range=(5, 8)
     ),
     ClusterKey.MARATHONER: ClusterProfile(
         key=ClusterKey.MARATHONER,
@@ -34,7 +48,8 @@ CLUSTERS = {
             "Lernt selten, dafür sehr intensiv. Hohe Anzahl Wiederholungen an Lerntagen, "
             "lange Intervalle und hohe Erinnerungsquote."
         ),
-        recommendation="Empfohlene Blocklänge: 60–75 Minuten Fokus, 10–15 Minuten Pause."
+        work_range=(35, 45),
+        break_range=(10, 15)
     ),
     ClusterKey.PLANNER: ClusterProfile(
         key=ClusterKey.PLANNER,
@@ -43,7 +58,8 @@ CLUSTERS = {
             "Lernt regelmäßig in mittelgroßen Blöcken mit solider Konstanz. "
             "Weder extreme Peaks noch lange Pausen."
         ),
-        recommendation="Empfohlene Blocklänge: 35–50 Minuten Fokus, 5–10 Minuten Pause."
+        work_range=(25, 40),
+        break_range=(5, 10)
     ),
 }
 
@@ -73,3 +89,46 @@ def assign_cluster_from_features(features: dict) -> ClusterKey:
 
     # Sonst: strukturierter Planer
     return ClusterKey.PLANNER
+
+
+def assign_cluster_from_history(history) -> ClusterKey | None:
+    """
+    Leitet den Lerntyp aus der bisherigen Session-Historie der App ab.
+
+    Erwartet ein DataFrame mit den Spalten 'timestamp' und 'total_duration'.
+    Gibt None zurück, solange zu wenige Sessions vorhanden sind.
+    """
+    if history is None or len(history) < 3:
+        return None
+
+    days = pd.to_datetime(history["timestamp"]).dt.normalize()
+    span_days = max(1, (days.max() - days.min()).days + 1)
+    key = assign_clusters_from_stats(
+        len(history), days.nunique(), span_days, float(history["total_duration"].mean())
+    )[0]
+    return ClusterKey(key)
+
+
+def assign_clusters_from_stats(sessions, learning_days, span_days, avg_duration) -> np.ndarray:
+    """
+    Vektorisierte Variante für viele User auf einmal (z.B. cohort_analytics.py).
+
+    Alle Argumente sind Arrays (oder Skalare) pro User; Ergebnis sind die
+    Cluster-Werte als Strings, None bei weniger als 3 Sessions.
+    """
+    sessions, learning_days, span_days, avg_duration = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (sessions, learning_days, span_days, avg_duration))
+    )
+    ldr = learning_days / np.maximum(1, span_days)
+    keys = np.select(
+        [
+            sessions < 3,
+            # Marathoner – selten, dafür lange Sessions
+            (ldr < 0.2) & (avg_duration >= 150),
+            # Sprinter – viele Lerntage mit eher kurzen Sessions
+            (ldr >= 0.3) & (avg_duration <= 90),
+        ],
+        [None, ClusterKey.MARATHONER.value, ClusterKey.SPRINTER.value],
+        default=ClusterKey.PLANNER.value
+    )
+    return keys.astype(object)
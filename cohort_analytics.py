@@ -0,0 +1,465 @@
+# cohort_analytics.py
+"""
+Kohorten-Auswertung über die Sessions aller User.
+
+Neben der Historie pro User (history_store.py) landet jede Session in
+einem nach Tag partitionierten Parquet-Store (data/cohort/date=JJJJ-MM-TT/).
+Die App schreibt über CohortWriter gesammelt (write-behind), und eine
+Partition wird automatisch zusammengefasst, sobald sie mehr als max_parts
+Part-Dateien hat. Pro Partition wird einmal eine kleine Zusammenfassung
+gerechnet (Zählungen und Summen je Tageszeit und je User, per np.bincount)
+und mit der mtime des Partitions-Verzeichnisses als Fingerprint gecacht.
+refresh() braucht so nur einen stat() pro Tag und fasst nur neue oder
+geänderte Partitionen neu zusammen, im laufenden Betrieb also nur den
+heutigen Tag.
+
+Die Abfragen (Heatmap Tageszeit × Wochentag, Lerntypen, Tagesverlauf)
+kombinieren nur noch diese Zusammenfassungen. Die Plantreue kommt aus dem
+Timer-Log (timer_log.py) und wird neu gerechnet, sobald das Log wächst.
+
+Eine Session ist über (user_id, timestamp) eindeutig; doppelt importierte
+Zeilen werden beim Zusammenfassen verworfen, ingest ist also wiederholbar.
+"""
+import argparse
+import atexit
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ab_testing import user_hash
+from clusters import CLUSTERS, assign_clusters_from_stats
+from history_store import HISTORY_DIR, HISTORY_SCHEMA, TIME_OF_DAY_DTYPE, list_users, load_history, to_typed_history
+from plan_model import TIME_OF_DAY_OPTIONS
+from timer_log import TIMER_LOG_PATH, block_metrics, read_log, session_metrics
+
+COHORT_DIR = os.path.join('data', 'cohort')
+SUMMARY_FILE = '_summaries.pkl'
+PARTITION_PREFIX = 'date='
+
+WEEKDAY_LABELS = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
+
+CLUSTER_NAMES = {key.value: profile.name for key, profile in CLUSTERS.items()}
+
+# Ab so vielen Part-Dateien wird eine Partition beim Schreiben zusammengefasst
+MAX_PARTS = 16
+
+# Nur diese Spalten werden für die Zusammenfassungen gelesen (spaltenweise aus Parquet)
+SUMMARY_COLUMNS = ['user_id', 'timestamp', 'total_duration', 'time_of_day', 'actual_rating']
+
+
+def partition_dir(day, cohort_dir=COHORT_DIR) -> str:
+    return os.path.join(cohort_dir, f"{PARTITION_PREFIX}{day}")
+
+
+def _write_parquet(frame: pd.DataFrame, directory: str):
+    """Temp-Datei (von pyarrow als versteckt ignoriert) und dann atomar umbenennen."""
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.part-', suffix='.tmp')
+    os.close(fd)
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"))
+
+
+def part_files(directory: str) -> list:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.endswith('.parquet'))
+
+
+def append_sessions(sessions: pd.DataFrame, cohort_dir=COHORT_DIR, max_parts=MAX_PARTS) -> int:
+    """
+    Hängt Sessions (Historie-Schema plus Spalte user_id) an den Store an,
+    eine Part-Datei pro betroffenem Tag. Hat ein Tag danach mehr als
+    max_parts Dateien, wird er zusammengefasst. Gibt die Anzahl der Tage zurück.
+    """
+    if len(sessions) == 0:
+        return 0
+    sessions = to_typed_history(sessions)[['user_id', *HISTORY_SCHEMA]]
+    sessions['user_id'] = sessions['user_id'].astype(str)
+    days = sessions['timestamp'].dt.normalize()
+    n_days = 0
+    for day, part in sessions.groupby(days, sort=True):
+        day = day.date().isoformat()
+        _write_parquet(part, partition_dir(day, cohort_dir))
+        if max_parts and len(part_files(partition_dir(day, cohort_dir))) > max_parts:
+            compact_partition(day, cohort_dir)
+        n_days += 1
+    return n_days
+
+
+class CohortWriter:
+    """
+    Gepuffertes append_sessions, ein Objekt pro Server-Prozess: geschrieben
+    wird ab batch_size Sessions, spätestens alle flush_interval Sekunden und
+    beim Beenden des Prozesses.
+    """
+
+    def __init__(self, cohort_dir=COHORT_DIR, batch_size=256, flush_interval=30.0):
+        self.cohort_dir = cohort_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._buffered_rows = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flusher = None
+        atexit.register(self.flush)
+
+    def append(self, sessions: pd.DataFrame):
+        with self._lock:
+            self._buffer.append(sessions)
+            self._buffered_rows += len(sessions)
+            full = self._buffered_rows >= self.batch_size
+            if self._flusher is None and self.flush_interval:
+                self._flusher = threading.Thread(target=self._flush_loop, name='cohort-writer', daemon=True)
+                self._flusher.start()
+        if full:
+            self.flush()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> int:
+        """Schreibt alle gepufferten Sessions; gibt deren Anzahl zurück."""
+        with self._write_lock:
+            # Puffer unter dem Lock austauschen, geschrieben wird ohne ihn
+            with self._lock:
+                frames, self._buffer, self._buffered_rows = self._buffer, [], 0
+            if not frames:
+                return 0
+            sessions = pd.concat(frames, ignore_index=True)
+            append_sessions(sessions, self.cohort_dir)
+        return len(sessions)
+
+
+def list_partitions(cohort_dir=COHORT_DIR) -> dict:
+    """
+    Tag (ISO) → Fingerprint (mtime des Verzeichnisses). Part-Dateien werden
+    nur per Umbenennen hinzugefügt oder gelöscht, das ändert die mtime.
+    """
+    partitions = {}
+    if not os.path.isdir(cohort_dir):
+        return partitions
+    with os.scandir(cohort_dir) as entries:
+        for entry in entries:
+            if entry.is_dir() and entry.name.startswith(PARTITION_PREFIX):
+                partitions[entry.name[len(PARTITION_PREFIX):]] = entry.stat().st_mtime_ns
+    return partitions
+
+
+def read_partition(day, cohort_dir=COHORT_DIR, columns=None) -> pd.DataFrame:
+    """Alle Part-Dateien eines Tages, ohne doppelte (user_id, timestamp)."""
+    frame = pd.read_parquet(partition_dir(day, cohort_dir), columns=columns)
+    return frame.drop_duplicates(['user_id', 'timestamp'], ignore_index=True)
+
+
+def summarize_partition(day, cohort_dir=COHORT_DIR) -> dict:
+    """Zählungen und Summen eines Tages – alles, was die Abfragen brauchen."""
+    frame = read_partition(day, cohort_dir, SUMMARY_COLUMNS)
+    codes = frame['time_of_day'].astype(TIME_OF_DAY_DTYPE).cat.codes.to_numpy()
+    rating = frame['actual_rating'].to_numpy(dtype=np.float64)
+    duration = frame['total_duration'].to_numpy(dtype=np.float64)
+    users, inverse = np.unique(frame['user_id'].to_numpy(dtype=str), return_inverse=True)
+    n_times = len(TIME_OF_DAY_OPTIONS)
+    return {
+        'weekday': date.fromisoformat(day).weekday(),
+        'sessions': len(frame),
+        'rating_sum': float(rating.sum()),
+        'duration_sum': float(duration.sum()),
+        'time_count': np.bincount(codes, minlength=n_times),
+        'time_rating_sum': np.bincount(codes, weights=rating, minlength=n_times),
+        'users': users,
+        'user_sessions': np.bincount(inverse, minlength=len(users)),
+        'user_duration_sum': np.bincount(inverse, weights=duration, minlength=len(users)),
+        'user_rating_sum': np.bincount(inverse, weights=rating, minlength=len(users))
+    }
+
+
+def compact_partition(day, cohort_dir=COHORT_DIR) -> bool:
+    """
+    Fasst die Part-Dateien eines Tages zu einer Datei zusammen und entfernt
+    dabei Duplikate. Parallel geschriebene Parts bleiben unberührt.
+    """
+    directory = partition_dir(day, cohort_dir)
+    parts = part_files(directory)
+    if len(parts) < 2:
+        return False
+    frame = pd.concat([pd.read_parquet(os.path.join(directory, name)) for name in parts], ignore_index=True)
+    _write_parquet(frame.drop_duplicates(['user_id', 'timestamp'], ignore_index=True), directory)
+    for name in parts:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # schon von einem parallelen compact entfernt
+    return True
+
+
+def compact(cohort_dir=COHORT_DIR, before=None) -> int:
+    """Fasst die Part-Dateien abgeschlossener Tage (vor before, Standard heute) zusammen."""
+    before = (before or date.today()).isoformat()
+    return sum(compact_partition(day, cohort_dir) for day in sorted(list_partitions(cohort_dir)) if day < before)
+
+
+class CohortAnalytics:
+    """Gecachte Zusammenfassungen pro Partition plus Abfragen darüber."""
+
+    def __init__(self, cohort_dir=COHORT_DIR, timer_log_path=TIMER_LOG_PATH):
+        self.cohort_dir = cohort_dir
+        self.timer_log_path = timer_log_path
+        self.summary_path = os.path.join(cohort_dir, SUMMARY_FILE)
+        self._lock = threading.RLock()  # Abfragen bauen aufeinander auf
+        self._results = {}
+        self.summaries = {}
+        self.fingerprints = {}
+        if os.path.exists(self.summary_path):
+            with open(self.summary_path, 'rb') as f:
+                cached = pickle.load(f)
+            self.summaries, self.fingerprints = cached['summaries'], cached['fingerprints']
+        self.timer_log_size = None
+        self.last_refresh = {'changed': 0, 'seconds': 0.0}
+
+    def refresh(self) -> int:
+        """Fasst neue/geänderte Partitionen zusammen; gibt deren Anzahl zurück."""
+        with self._lock:
+            start = time.perf_counter()
+            partitions = list_partitions(self.cohort_dir)
+            # Ein Tag, dessen erste Part-Datei noch geschrieben wird, zählt noch nicht
+            partitions = {
+                day: fingerprint for day, fingerprint in partitions.items()
+                if self.fingerprints.get(day) == fingerprint or part_files(partition_dir(day, self.cohort_dir))
+            }
+            changed = [day for day, fingerprint in partitions.items() if self.fingerprints.get(day) != fingerprint]
+            removed = [day for day in self.fingerprints if day not in partitions]
+            for day in changed:
+                self.summaries[day] = summarize_partition(day, self.cohort_dir)
+                self.fingerprints[day] = partitions[day]
+            for day in removed:
+                del self.summaries[day], self.fingerprints[day]
+            if changed or removed:
+                self._save()
+                self._results = {}
+
+            timer_log_size = os.path.getsize(self.timer_log_path) if os.path.exists(self.timer_log_path) else 0
+            if timer_log_size != self.timer_log_size:
+                self.timer_log_size = timer_log_size
+                self._results.pop('adherence', None)
+            self.last_refresh = {'changed': len(changed), 'seconds': time.perf_counter() - start}
+            return len(changed)
+
+    def _save(self):
+        os.makedirs(self.cohort_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cohort_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'summaries': self.summaries, 'fingerprints': self.fingerprints}, f)
+        os.replace(tmp_path, self.summary_path)
+
+    def _cached(self, name, compute):
+        with self._lock:
+            if name not in self._results:
+                self._results[name] = compute()
+            return self._results[name]
+
+    def days(self) -> list:
+        return sorted(self.summaries)
+
+    def daily(self) -> pd.DataFrame:
+        """Sessions, aktive User, Ø Rating und Ø Dauer pro Tag."""
+        def compute():
+            days = self.days()
+            summaries = [self.summaries[day] for day in days]
+            sessions = np.array([s['sessions'] for s in summaries], dtype=np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return pd.DataFrame({
+                    'Sessions': sessions.astype(int),
+                    'Aktive User': [len(s['users']) for s in summaries],
+                    'Ø Rating': np.array([s['rating_sum'] for s in summaries]) / sessions,
+                    'Ø Dauer': np.array([s['duration_sum'] for s in summaries]) / sessions
+                }, index=pd.DatetimeIndex(pd.to_datetime(days), name='Datum'))
+        return self._cached('daily', compute)
+
+    def heatmap(self):
+        """(Ø Rating, Anzahl Sessions) als Tageszeit × Wochentag-DataFrames."""
+        def compute():
+            counts = np.zeros((len(TIME_OF_DAY_OPTIONS), 7))
+            rating_sums = np.zeros_like(counts)
+            for summary in self.summaries.values():
+                counts[:, summary['weekday']] += summary['time_count']
+                rating_sums[:, summary['weekday']] += summary['time_rating_sum']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = rating_sums / counts
+            return (
+                pd.DataFrame(means, index=TIME_OF_DAY_OPTIONS, columns=WEEKDAY_LABELS),
+                pd.DataFrame(counts.astype(int), index=TIME_OF_DAY_OPTIONS, columns=WEEKDAY_LABELS)
+            )
+        return self._cached('heatmap', compute)
+
+    def user_stats(self) -> pd.DataFrame:
+        """Eine Zeile pro User (Sessions, Lerntage, Zeitraum, Summen) plus Lerntyp."""
+        def compute():
+            days = self.days()
+            if not days:
+                return pd.DataFrame(columns=['sessions', 'learning_days', 'span_days', 'duration_sum',
+                                             'rating_sum', 'cluster'])
+            summaries = [self.summaries[day] for day in days]
+            ordinals = np.array([date.fromisoformat(day).toordinal() for day in days])
+            lengths = [len(s['users']) for s in summaries]
+            partials = pd.DataFrame({
+                'user_id': np.concatenate([s['users'] for s in summaries]),
+                'day': np.repeat(ordinals, lengths),
+                'sessions': np.concatenate([s['user_sessions'] for s in summaries]),
+                'duration_sum': np.concatenate([s['user_duration_sum'] for s in summaries]),
+                'rating_sum': np.concatenate([s['user_rating_sum'] for s in summaries])
+            })
+            users = partials.groupby('user_id', sort=False).agg(
+                sessions=('sessions', 'sum'), learning_days=('day', 'size'),
+                first_day=('day', 'min'), last_day=('day', 'max'),
+                duration_sum=('duration_sum', 'sum'), rating_sum=('rating_sum', 'sum')
+            )
+            users['span_days'] = users['last_day'] - users['first_day'] + 1
+            users['cluster'] = assign_clusters_from_stats(
+                users['sessions'], users['learning_days'], users['span_days'],
+                users['duration_sum'] / users['sessions']
+            )
+            return users.drop(columns=['first_day', 'last_day'])
+        return self._cached('user_stats', compute)
+
+    def cluster_distribution(self) -> pd.DataFrame:
+        """User, Sessions, Ø Rating und Ø Dauer je Lerntyp ('–' = unter 3 Sessions)."""
+        def compute():
+            users = self.user_stats().assign(cluster=lambda u: u['cluster'].fillna('–'))
+            table = users.groupby('cluster').agg(
+                User=('sessions', 'size'), Sessions=('sessions', 'sum'),
+                rating_sum=('rating_sum', 'sum'), duration_sum=('duration_sum', 'sum')
+            )
+            table['Anteil User'] = table['User'] / max(1, table['User'].sum())
+            table['Ø Rating'] = table['rating_sum'] / table['Sessions']
+            table['Ø Dauer'] = table['duration_sum'] / table['Sessions']
+            table.index = [CLUSTER_NAMES.get(key, key) for key in table.index]
+            return table.drop(columns=['rating_sum', 'duration_sum'])
+        return self._cached('clusters', compute)
+
+    def adherence(self) -> pd.DataFrame:
+        """
+        Plantreue je Lerntyp aus dem Timer-Log: Fokuszeit vs. Plan,
+        Skip-Rate und pausierte Minuten je Lernblock.
+        """
+        def compute():
+            sessions = session_metrics(block_metrics(read_log(self.timer_log_path)))
+            if len(sessions) == 0:
+                return pd.DataFrame()
+            users = self.user_stats()
+            # Das Timer-Log kennt nur den User-Hash
+            hash_to_cluster = pd.Series(
+                users['cluster'].fillna('–').to_numpy(),
+                index=np.array([user_hash(user_id) for user_id in users.index], dtype=np.uint64)
+            )
+            sessions['cluster'] = hash_to_cluster.reindex(sessions['user'].to_numpy()).fillna('–').to_numpy()
+            sums = ['planned_min', 'focus_min', 'pause_min', 'blocks', 'skipped']
+            table = sessions.groupby('cluster')[sums].sum()
+            table.loc['Gesamt'] = sessions[sums].sum()
+            counts = sessions.groupby('cluster').size()
+            counts.loc['Gesamt'] = len(sessions)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = pd.DataFrame({
+                    'Sessions': counts,
+                    'Fokus vs. Plan': table['focus_min'] / table['planned_min'],
+                    'Skip-Rate': table['skipped'] / table['blocks'],
+                    'Ø Pause je Lernblock': table['pause_min'] / table['blocks']
+                })
+            result.index = [CLUSTER_NAMES.get(key, key) for key in result.index]
+            return result
+        return self._cached('adherence', compute)
+
+
+def ingest_histories(history_dir=HISTORY_DIR, cohort_dir=COHORT_DIR) -> int:
+    """Übernimmt alle gespeicherten User-Historien (wiederholbar, Duplikate fallen weg)."""
+    frames = [load_history(user_id, history_dir).assign(user_id=user_id) for user_id in list_users(history_dir)]
+    if not frames:
+        return 0
+    sessions = pd.concat(frames, ignore_index=True)
+    append_sessions(sessions, cohort_dir)
+    return len(sessions)
+
+
+def print_report(analytics: CohortAnalytics):
+    daily = analytics.daily()
+    users = analytics.user_stats()
+    print(f"👥 {len(users)} User, {daily['Sessions'].sum()} Sessions an {len(daily)} Tagen")
+    means, _ = analytics.heatmap()
+    print("\n📊 Ø Rating Tageszeit × Wochentag")
+    print(means.round(2).to_string())
+    print("\n🧭 Lerntypen")
+    print(analytics.cluster_distribution().round(2).to_string())
+    adherence = analytics.adherence()
+    if not adherence.empty:
+        print("\n⏱️ Plantreue")
+        print(adherence.round(2).to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kohorten-Auswertung über alle User.")
+    parser.add_argument('command', choices=['report', 'ingest', 'compact', 'simulate'])
+    parser.add_argument('--cohort-dir', default=None,
+                        help=f"Store (Standard: {COHORT_DIR}; simulate: temporäres Verzeichnis)")
+    parser.add_argument('--history-dir', default=HISTORY_DIR, help="ingest: Verzeichnis der User-Historien")
+    parser.add_argument('--users', type=int, default=20000, help="simulate: Anzahl User")
+    parser.add_argument('--days', type=int, default=90, help="simulate: Anzahl Tage")
+    args = parser.parse_args()
+    # Simulierte Sessions nie in den echten Store schreiben, außer explizit angegeben
+    simulate_dir = None
+    if args.cohort_dir is None:
+        if args.command == 'simulate':
+            simulate_dir = tempfile.mkdtemp(prefix='cohort-simulate-')
+        args.cohort_dir = simulate_dir or COHORT_DIR
+
+    if args.command == 'ingest':
+        count = ingest_histories(args.history_dir, args.cohort_dir)
+        print(f"✅ {count} Sessions aus '{args.history_dir}' übernommen")
+    elif args.command == 'compact':
+        print(f"✅ {compact(args.cohort_dir)} Partitionen zusammengefasst")
+    elif args.command == 'simulate':
+        # Lasttest: simulierte Population in den Store schreiben und Refresh/Abfragen messen
+        from simulate_users import simulate_population, to_history_frame
+
+        start = time.perf_counter()
+        sessions = to_history_frame(simulate_population(n_users=args.users, n_days=args.days, n_workers=1))
+        print(f"🔄 {len(sessions)} Sessions simuliert ({time.perf_counter() - start:.1f} s)")
+        start = time.perf_counter()
+        days = append_sessions(sessions, args.cohort_dir)
+        print(f"💾 {days} Tages-Partitionen geschrieben ({time.perf_counter() - start:.1f} s)")
+
+        analytics = CohortAnalytics(args.cohort_dir)
+        for label in ("Erster Refresh", "Refresh ohne Änderung"):
+            analytics.refresh()
+            print(f"⏱️ {label}: {analytics.last_refresh['changed']} Partitionen, "
+                  f"{analytics.last_refresh['seconds'] * 1000:.0f} ms")
+        start = time.perf_counter()
+        analytics.daily(), analytics.heatmap(), analytics.cluster_distribution()
+        print(f"⏱️ Abfragen: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        # Eine neue Session am letzten Tag → nur diese Partition wird neu zusammengefasst
+        latest = sessions.nlargest(1, 'timestamp')
+        append_sessions(latest.assign(timestamp=latest['timestamp'] - pd.Timedelta(seconds=1)), args.cohort_dir)
+        analytics.refresh()
+        print(f"⏱️ Refresh nach einer neuen Session: {analytics.last_refresh['changed']} Partition, "
+              f"{analytics.last_refresh['seconds'] * 1000:.0f} ms\n")
+        print_report(analytics)
+        if simulate_dir is not None:
+            shutil.rmtree(simulate_dir, ignore_errors=True)
+    else:
+        analytics = CohortAnalytics(args.cohort_dir)
+        analytics.refresh()
+        if not analytics.summaries:
+            print("Noch keine Sessions im Kohorten-Store (python cohort_analytics.py ingest).")
+        else:
+            print_report(analytics)
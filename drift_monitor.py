@@ -0,0 +1,251 @@
+# drift_monitor.py
+"""
+Streaming-Überwachung von Vorhersage vs. Feedback.
+
+Bei jedem Feedback wird das Residuum actual_rating − erwartetes Rating
+(Rating-Modell der ausgelieferten Modellversion) in exponentiell gewichtete
+laufende Statistiken (EWMA) einsortiert, getrennt nach Modellversion ×
+Tageszeit × Cluster. Nach einem Retrain startet die neue Version also mit
+eigenen Statistiken, ein altes Signal betrifft nur die alte Version.
+Ältere Feedbacks verlieren mit der Halbwertszeit half_life (in Feedbacks)
+an Gewicht, damit eine frische Drift auch nach langer Historie auffällt.
+Ein Update kostet O(1), es muss also nie die ganze Historie gescannt werden.
+
+Weicht der mittlere Fehler eines Segments deutlich von 0 ab, wird ein
+Retrain-Signal mit den betroffenen Versionen geschrieben
+(logs/retrain_signal.json).
+"""
+import json
+import math
+import os
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from history_store import FEEDBACK_REASONS
+
+DRIFT_STATE_PATH = os.path.join('logs', 'drift_state.json')
+RETRAIN_SIGNAL_PATH = os.path.join('logs', 'retrain_signal.json')
+
+OVERALL_SEGMENT = 'all|all'
+UNKNOWN_VERSION = 'unbekannt'
+
+
+@dataclass
+class RunningStats:
+    """
+    Exponentiell gewichteter Mittelwert und Varianz, plus (ebenso gewichtete)
+    Zähler der Feedback-Gründe. weight/weight_sq sind Summe der Gewichte und
+    ihrer Quadrate, daraus ergibt sich die effektive Stichprobengröße.
+    """
+    count: int = 0
+    mean: float = 0.0
+    var: float = 0.0
+    weight: float = 0.0
+    weight_sq: float = 0.0
+    reasons: list = field(default_factory=lambda: [0.0] * len(FEEDBACK_REASONS))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RunningStats':
+        if 'm2' in data:
+            # Alter Stand (Welford, ungewichtet): alle bisherigen Feedbacks mit Gewicht 1
+            count = data['count']
+            return cls(count, data['mean'], data['m2'] / count if count else 0.0, count, count, data['reasons'])
+        return cls(**data)
+
+    def update(self, value: float, reasons=(), decay=1.0):
+        self.count += 1
+        self.weight = decay * self.weight + 1.0
+        self.weight_sq = decay * decay * self.weight_sq + 1.0
+        alpha = 1.0 / self.weight
+        delta = value - self.mean
+        self.mean += alpha * delta
+        self.var = (1.0 - alpha) * (self.var + alpha * delta * delta)
+        self.reasons = [decay * count for count in self.reasons]
+        for reason in reasons:
+            if reason in FEEDBACK_REASONS:
+                self.reasons[FEEDBACK_REASONS.index(reason)] += 1
+
+    @property
+    def effective_count(self) -> float:
+        return self.weight ** 2 / self.weight_sq if self.weight_sq else 0.0
+
+    @property
+    def std(self) -> float:
+        # Erwartungstreu für Gewichte: Faktor W² / (W² − ΣW²)
+        denominator = self.weight ** 2 - self.weight_sq
+        return math.sqrt(self.var * self.weight ** 2 / denominator) if denominator > 1e-12 else 0.0
+
+    @property
+    def z_score(self) -> float:
+        """Wie viele Standardfehler liegt der mittlere Fehler von 0 entfernt?"""
+        if self.count < 2 or self.std == 0:
+            return 0.0
+        return self.mean / (self.std / math.sqrt(self.effective_count))
+
+
+def expected_rating(predictor, features: np.ndarray):
+    """Rating, das das Modell für diesen Feature-Vektor erwartet (None ohne Rating-Modell)."""
+    if not predictor.has_rating:
+        return None
+    return float(np.clip(predictor.predict_rating_batch(features[None, :])[0], 1, 10))
+
+
+class DriftMonitor:
+    """
+    Hält die EWMA-Statistiken pro Segment und persistiert sie nach jedem
+    Update. Behalten werden nur die keep_versions zuletzt aufgetauchten
+    Modellversionen (aktiv + Kandidat), die Datei bleibt also klein.
+    """
+
+    def __init__(self, state_path=DRIFT_STATE_PATH, signal_path=RETRAIN_SIGNAL_PATH,
+                 mean_threshold=1.0, z_threshold=3.0, min_samples=20, half_life=100, keep_versions=3):
+        self.state_path = state_path
+        self.signal_path = signal_path
+        self.mean_threshold = mean_threshold
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self.versions = []  # in der Reihenfolge des ersten Feedbacks
+        self.segments = {}
+        if os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            if 'segments' not in state:
+                # Alter Stand ohne Modellversion (Schlüssel Tageszeit|Cluster)
+                state = {'versions': [UNKNOWN_VERSION], 'segments': {
+                    f"{UNKNOWN_VERSION}|{key}": stats for key, stats in state.items()
+                }}
+            self.versions = state['versions']
+            self.segments = {key: RunningStats.from_dict(stats) for key, stats in state['segments'].items()}
+
+    @staticmethod
+    def segment_key(model_version, time_of_day, cluster) -> str:
+        return f"{model_version or UNKNOWN_VERSION}|{time_of_day}|{cluster or 'unbekannt'}"
+
+    def is_drifting(self, stats: RunningStats) -> bool:
+        return (
+            stats.count >= self.min_samples
+            and abs(stats.mean) >= self.mean_threshold
+            and abs(stats.z_score) >= self.z_threshold
+        )
+
+    def update(self, model_version, time_of_day, cluster, residual: float, reasons=()) -> list:
+        """
+        Nimmt ein Residuum (actual − erwartet von model_version) auf. Gibt die
+        Segmente zurück, die durch dieses Update neu in den Drift-Zustand
+        gekippt sind.
+        """
+        model_version = model_version or UNKNOWN_VERSION
+        newly_drifting = []
+        with self._lock:
+            if model_version not in self.versions:
+                self._add_version(model_version)
+            overall = f"{model_version}|{OVERALL_SEGMENT}"
+            for key in (self.segment_key(model_version, time_of_day, cluster), overall):
+                stats = self.segments.setdefault(key, RunningStats())
+                was_drifting = self.is_drifting(stats)
+                stats.update(residual, reasons, self.decay)
+                if not was_drifting and self.is_drifting(stats):
+                    newly_drifting.append(key)
+            self._save()
+            if newly_drifting:
+                self._signal_retrain(model_version, newly_drifting)
+        return newly_drifting
+
+    def _add_version(self, model_version):
+        self.versions.append(model_version)
+        dropped = self.versions[:-self.keep_versions]
+        self.versions = self.versions[-self.keep_versions:]
+        self.segments = {
+            key: stats for key, stats in self.segments.items() if key.split('|', 1)[0] not in dropped
+        }
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({
+                'versions': self.versions,
+                'segments': {key: asdict(stats) for key, stats in self.segments.items()}
+            }, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _signal_retrain(self, model_version, segments):
+        signal = self.retrain_signal() or {'model_versions': [], 'segments': []}
+        # Segmente von Versionen, die nicht mehr überwacht werden, fallen raus
+        kept = [version for version in signal.get('model_versions', []) if version in self.versions]
+        signal['model_versions'] = [version for version in kept if version != model_version] + [model_version]
+        signal['segments'] = sorted(
+            {key for key in signal['segments'] if key.split('|', 1)[0] in signal['model_versions']} | set(segments)
+        )
+        signal['raised_at'] = datetime.now().isoformat(timespec='seconds')
+        os.makedirs(os.path.dirname(self.signal_path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.signal_path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(signal, f, indent=2)
+        os.replace(tmp_path, self.signal_path)
+
+    def retrain_signal(self, model_versions=None):
+        """
+        Aktuelles Retrain-Signal oder None. Mit model_versions nur, wenn es
+        eine dieser Versionen betrifft (ein Retrain erledigt das Signal also).
+        """
+        if not os.path.exists(self.signal_path):
+            return None
+        with open(self.signal_path, encoding='utf-8') as f:
+            signal = json.load(f)
+        affected = signal.get('model_versions', [UNKNOWN_VERSION])
+        if model_versions is not None and not set(affected) & set(model_versions):
+            return None
+        return signal
+
+    def reset(self):
+        """Nach einem Retrain: Statistiken und Signal zurücksetzen."""
+        with self._lock:
+            self.versions = []
+            self.segments = {}
+            self._save()
+            if os.path.exists(self.signal_path):
+                os.remove(self.signal_path)
+
+    def summary(self, model_versions=None) -> pd.DataFrame:
+        """Übersicht pro Segment für das Dashboard, optional nur für model_versions."""
+        rows = []
+        for key, stats in sorted(self.segments.items()):
+            model_version, time_of_day, cluster = key.split('|')
+            if model_versions is not None and model_version not in model_versions:
+                continue
+            top_reason = FEEDBACK_REASONS[int(np.argmax(stats.reasons))] if any(stats.reasons) else ''
+            rows.append({
+                'Modell': model_version,
+                'Tageszeit': time_of_day,
+                'Cluster': cluster,
+                'Feedbacks': stats.count,
+                'Ø Fehler': round(stats.mean, 2),
+                'Streuung': round(stats.std, 2),
+                'z': round(stats.z_score, 1),
+                'Häufigster Grund': top_reason,
+                'Drift': '⚠️' if self.is_drifting(stats) else '✅'
+            })
+        return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import sys
+
+    monitor = DriftMonitor()
+    if len(sys.argv) > 1 and sys.argv[1] == 'reset':
+        monitor.reset()
+        print("✅ Drift-Statistiken zurückgesetzt")
+    else:
+        print(monitor.summary().to_string(index=False) if monitor.segments else "Noch keine Feedbacks.")
+        signal = monitor.retrain_signal()
+        if signal:
+            print(f"\n⚠️ Retrain empfohlen seit {signal['raised_at']}: {', '.join(signal['segments'])}")
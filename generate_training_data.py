@@ -2,8 +2,23 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
-# Seed für Reproduzierbarkeit
-np.random.seed(42)
+from clusters import CLUSTERS
+
+# Block- und Pausenlänge je Lerntyp aus den dokumentierten Profilen (clusters.py)
+CLUSTER_EFFECTS = {key.value: (profile.work_range, profile.break_range) for key, profile in CLUSTERS.items()}
+cluster_labels = list(CLUSTER_EFFECTS.keys())
+
+# Wertebereich der Roh-Formeln: Blockbasis 20–30 min × Tageszeit 0.5–1.2,
+# Pause 5 + (10 - Konzentration) × 1.5 bei Konzentration 9–4
+RAW_WORK_RANGE = (10.0, 36.0)
+RAW_BREAK_RANGE = (6.5, 14.0)
+
+
+def scale_to_range(raw, raw_range, target_range):
+    """Bildet den Roh-Wert linear auf den Bereich des Lerntyps ab (auch vektorisiert)."""
+    position = np.clip((np.asarray(raw, dtype=float) - raw_range[0]) / (raw_range[1] - raw_range[0]), 0, 1)
+    low, high = np.asarray(target_range[0]), np.asarray(target_range[1])
+    return np.rint(low + position * (high - low)).astype(int)
 
 def generate_learning_sessions(n_samples=500):
     """
@@ -29,6 +44,10 @@ def generate_learning_sessions(n_samples=500):
         
         # Rating der vorherigen Session (1-10)
         previous_rating = np.random.uniform(3, 9)
+
+        # Lerntyp-Cluster des Users (siehe clusters.py)
+        cluster = np.random.choice(cluster_labels, p=[0.35, 0.2, 0.45])
+        cluster_work_range, cluster_break_range = CLUSTER_EFFECTS[cluster]
         
         # OUTPUT LABELS (basierend auf Forschung simuliert)
         # Tageszeit-Faktor für Effizienz
@@ -50,13 +69,11 @@ def generate_learning_sessions(n_samples=500):
         else:
             work_block_base = 20  # Niedrige Konzentration = kürzere Blöcke
         
-        # Anpassung basierend auf Tageszeit
-        work_block_duration = int(work_block_base * time_factor)
-        work_block_duration = np.clip(work_block_duration, 15, 45)
+        # Anpassung basierend auf Tageszeit, dann in den Bereich des Lerntyps
+        work_block_duration = int(scale_to_range(work_block_base * time_factor, RAW_WORK_RANGE, cluster_work_range))
         
         # Pausen-Länge (Standard 5 min, aber länger bei niedrigerer Konzentration)
-        break_duration = int(5 + (10 - concentration_baseline) * 1.5)
-        break_duration = np.clip(break_duration, 5, 15)
+        break_duration = int(scale_to_range(5 + (10 - concentration_baseline) * 1.5, RAW_BREAK_RANGE, cluster_break_range))
         
         # Anzahl der Arbeitsblöcke
         cycle_duration = work_block_duration + break_duration
@@ -93,6 +110,7 @@ def generate_learning_sessions(n_samples=500):
             'concentration_baseline': round(concentration_baseline, 2),
             'days_since_last_session': days_since_last,
             'previous_session_rating': round(previous_rating, 2),
+            'cluster': cluster,
             
             # Labels
             'optimal_work_blocks': optimal_blocks,
@@ -104,14 +122,18 @@ def generate_learning_sessions(n_samples=500):
     
     return pd.DataFrame(data)
 
-# Daten generieren
-print("🔄 Generiere synthetische Trainingsdaten...")
-df = generate_learning_sessions(n_samples=500)
+if __name__ == "__main__":
+    # Seed für Reproduzierbarkeit
+    np.random.seed(42)
+
+    # Daten generieren
+    print("🔄 Generiere synthetische Trainingsdaten...")
+    df = generate_learning_sessions(n_samples=500)
 
-# Speichern
-df.to_csv('learning_sessions_data.csv', index=False)
-print(f"✅ {len(df)} Trainingsbeispiele erstellt und gespeichert!")
-print("\n📊 Erste 5 Zeilen:")
-print(df.head())
-print("\n📈 Statistiken:")
-print(df.describe())
\ No newline at end of file
+    # Speichern
+    df.to_csv('learning_sessions_data.csv', index=False)
+    print(f"✅ {len(df)} Trainingsbeispiele erstellt und gespeichert!")
+    print("\n📊 Erste 5 Zeilen:")
+    print(df.head())
+    print("\n📈 Statistiken:")
+    print(df.describe())
\ No newline at end of file
@@ -0,0 +1,172 @@
+# history_aggregates.py
+"""
+Inkrementell gepflegte Kennzahlen zur Session-Historie.
+
+Statt bei jedem Rerun die ganze Historie zu scannen, hält HistoryAggregates
+Zähler und Summen, die bei jedem neuen Feedback in O(1) aktualisiert werden:
+Ø Rating/Dauer, Tages-Buckets der letzten 30 Tage (für 7-/30-Tage-Mittel),
+Lern-Streaks, Wochentag × Tageszeit und Nennungen der Feedback-Gründe.
+
+Die Kennzahlen liegen als JSON neben der Parquet-Historie
+(data/history/<user>.stats.json). Passt der Zähler nicht zur Historie
+(z.B. ältere Historie ohne Stats-Datei), wird einmal neu aufgebaut.
+"""
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from history_store import FEEDBACK_REASONS, HISTORY_DIR, REASON_BITS, valid_user_id
+from plan_model import TIME_OF_DAY_OPTIONS
+
+ROLLING_WINDOW_DAYS = 30
+
+
+def _cells():
+    return [[0.0] * 7 for _ in TIME_OF_DAY_OPTIONS]
+
+
+@dataclass
+class HistoryAggregates:
+    """Laufende Summen über alle Sessions eines Users."""
+    count: int = 0
+    rating_sum: float = 0.0
+    duration_sum: float = 0.0
+    last_timestamp: str = None
+    # ISO-Datum → [Sessions, Rating-Summe], nur die letzten ROLLING_WINDOW_DAYS Tage
+    daily: dict = field(default_factory=dict)
+    streak: int = 0
+    longest_streak: int = 0
+    # Zeilen = TIME_OF_DAY_OPTIONS, Spalten = Wochentag (Mo=0)
+    cell_count: list = field(default_factory=_cells)
+    cell_rating_sum: list = field(default_factory=_cells)
+    cell_last_rating: list = field(default_factory=lambda: [[None] * 7 for _ in TIME_OF_DAY_OPTIONS])
+    reason_count: list = field(default_factory=lambda: [0] * len(FEEDBACK_REASONS))
+    reason_rating_sum: list = field(default_factory=lambda: [0.0] * len(FEEDBACK_REASONS))
+
+    def update(self, timestamp, total_duration, time_of_day, actual_rating, feedback_mask: int):
+        """Nimmt eine neue Session auf (Einträge kommen chronologisch)."""
+        timestamp = pd.Timestamp(timestamp)
+        rating = float(actual_rating)
+        day = timestamp.date()
+
+        self.count += 1
+        self.rating_sum += rating
+        self.duration_sum += float(total_duration)
+
+        last_day = pd.Timestamp(self.last_timestamp).date() if self.last_timestamp else None
+        if last_day is None or (day - last_day).days > 1:
+            self.streak = 1
+        elif (day - last_day).days == 1:
+            self.streak += 1
+        self.longest_streak = max(self.longest_streak, self.streak)
+        self.last_timestamp = timestamp.isoformat()
+
+        bucket = self.daily.setdefault(day.isoformat(), [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += rating
+        cutoff = (day - timedelta(days=ROLLING_WINDOW_DAYS - 1)).isoformat()
+        self.daily = {d: b for d, b in self.daily.items() if d >= cutoff}
+
+        if time_of_day in TIME_OF_DAY_OPTIONS:
+            row, column = TIME_OF_DAY_OPTIONS.index(time_of_day), timestamp.weekday()
+            self.cell_count[row][column] += 1
+            self.cell_rating_sum[row][column] += rating
+            self.cell_last_rating[row][column] = rating
+
+        for i, bit in enumerate(REASON_BITS):
+            if int(feedback_mask) & int(bit):
+                self.reason_count[i] += 1
+                self.reason_rating_sum[i] += rating
+
+    @classmethod
+    def from_history(cls, history: pd.DataFrame) -> 'HistoryAggregates':
+        """Einmaliger Neuaufbau aus der kompletten Historie."""
+        aggregates = cls()
+        ordered = history.sort_values('timestamp', kind='stable')
+        for row in ordered.itertuples(index=False):
+            aggregates.update(row.timestamp, row.total_duration, row.time_of_day, row.actual_rating, row.feedback)
+        return aggregates
+
+    @property
+    def avg_rating(self) -> float:
+        return self.rating_sum / self.count if self.count else float('nan')
+
+    @property
+    def avg_duration(self) -> float:
+        return self.duration_sum / self.count if self.count else float('nan')
+
+    def rolling_mean(self, days: int, today: date = None) -> float:
+        """Ø Rating der letzten `days` Tage (inkl. heute), NaN ohne Sessions."""
+        today = today or datetime.now().date()
+        cutoff = (today - timedelta(days=days - 1)).isoformat()
+        buckets = [b for d, b in self.daily.items() if d >= cutoff]
+        sessions = sum(b[0] for b in buckets)
+        return sum(b[1] for b in buckets) / sessions if sessions else float('nan')
+
+    def current_streak(self, today: date = None) -> int:
+        """Streak zählt nur, wenn heute oder gestern gelernt wurde."""
+        if not self.last_timestamp:
+            return 0
+        today = today or datetime.now().date()
+        return self.streak if (today - pd.Timestamp(self.last_timestamp).date()).days <= 1 else 0
+
+    def calendar(self, statistic='last') -> pd.DataFrame:
+        """Tageszeit × Wochentag: letztes Rating ('last') oder Ø Rating ('mean')."""
+        if statistic == 'mean':
+            counts = np.array(self.cell_count)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = np.array(self.cell_rating_sum) / counts
+        else:
+            values = np.array(self.cell_last_rating, dtype=float)
+        return pd.DataFrame(values, index=TIME_OF_DAY_OPTIONS, columns=range(7))
+
+    def reason_frequencies(self) -> pd.Series:
+        return pd.Series(self.reason_count, index=FEEDBACK_REASONS, name='Nennungen')
+
+    def reason_rating_impact(self) -> pd.DataFrame:
+        """Wie history_store.reason_rating_impact, aber aus den Summen."""
+        with_count = np.array(self.reason_count, dtype=float)
+        with_sum = np.array(self.reason_rating_sum)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            with_mean = with_sum / with_count
+            without_mean = (self.rating_sum - with_sum) / (self.count - with_count)
+        return pd.DataFrame({
+            'Nennungen': with_count.astype(int),
+            'Ø Rating mit Grund': with_mean,
+            'Ø Rating ohne Grund': without_mean,
+            'Differenz': with_mean - without_mean
+        }, index=FEEDBACK_REASONS)
+
+
+def aggregates_path(user_id, history_dir=HISTORY_DIR) -> str:
+    if not valid_user_id(user_id):
+        raise ValueError(f"Ungültige User-ID: {user_id!r}")
+    return os.path.join(history_dir, f"{user_id}.stats.json")
+
+
+def save_aggregates(user_id, aggregates: HistoryAggregates, history_dir=HISTORY_DIR):
+    path = aggregates_path(user_id, history_dir)
+    os.makedirs(history_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=history_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(asdict(aggregates), f)
+    os.replace(tmp_path, path)
+
+
+def load_aggregates(user_id, history: pd.DataFrame, history_dir=HISTORY_DIR) -> HistoryAggregates:
+    """Gespeicherte Kennzahlen oder Neuaufbau, falls sie nicht zur Historie passen."""
+    path = aggregates_path(user_id, history_dir)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            aggregates = HistoryAggregates(**json.load(f))
+        if aggregates.count == len(history):
+            return aggregates
+    aggregates = HistoryAggregates.from_history(history)
+    if len(history) > 0:
+        save_aggregates(user_id, aggregates, history_dir)
+    return aggregates
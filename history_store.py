@@ -0,0 +1,265 @@
+# history_store.py
+"""
+Kompaktes, typisiertes Schema für die Session-Historie.
+
+Statt eines object-DataFrames mit Strings speichert die Historie feste
+dtypes: Tageszeit als Categorical (int8-Codes), Ratings als float32,
+Zeitstempel als datetime64 und die acht Feedback-Gründe als Bitmaske in
+einem uint8. Auswertungen über die Gründe sind dadurch reine Bit-Operationen.
+
+Die Historie wird pro User als Parquet-Datei gespeichert (dtypes bleiben erhalten).
+Neue Sessions landen als kleine Part-Dateien in <user>.parts/ und werden
+ab MAX_PARTS Stück in die Basisdatei kompaktiert; alle Schreibzugriffe
+laufen unter einem Datei-Lock pro User.
+"""
+import os
+import re
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from file_lock import FileLock
+from plan_model import TIME_OF_DAY_OPTIONS
+
+HISTORY_DIR = os.path.join('data', 'history')
+
+# Ab so vielen Anhängen wird in die Basisdatei kompaktiert
+MAX_PARTS = 32
+
+# User-IDs landen in Dateinamen (Historie, Stats) und Journalen, daher nur dieses Alphabet
+USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+FEEDBACK_REASONS = [
+    "Zu lange Lernblöcke",
+    "Zu kurze Pausen",
+    "Zu späte Uhrzeit",
+    "Zu frühe Uhrzeit",
+    "Zu wenig Schlaf",
+    "Ablenkungen",
+    "Schwieriges Thema",
+    "Andere"
+]
+
+TIME_OF_DAY_DTYPE = pd.CategoricalDtype(TIME_OF_DAY_OPTIONS)
+
+HISTORY_SCHEMA = {
+    'timestamp': 'datetime64[ns]',
+    'total_duration': 'int16',
+    'time_of_day': TIME_OF_DAY_DTYPE,
+    'concentration_baseline': 'float32',
+    'days_since_last': 'int16',
+    'previous_rating': 'float32',
+    'actual_rating': 'float32',
+    'feedback': 'uint8'
+}
+
+# Bit i ↔ FEEDBACK_REASONS[i]
+REASON_BITS = np.left_shift(1, np.arange(len(FEEDBACK_REASONS))).astype(np.uint8)
+
+# Vorberechneter Text für jede der 256 möglichen Masken (Anzeige per Lookup)
+REASON_TEXT = np.array([
+    ', '.join(reason for reason, bit in zip(FEEDBACK_REASONS, REASON_BITS) if mask & bit)
+    for mask in range(256)
+], dtype=object)
+
+
+def encode_reasons(reasons) -> int:
+    """Liste von Gründen → Bitmaske."""
+    mask = 0
+    for reason in reasons:
+        mask |= int(REASON_BITS[FEEDBACK_REASONS.index(reason)])
+    return mask
+
+
+def decode_reasons(mask: int) -> list:
+    """Bitmaske → Liste von Gründen."""
+    return [reason for reason, bit in zip(FEEDBACK_REASONS, REASON_BITS) if mask & bit]
+
+
+def reasons_text(masks) -> np.ndarray:
+    """Vektorisiert: Masken → kommagetrennter Text wie in der alten Historie."""
+    return REASON_TEXT[np.asarray(masks, dtype=np.uint8)]
+
+
+def empty_history() -> pd.DataFrame:
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in HISTORY_SCHEMA.items()})
+
+
+def to_typed_history(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bringt eine Historie in das kompakte Schema. Feedback als Text
+    (altes Format "Grund A, Grund B") wird dabei in Bitmasken umgewandelt.
+    Zusätzliche Spalten (z.B. user_id) bleiben erhalten.
+    """
+    history = history.copy()
+    if history['feedback'].dtype == object:
+        history['feedback'] = [
+            encode_reasons([r for r in str(text).split(', ') if r]) if pd.notna(text) else 0
+            for text in history['feedback']
+        ]
+    history['timestamp'] = pd.to_datetime(history['timestamp'])
+    return history.astype(HISTORY_SCHEMA)
+
+
+def make_entry(timestamp, total_duration, time_of_day, concentration, days_since, previous_rating,
+               actual_rating, reasons) -> pd.DataFrame:
+    """Eine neue Zeile im kompakten Schema."""
+    return pd.DataFrame({
+        'timestamp': [timestamp],
+        'total_duration': [total_duration],
+        'time_of_day': [time_of_day],
+        'concentration_baseline': [concentration],
+        'days_since_last': [days_since],
+        'previous_rating': [previous_rating],
+        'actual_rating': [actual_rating],
+        'feedback': [encode_reasons(reasons)]
+    }).astype(HISTORY_SCHEMA)
+
+
+def append_entry(history: pd.DataFrame, entry: pd.DataFrame) -> pd.DataFrame:
+    if len(history) == 0:
+        return entry.reset_index(drop=True)
+    return pd.concat([history, entry], ignore_index=True)
+
+
+def valid_user_id(user_id) -> bool:
+    return isinstance(user_id, str) and USER_ID_PATTERN.fullmatch(user_id) is not None
+
+
+def history_path(user_id, history_dir=HISTORY_DIR) -> str:
+    if not valid_user_id(user_id):
+        raise ValueError(f"Ungültige User-ID: {user_id!r}")
+    return os.path.join(history_dir, f"{user_id}.parquet")
+
+
+def parts_dir(user_id, history_dir=HISTORY_DIR) -> str:
+    """Verzeichnis der noch nicht kompaktierten Anhänge eines Users."""
+    return history_path(user_id, history_dir)[:-len('.parquet')] + '.parts'
+
+
+def _history_lock(user_id, history_dir) -> FileLock:
+    # Ein Lock pro User, auch zwischen Prozessen (mehrere App-Worker, CLI-Exporte)
+    return FileLock(history_path(user_id, history_dir)[:-len('.parquet')] + '.lock')
+
+
+def _part_files(directory) -> list:
+    """Sortiert = in Schreib-Reihenfolge (Dateiname beginnt mit time_ns)."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.endswith('.parquet'))
+
+
+def _write_parquet(frame: pd.DataFrame, directory, target):
+    """Eindeutige Temp-Datei im Zielverzeichnis, dann atomar ersetzen."""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _read_unlocked(user_id, history_dir) -> pd.DataFrame:
+    path = history_path(user_id, history_dir)
+    directory = parts_dir(user_id, history_dir)
+    frames = [pd.read_parquet(path)] if os.path.exists(path) else []
+    frames += [pd.read_parquet(os.path.join(directory, name)) for name in _part_files(directory)]
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return empty_history()
+    return to_typed_history(pd.concat(frames, ignore_index=True))
+
+
+def load_history(user_id, history_dir=HISTORY_DIR) -> pd.DataFrame:
+    """Basisdatei plus alle Anhänge in Schreib-Reihenfolge."""
+    if not (os.path.exists(history_path(user_id, history_dir)) or os.path.isdir(parts_dir(user_id, history_dir))):
+        return empty_history()
+    with _history_lock(user_id, history_dir):
+        return _read_unlocked(user_id, history_dir)
+
+
+def _compact_unlocked(user_id, history_dir):
+    directory = parts_dir(user_id, history_dir)
+    merged = _part_files(directory)
+    history = _read_unlocked(user_id, history_dir)
+    _write_parquet(history, history_dir, history_path(user_id, history_dir))
+    for name in merged:
+        os.unlink(os.path.join(directory, name))
+
+
+def append_history(user_id, entries: pd.DataFrame, history_dir=HISTORY_DIR, max_parts=MAX_PARTS):
+    """
+    Hängt neue Sessions als eigene kleine Part-Datei an, statt die ganze
+    Historie neu zu schreiben. Ab max_parts Anhängen wird in die Basisdatei
+    kompaktiert (ein Rewrite pro max_parts Feedbacks).
+    """
+    directory = parts_dir(user_id, history_dir)
+    os.makedirs(directory, exist_ok=True)
+    with _history_lock(user_id, history_dir):
+        name = f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+        _write_parquet(entries, directory, os.path.join(directory, name))
+        if len(_part_files(directory)) >= max_parts:
+            _compact_unlocked(user_id, history_dir)
+
+
+def compact_history(user_id, history_dir=HISTORY_DIR):
+    """Führt alle Anhänge in die Basisdatei zusammen."""
+    os.makedirs(history_dir, exist_ok=True)
+    with _history_lock(user_id, history_dir):
+        _compact_unlocked(user_id, history_dir)
+
+
+def save_history(user_id, history: pd.DataFrame, history_dir=HISTORY_DIR):
+    """Ersetzt die komplette Historie (Basisdatei neu, Anhänge verworfen)."""
+    os.makedirs(history_dir, exist_ok=True)
+    directory = parts_dir(user_id, history_dir)
+    with _history_lock(user_id, history_dir):
+        stale = _part_files(directory)
+        _write_parquet(history, history_dir, history_path(user_id, history_dir))
+        for name in stale:
+            os.unlink(os.path.join(directory, name))
+
+
+def list_users(history_dir=HISTORY_DIR) -> list:
+    """Alle User mit gespeicherter Historie (Basisdatei oder nur Anhänge)."""
+    if not os.path.isdir(history_dir):
+        return []
+    users = set()
+    for name in os.listdir(history_dir):
+        for suffix in ('.parquet', '.parts'):
+            if name.endswith(suffix) and valid_user_id(name[:-len(suffix)]):
+                users.add(name[:-len(suffix)])
+    return sorted(users)
+
+
+def reason_matrix(masks) -> np.ndarray:
+    """(n, 8)-bool-Matrix: Zeile = Session, Spalte = Feedback-Grund."""
+    return (np.asarray(masks, dtype=np.uint8)[:, None] & REASON_BITS) != 0
+
+
+def reason_frequencies(history: pd.DataFrame) -> pd.Series:
+    """Wie oft wurde jeder Grund genannt?"""
+    counts = reason_matrix(history['feedback']).sum(axis=0)
+    return pd.Series(counts, index=FEEDBACK_REASONS, name='Nennungen')
+
+
+def reason_rating_impact(history: pd.DataFrame) -> pd.DataFrame:
+    """Ø Rating von Sessions mit vs. ohne den jeweiligen Grund."""
+    matrix = reason_matrix(history['feedback'])
+    ratings = history['actual_rating'].to_numpy(dtype=np.float64)[:, None]
+    with_count = matrix.sum(axis=0)
+    without_count = len(matrix) - with_count
+    with np.errstate(invalid='ignore', divide='ignore'):
+        with_mean = (matrix * ratings).sum(axis=0) / with_count
+        without_mean = (~matrix * ratings).sum(axis=0) / without_count
+    return pd.DataFrame({
+        'Nennungen': with_count,
+        'Ø Rating mit Grund': with_mean,
+        'Ø Rating ohne Grund': without_mean,
+        'Differenz': with_mean - without_mean
+    }, index=FEEDBACK_REASONS)
@@ -0,0 +1,96 @@
+# history_table.py
+"""
+Paginierte Session-Historie mit Filtern und Sortierung auf dem Server.
+
+HistoryIndex wird einmal pro Historien-Version gebaut und hält die
+Sortier-Permutationen der sortierbaren Spalten. Ein Zeitraum-Filter ist
+damit eine binäre Suche, die übrigen Filter sind Bit-/Vergleichsmasken,
+und die Sortierung braucht kein erneutes Sortieren. Formatiert wird nur
+die sichtbare Seite.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from history_store import FEEDBACK_REASONS, REASON_BITS, reasons_text
+
+SORT_COLUMNS = {
+    'Datum': 'timestamp',
+    'Dauer': 'total_duration',
+    'Rating': 'actual_rating',
+    'Konzentration': 'concentration_baseline'
+}
+
+PAGE_SIZES = [10, 25, 50, 100]
+
+
+class HistoryIndex:
+    """Read-only Index über eine Historie im kompakten Schema."""
+
+    def __init__(self, history: pd.DataFrame):
+        self.history = history.reset_index(drop=True)
+        self.timestamps = self.history['timestamp'].to_numpy(dtype='datetime64[ns]')
+        self.time_codes = self.history['time_of_day'].cat.codes.to_numpy()
+        self.time_categories = list(self.history['time_of_day'].cat.categories)
+        self.ratings = self.history['actual_rating'].to_numpy()
+        self.feedback = self.history['feedback'].to_numpy()
+        self.orders = {
+            column: np.argsort(self.history[column].to_numpy(), kind='stable')
+            for column in SORT_COLUMNS.values()
+        }
+        self.sorted_timestamps = self.timestamps[self.orders['timestamp']]
+
+    def __len__(self):
+        return len(self.history)
+
+    def query(self, start=None, end=None, times_of_day=None, rating_range=None, reason=None,
+              sort_by='timestamp', descending=True) -> np.ndarray:
+        """
+        Zeilenpositionen, die alle Filter erfüllen, in Sortierreihenfolge.
+        start/end sind Datumsgrenzen (end inklusive).
+        """
+        lo, hi = 0, len(self)
+        if start is not None:
+            lo = np.searchsorted(self.sorted_timestamps, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        if end is not None:
+            end_exclusive = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+            hi = np.searchsorted(self.sorted_timestamps, np.datetime64(end_exclusive, 'ns'), side='left')
+
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.orders['timestamp'][lo:hi]] = True
+        if times_of_day:
+            codes = [self.time_categories.index(t) for t in times_of_day if t in self.time_categories]
+            mask &= np.isin(self.time_codes, codes)
+        if rating_range is not None:
+            mask &= (self.ratings >= rating_range[0]) & (self.ratings <= rating_range[1])
+        if reason is not None:
+            mask &= (self.feedback & REASON_BITS[FEEDBACK_REASONS.index(reason)]) != 0
+
+        order = self.orders[sort_by]
+        positions = order[mask[order]]
+        return positions[::-1] if descending else positions
+
+    def page(self, positions: np.ndarray, page: int, page_size: int) -> pd.DataFrame:
+        """Formatiert nur die Zeilen der angefragten Seite (page ab 1)."""
+        rows = self.history.iloc[positions[(page - 1) * page_size:page * page_size]]
+        return format_history_rows(rows)
+
+
+def page_count(n_rows: int, page_size: int) -> int:
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def format_history_rows(rows: pd.DataFrame) -> pd.DataFrame:
+    """Anzeige-Spalten wie in der bisherigen Session-Historie."""
+    return pd.DataFrame({
+        'Datum': rows['timestamp'].dt.strftime("%d.%m.%Y"),
+        'Uhrzeit': rows['timestamp'].dt.strftime("%H.%M"),
+        'Dauer (min)': rows['total_duration'],
+        'Tageszeit': rows['time_of_day'],
+        'Konzentration': rows['concentration_baseline'],
+        'Tage seither': rows['days_since_last'],
+        'Vorheriges Rating': rows['previous_rating'],
+        'Aktuelles Rating': rows['actual_rating'],
+        'Feedback': reasons_text(rows['feedback'])
+    })
@@ -0,0 +1,302 @@
+# model_registry.py
+"""
+Versionierte Modell-Artefakte mit Hot-Reload.
+
+Aufbau des Registry-Verzeichnisses:
+
+    models/
+    ├── manifest.json          # {"current": "v0002", "previous": "v0001", "versions": [...],
+    │                          #  optional "candidate": "v0003", "candidate_fraction": 0.1}
+    ├── v0001/
+    │   ├── learning_models.pkl
+    │   └── metadata.json      # Daten-Hash, Metriken aus train_model.py, Zeitpunkt
+    └── v0002/ ...
+
+train_model.py veröffentlicht neue Versionen, die laufende App prüft per
+mtime des Manifests (gedrosselt) ob sich etwas geändert hat, lädt die neue
+Version vollständig vor und tauscht sie dann in einem Schritt aus.
+Timer-State der User bleibt dabei erhalten, weil der Server weiterläuft.
+Lässt sich eine neue Version nicht laden, bleibt die bisherige aktiv.
+Änderungen am Manifest laufen unter manifest.lock (file_lock.py).
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from file_lock import FileLock
+from plan_model import PlanPredictor
+
+REGISTRY_DIR = 'models'
+ARTIFACT_NAME = 'learning_models.pkl'
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'manifest.lock'
+LEGACY_VERSION = 'legacy'
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 einer Datei (z.B. der Trainingsdaten)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path: str, data: dict):
+    """Schreibt erst in eine Temp-Datei und ersetzt dann atomar."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def manifest_lock(registry_dir=REGISTRY_DIR) -> FileLock:
+    """Serialisiert alle Änderungen am Manifest (auch zwischen Prozessen)."""
+    return FileLock(os.path.join(registry_dir, LOCK_NAME), timeout=60.0)
+
+
+def _next_version(manifest: dict, registry_dir) -> str:
+    # Auch Verzeichnisse ohne Manifest-Eintrag (abgebrochene Veröffentlichung) überspringen
+    number = len(manifest['versions']) + 1
+    while os.path.exists(os.path.join(registry_dir, f"v{number:04d}")):
+        number += 1
+    return f"v{number:04d}"
+
+
+def read_manifest(registry_dir=REGISTRY_DIR) -> dict:
+    path = os.path.join(registry_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'current': None, 'previous': None, 'versions': []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_metadata(version: str, registry_dir=REGISTRY_DIR) -> dict:
+    with open(os.path.join(registry_dir, version, 'metadata.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def publish_version(models: dict, metrics: dict, data_path: str, registry_dir=REGISTRY_DIR, activate=True) -> str:
+    """
+    Legt eine neue Version an und macht sie (optional) zur aktuellen.
+
+    Das Versionsverzeichnis wird zuerst unter einem Temp-Namen geschrieben,
+    damit die App nie ein halb geschriebenes Artefakt sieht.
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=registry_dir, prefix='.tmp-')
+    with open(os.path.join(tmp_dir, ARTIFACT_NAME), 'wb') as f:
+        pickle.dump(models, f)
+    data_hash = file_hash(data_path)
+
+    # Version vergeben, umbenennen und Manifest schreiben in einem Lock-Abschnitt,
+    # damit parallele Veröffentlichungen nicht dieselbe Nummer bekommen
+    with manifest_lock(registry_dir):
+        manifest = read_manifest(registry_dir)
+        version = _next_version(manifest, registry_dir)
+        _write_json_atomic(os.path.join(tmp_dir, 'metadata.json'), {
+            'version': version,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'data_path': data_path,
+            'data_hash': data_hash,
+            'feature_columns': list(models['feature_columns']),
+            'metrics': metrics
+        })
+        os.rename(tmp_dir, os.path.join(registry_dir, version))
+
+        manifest['versions'].append(version)
+        if activate:
+            manifest['previous'] = manifest['current']
+            manifest['current'] = version
+        _write_json_atomic(os.path.join(registry_dir, MANIFEST_NAME), manifest)
+    return version
+
+
+def _activate(manifest: dict, version: str, registry_dir):
+    if version not in manifest['versions']:
+        raise ValueError(f"Unbekannte Modell-Version: {version}")
+    if version != manifest['current']:
+        manifest['previous'] = manifest['current']
+        manifest['current'] = version
+        _write_json_atomic(os.path.join(registry_dir, MANIFEST_NAME), manifest)
+
+
+def activate_version(version: str, registry_dir=REGISTRY_DIR):
+    """Macht eine vorhandene Version zur aktuellen (z.B. Promote eines Kandidaten)."""
+    with manifest_lock(registry_dir):
+        _activate(read_manifest(registry_dir), version, registry_dir)
+
+
+def set_candidate(version, fraction: float, registry_dir=REGISTRY_DIR):
+    """
+    Setzt eine Kandidaten-Version für A/B-Routing und Shadow-Evaluation
+    (siehe ab_testing.py). version=None beendet den Test.
+    """
+    if not 0.0 <= fraction <= 1.0:
+        raise ValueError("Der Anteil muss zwischen 0 und 1 liegen.")
+    with manifest_lock(registry_dir):
+        manifest = read_manifest(registry_dir)
+        if version is not None and version not in manifest['versions']:
+            raise ValueError(f"Unbekannte Modell-Version: {version}")
+        manifest['candidate'] = version
+        manifest['candidate_fraction'] = fraction if version is not None else 0.0
+        _write_json_atomic(os.path.join(registry_dir, MANIFEST_NAME), manifest)
+
+
+def rollback(registry_dir=REGISTRY_DIR) -> str:
+    """Wechselt zurück auf die vorherige Version."""
+    with manifest_lock(registry_dir):
+        manifest = read_manifest(registry_dir)
+        previous = manifest['previous']
+        if not previous:
+            raise ValueError("Keine vorherige Modell-Version vorhanden.")
+        _activate(manifest, previous, registry_dir)
+    return previous
+
+
+def load_artifact(version: str, registry_dir=REGISTRY_DIR, legacy_path=ARTIFACT_NAME) -> dict:
+    path = legacy_path if version == LEGACY_VERSION else os.path.join(registry_dir, version, ARTIFACT_NAME)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class LoadedModel:
+    """Ein geladenes Artefakt samt vorbereitetem Predictor."""
+
+    def __init__(self, version: str, models: dict):
+        self.version = version
+        self.models = models
+        self.predictor = PlanPredictor(models)
+        # Einmal vorrechnen, damit der erste echte Request nicht bezahlt
+        self.predictor.predict(np.asarray(self.predictor.mean))
+
+
+class ModelRegistry:
+    """
+    Hält die aktuelle Modell-Version im Prozess und tauscht sie bei Änderungen.
+
+    current() ist für jeden Rerun gedacht: es kostet höchstens ein os.stat
+    (gedrosselt auf check_interval Sekunden). Die zuletzt aktive Version
+    bleibt geladen, damit ein Rollback ohne Ladezeit greift.
+    """
+
+    def __init__(self, registry_dir=REGISTRY_DIR, legacy_path=ARTIFACT_NAME, check_interval=2.0):
+        self.registry_dir = registry_dir
+        self.legacy_path = legacy_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loaded = {}
+        self._active = None
+        self._previous = None
+        self._candidate = None
+        self.candidate_fraction = 0.0
+        self._manifest_mtime = None
+        self._last_check = 0.0
+        self.refresh(force=True)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.registry_dir, MANIFEST_NAME)
+
+    def _get_loaded(self, version: str) -> LoadedModel:
+        if version not in self._loaded:
+            self._loaded[version] = LoadedModel(
+                version, load_artifact(version, self.registry_dir, self.legacy_path)
+            )
+        return self._loaded[version]
+
+    def refresh(self, force=False):
+        """Prüft das Manifest und tauscht bei Bedarf die aktive Version aus."""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if not force and mtime == self._manifest_mtime:
+            return
+
+        with self._lock:
+            # Erst alles vollständig laden, dann tauschen: schlägt etwas fehl, bleibt der alte Stand
+            try:
+                manifest = read_manifest(self.registry_dir)
+                version = manifest['current'] or LEGACY_VERSION
+                active = self._get_loaded(version)
+                candidate = manifest.get('candidate')
+                candidate = self._get_loaded(candidate) if candidate and candidate != version else None
+            except Exception:
+                if self._active is None:
+                    raise  # Ohne lauffähige Version kann die App nicht starten
+                # Neuer Versuch erst bei der nächsten Änderung des Manifests
+                logger.exception("Modell-Registry: neue Version nicht ladbar, bleibe bei %s", self._active.version)
+                self._manifest_mtime = mtime
+                return
+
+            if active is not self._active:
+                # Referenz-Tausch in einem Schritt; laufende Requests behalten ihr Objekt.
+                # Die bisherige Version bleibt als vorherige für Rollbacks geladen.
+                self._previous = self._active
+                self._active = active
+            self._candidate = candidate
+            self.candidate_fraction = manifest.get('candidate_fraction', 0.0) if self._candidate else 0.0
+
+            # Nur aktuelle, vorherige und Kandidaten-Version im Speicher halten
+            keep = {model.version for model in (self._active, self._previous, self._candidate) if model is not None}
+            self._loaded = {v: m for v, m in self._loaded.items() if v in keep}
+            self._manifest_mtime = mtime
+
+    def current(self) -> LoadedModel:
+        self.refresh()
+        return self._active
+
+    def candidate(self):
+        """Kandidaten-Version für A/B-Tests oder None."""
+        self.refresh()
+        return self._candidate
+
+    def get(self, version: str) -> LoadedModel:
+        """Lädt eine bestimmte Version (z.B. einen Kandidaten), ohne sie zu aktivieren."""
+        with self._lock:
+            return self._get_loaded(version)
+
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'list':
+        manifest = read_manifest()
+        for version in manifest['versions']:
+            metadata = read_metadata(version)
+            marker = '*' if version == manifest['current'] else ('~' if version == manifest.get('candidate') else ' ')
+            r2 = ', '.join(f"{target} R²={m['r2']:.3f}" for target, m in metadata['metrics'].items())
+            print(f"{marker} {version}  {metadata['created_at']}  {metadata['data_hash'][:10]}  {r2}")
+    elif command == 'rollback':
+        print(f"✅ Aktive Version: {rollback()}")
+    elif command == 'activate':
+        activate_version(sys.argv[2])
+        print(f"✅ Aktive Version: {sys.argv[2]}")
+    elif command == 'candidate':
+        if len(sys.argv) > 2 and sys.argv[2] != 'none':
+            fraction = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+            set_candidate(sys.argv[2], fraction)
+            print(f"✅ Kandidat {sys.argv[2]} bekommt {fraction:.0%} der User")
+        else:
+            set_candidate(None, 0.0)
+            print("✅ A/B-Test beendet")
+    else:
+        print("Nutzung: python model_registry.py [list | rollback | activate <version> | candidate <version|none> [anteil]]")
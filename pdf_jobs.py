@@ -0,0 +1,140 @@
+# pdf_jobs.py
+"""
+Hintergrund-Queue für den Anki-PDF-Import.
+
+Uploads werden als Job mit ID eingereiht und von einem kleinen Thread-Pool
+verarbeitet (max_workers begrenzt das gleichzeitige PDF-Parsing pro
+Server-Prozess). Die UI fragt nur noch den Status ab: Fortschritt in Seiten,
+Ergebnis oder Fehler. Ein Abbruch greift vor der nächsten Seite.
+"""
+import io
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from anki_parser import ParsingCancelled, extract_features_from_anki_pdf
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+STATUS_LABELS = {
+    QUEUED: '⏳ In der Warteschlange',
+    RUNNING: '⚙️ Wird verarbeitet',
+    DONE: '✅ Fertig',
+    FAILED: '❌ Fehler',
+    CANCELLED: '⏹️ Abgebrochen'
+}
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+@dataclass
+class PdfJob:
+    job_id: str
+    filename: str
+    status: str = QUEUED
+    pages_done: int = 0
+    pages_total: int = 0
+    result: dict = None
+    error: str = None
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: float = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def progress(self) -> float:
+        return self.pages_done / self.pages_total if self.pages_total else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+
+class PdfJobQueue:
+    """
+    Job-Verwaltung für einen Server-Prozess. Fertige Jobs bleiben
+    result_ttl Sekunden abrufbar und werden dann aufgeräumt.
+    """
+
+    def __init__(self, max_workers=2, result_ttl=3600, parser=extract_features_from_anki_pdf):
+        self.parser = parser
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pdf-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._futures = {}
+
+    def submit(self, data: bytes, filename='upload.pdf') -> str:
+        """Reiht die PDF-Bytes ein und gibt die Job-ID zurück."""
+        self._prune()
+        job = PdfJob(job_id=uuid.uuid4().hex, filename=filename)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._futures[job.job_id] = self._executor.submit(self._run, job, data)
+        return job.job_id
+
+    def _finish(self, job: PdfJob, status: str):
+        """Endzustand setzen: finished_at steht fest, bevor der Status sichtbar wird."""
+        with self._lock:
+            job.finished_at = time.time()
+            job.status = status
+            self._futures.pop(job.job_id, None)
+
+    def _run(self, job: PdfJob, data: bytes):
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+
+        def on_page(pages_done, pages_total):
+            job.pages_done, job.pages_total = pages_done, pages_total
+
+        try:
+            job.result = self.parser(io.BytesIO(data), on_page=on_page, cancel_event=job.cancel_event)
+            status = DONE
+        except ParsingCancelled:
+            status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            status = FAILED
+        self._finish(job, status)
+
+    def get(self, job_id):
+        """Job-Objekt oder None (unbekannt bzw. schon aufgeräumt)."""
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id) -> bool:
+        """Bricht einen wartenden oder laufenden Job ab."""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # Noch nicht gestartet → _run läuft nie, also hier abschließen
+            self._finish(job, CANCELLED)
+        return True
+
+    def pending(self) -> int:
+        """Anzahl wartender und laufender Jobs."""
+        return sum(1 for job in list(self._jobs.values()) if not job.finished)
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            self._jobs = {
+                job_id: job for job_id, job in self._jobs.items()
+                if not job.finished or job.finished_at is None or job.finished_at > cutoff
+            }
+            self._futures = {job_id: future for job_id, future in self._futures.items() if job_id in self._jobs}
+
+    def shutdown(self):
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,106 @@
+# pipeline.py
+"""
+Kleiner Stage-Runner mit inhaltsadressiertem Cache.
+
+Jede Stage hat einen Schlüssel aus ihrem Namen, dem Quellcode der Funktion
+(plus angegebener Hilfsfunktionen), ihren Parametern und den Schlüsseln
+ihrer Eingangs-Stages, dazu ein optionaler Kontext der ganzen Pipeline
+(Bibliotheksversionen, Modul-Konstanten, die die Stages lesen). Die Schlüssel stehen damit fest, bevor irgendetwas
+berechnet wird: liegt für einen Schlüssel schon ein Ergebnis im Cache
+(.pipeline_cache/<stage>/<key>.pkl), wird die Stage nicht ausgeführt und
+ihre Eingänge werden gar nicht erst geladen.
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+CACHE_DIR = '.pipeline_cache'
+
+
+def stable_hash(*parts) -> str:
+    """SHA-256 über JSON-serialisierbare Teile (Schlüssel sortiert)."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class Stage:
+    """
+    func bekommt die Ergebnisse der Eingangs-Stages (in der Reihenfolge von
+    inputs) als Positionsargumente und params als Keyword-Argumente.
+    """
+    name: str
+    func: Callable
+    inputs: tuple = ()
+    params: dict = field(default_factory=dict)
+    deps: tuple = ()  # Hilfsfunktionen, deren Code mit in den Schlüssel eingeht
+
+    def code_hash(self) -> str:
+        return stable_hash([inspect.getsource(f) for f in (self.func, *self.deps)])
+
+
+class Pipeline:
+    def __init__(self, stages, cache_dir=CACHE_DIR, context=None):
+        self.stages = {}
+        for stage in stages:
+            missing = [name for name in stage.inputs if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' braucht unbekannte Eingänge: {missing}")
+            self.stages[stage.name] = stage
+        self.cache_dir = cache_dir
+        self.keys = {}
+        for stage in self.stages.values():
+            self.keys[stage.name] = stable_hash(
+                stage.name, stage.code_hash(), stage.params, [self.keys[name] for name in stage.inputs],
+                context or {}
+            )
+        self.executed = []
+        self._results = {}
+
+    def cache_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name, f"{self.keys[name]}.pkl")
+
+    def is_cached(self, name: str) -> bool:
+        return os.path.exists(self.cache_path(name))
+
+    def _store(self, name: str, result):
+        path = self.cache_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(tmp_path, path)
+
+    def get(self, name: str, force=()):
+        """Ergebnis einer Stage: aus dem Speicher, dem Cache oder neu berechnet."""
+        if name in self._results:
+            return self._results[name]
+        stage = self.stages[name]
+        if name not in force and self.is_cached(name):
+            with open(self.cache_path(name), 'rb') as f:
+                result = pickle.load(f)
+            print(f"⏩ {name} (Cache {self.keys[name][:10]})")
+        else:
+            inputs = [self.get(input_name, force) for input_name in stage.inputs]
+            print(f"⚙️  {name} ...")
+            start = time.perf_counter()
+            result = stage.func(*inputs, **stage.params)
+            self._store(name, result)
+            self.executed.append(name)
+            print(f"   {name} fertig in {time.perf_counter() - start:.2f} s")
+        self._results[name] = result
+        return result
+
+    def run(self, targets=None, force=()) -> dict:
+        """
+        Berechnet die angefragten Stages (Standard: die letzte) und alles,
+        was dafür fehlt. force = Stage-Namen, die neu gerechnet werden sollen.
+        """
+        targets = targets or [list(self.stages)[-1]]
+        return {name: self.get(name, set(force)) for name in targets}
@@ -0,0 +1,364 @@
+# plan_model.py
+"""
+Vorhersage-Logik für die Lernplan-Generierung.
+
+Die Ridge-Modelle aus train_model.py sind linear, deshalb werden ihre
+Koeffizienten beim Laden einmal in NumPy-Arrays gepackt. Pro Request
+bleibt dann nur noch Skalieren + ein Matrix-Vektor-Produkt übrig.
+Enthält das Artefakt zusätzlich Gradient-Boosting-Bäume (tree_model.py),
+kommen die Werte aus den Bäumen und die Intervalle weiter aus Ridge.
+"""
+import numpy as np
+import pandas as pd
+
+from clusters import ClusterKey
+from tree_model import BoostedTrees
+
+TIME_OF_DAY_OPTIONS = ['morning', 'afternoon', 'evening', 'night']
+TARGETS = ['work_blocks', 'work_duration', 'break_duration', 'next_session']
+
+# Effizienz-Faktor je Tageszeit (Reihenfolge wie TIME_OF_DAY_OPTIONS), wie in den Trainingsdaten
+TIME_OF_DAY_FACTORS = np.array([1.2, 1.0, 0.8, 0.5])
+
+# Auswählbare Session-Dauern in der Sidebar (Slider 30–240, Schritt 15)
+DURATION_OPTIONS = np.arange(30, 241, 15)
+
+# z-Wert für 90%-Vorhersage-Intervalle
+Z_90 = 1.645
+
+# Erklärungen: die vier Tageszeit-Dummies zählen zusammen als ein Faktor
+FEATURE_GROUPS = {
+    'Session-Dauer': [0],
+    'Tageszeit': [1, 2, 3, 4],
+    'Konzentration': [5],
+    'Tage seit letzter Session': [6],
+    'Letztes Rating': [7]
+}
+GROUP_MATRIX = np.zeros((8, len(FEATURE_GROUPS)))
+for _g, _columns in enumerate(FEATURE_GROUPS.values()):
+    GROUP_MATRIX[_columns, _g] = 1.0
+
+TARGET_UNITS = {'work_blocks': 'Blöcke', 'work_duration': 'min', 'break_duration': 'min', 'next_session': 'h'}
+
+# Ab diesem Beitrag wird ein Faktor zum Tipp (in der Einheit des Targets)
+TIP_MIN_EFFECT = {'work_duration': 2.0, 'break_duration': 1.0, 'next_session': 2.0}
+
+GROUP_ADVICE = {
+    'Session-Dauer': "Mehrere kürzere Sessions statt einer langen können helfen.",
+    'Tageszeit': "Eine andere Tageszeit lohnt sich – siehe „Wann lernst du am besten?“.",
+    'Konzentration': "Kurz bewegen, Wasser trinken und Ablenkungen wegräumen hebt die Konzentration.",
+    'Tage seit letzter Session': "Regelmäßigere Sessions halten den Einstieg leichter.",
+    'Letztes Rating': "Starte mit einem leichten Thema, um wieder reinzukommen."
+}
+
+# Ab dieser halben Intervallbreite gilt eine Vorhersage als unsicher
+LOW_CONFIDENCE_HALF_WIDTH = {
+    'work_duration': 8.0,
+    'break_duration': 3.0,
+    'next_session': 7.0
+}
+
+
+# Spalten in der Reihenfolge von build_feature_vector (Features X in train_model.py)
+FEATURE_COLUMNS = [
+    'total_session_duration',
+    'time_morning', 'time_afternoon', 'time_evening', 'time_night',
+    'concentration_baseline',
+    'days_since_last_session',
+    'previous_session_rating'
+]
+
+
+def build_feature_vector(total_duration, time_of_day, concentration, days_since, previous_rating) -> np.ndarray:
+    """Baut den Feature-Vektor in der Reihenfolge von FEATURE_COLUMNS."""
+    return np.array([
+        total_duration,
+        1 if time_of_day == 'morning' else 0,
+        1 if time_of_day == 'afternoon' else 0,
+        1 if time_of_day == 'evening' else 0,
+        1 if time_of_day == 'night' else 0,
+        concentration,
+        days_since,
+        previous_rating
+    ], dtype=float)
+
+
+class PlanPredictor:
+    """
+    Hält alle Koeffizienten-Sätze vorgeladen.
+
+    Index 0 ist immer das globale Modell, danach folgt ein Satz pro Cluster
+    (falls das Modell-Artefakt cluster-spezifische Modelle enthält).
+    """
+
+    def __init__(self, models: dict):
+        scaler = models['scaler']
+        self.mean = np.asarray(scaler.mean_, dtype=float)
+        self.scale = np.asarray(scaler.scale_, dtype=float)
+
+        global_coef = np.vstack([models[target].coef_ for target in TARGETS])
+        global_intercept = np.array([models[target].intercept_ for target in TARGETS])
+
+        coef_sets = [global_coef]
+        intercept_sets = [global_intercept]
+        self.cluster_index = {}
+
+        # Posterior-Kovarianzen aus train_model.py (ältere Artefakte haben keine)
+        uncertainty = models.get('uncertainty')
+        cov_sets = []
+        noise_sets = []
+        if uncertainty is not None:
+            order = [uncertainty['targets'].index(target) for target in TARGETS]
+            cov_sets.append(np.asarray(uncertainty['cov'])[order])
+            noise_sets.append(np.asarray(uncertainty['noise_var'])[order])
+
+        cluster_models = models.get('cluster_models')
+        if cluster_models is not None:
+            order = [cluster_models['targets'].index(target) for target in TARGETS]
+            for c, key in enumerate(cluster_models['keys']):
+                coef_sets.append(np.asarray(cluster_models['coef'][c])[order])
+                intercept_sets.append(np.asarray(cluster_models['intercept'][c])[order])
+                self.cluster_index[ClusterKey(key)] = len(coef_sets) - 1
+                if cov_sets and 'cov' in cluster_models:
+                    cov_sets.append(np.asarray(cluster_models['cov'][c])[order])
+                    noise_sets.append(np.asarray(cluster_models['noise_var'][c])[order])
+
+        # Form: (Sätze, Targets, Features) bzw. (Sätze, Targets)
+        self.coef = np.stack(coef_sets)
+        self.intercept = np.stack(intercept_sets)
+
+        # Form: (Sätze, Targets, 1 + Features, 1 + Features) bzw. (Sätze, Targets)
+        if len(cov_sets) == len(coef_sets):
+            self.cov = np.stack(cov_sets)
+            self.noise_var = np.stack(noise_sets)
+        else:
+            self.cov = None
+            self.noise_var = None
+
+        # Rating-Modell (concentration_score) mit eigenem Scaler, siehe train_model.py
+        rating = models.get('rating')
+        if rating is not None:
+            self.rating_mean = np.asarray(rating['scaler'].mean_, dtype=float)
+            self.rating_scale = np.asarray(rating['scaler'].scale_, dtype=float)
+            self.rating_coef = np.asarray(rating['model'].coef_, dtype=float)
+            self.rating_intercept = float(rating['model'].intercept_)
+            # long_session / same_day_session werden aus diesen Spalten abgeleitet
+            rating_columns = rating.get('feature_columns', FEATURE_COLUMNS)
+            self.rating_duration_index = rating_columns.index('total_session_duration')
+            self.rating_days_since_index = rating_columns.index('days_since_last_session')
+        self.has_rating = rating is not None
+
+        # Optionales Gradient-Boosting (train_model.py --trees) liefert die Werte,
+        # die Ridge-Kovarianzen weiterhin die Intervallbreite
+        trees = models.get('boosted_trees')
+        self.trees = BoostedTrees(trees) if trees is not None else None
+        if self.trees is not None:
+            self.tree_order = [self.trees.targets.index(target) for target in TARGETS]
+
+    @property
+    def has_uncertainty(self) -> bool:
+        return self.cov is not None
+
+    def scale_features(self, features: np.ndarray) -> np.ndarray:
+        """Entspricht StandardScaler.transform, ohne sklearn-Overhead."""
+        return (features - self.mean) / self.scale
+
+    def model_index(self, cluster) -> int:
+        """Cluster → Index des Koeffizienten-Satzes (0 = global)."""
+        if cluster is None:
+            return 0
+        return self.cluster_index.get(ClusterKey(cluster), 0)
+
+    def predict(self, features: np.ndarray, cluster=None) -> dict:
+        """Sagt alle Targets für einen Feature-Vektor voraus."""
+        values = self.predict_scaled(self.scale_features(features), cluster)
+        return dict(zip(TARGETS, values.tolist()))
+
+    def predict_scaled(self, scaled: np.ndarray, cluster=None) -> np.ndarray:
+        """Ein Matrix-Vektor-Produkt auf bereits skalierten Features (Reihenfolge wie TARGETS)."""
+        if self.trees is not None:
+            return self.predict_trees((scaled * self.scale + self.mean)[None, :], cluster)[0]
+        idx = self.model_index(cluster)
+        return self.coef[idx] @ scaled + self.intercept[idx]
+
+    def predict_trees(self, features: np.ndarray, cluster=None) -> np.ndarray:
+        """Gradient-Boosting-Werte für eine (n, Features)-Matrix (Reihenfolge wie TARGETS)."""
+        key = ClusterKey(cluster).value if cluster is not None else None
+        return self.trees.predict(features, key)[:, self.tree_order]
+
+    def contributions(self, features: np.ndarray, cluster=None) -> np.ndarray:
+        """
+        Beitrag jedes Features zur Ridge-Vorhersage als (Targets, Features).
+
+        Skaliertes Feature × Koeffizient; Intercept + Summe der Beiträge
+        ergibt die Ridge-Vorhersage. Bezugspunkt sind die Ø-Features aller
+        User (Mittelwert des globalen Scalers), auch bei Cluster-Modellen.
+        """
+        return self.coef[self.model_index(cluster)] * self.scale_features(features)
+
+    def baseline(self, cluster=None) -> np.ndarray:
+        """
+        Ridge-Vorhersage bei den Ø-Features aller User (skalierte Features 0).
+        Bei Cluster-Modellen ist das nicht der Ø-User des Clusters, da alle
+        Sätze mit dem globalen Scaler zentriert sind.
+        """
+        return self.intercept[self.model_index(cluster)]
+
+    def contributions_batch(self, features: np.ndarray, clusters=None) -> np.ndarray:
+        """(n, Targets, Features); clusters ist None, ein Cluster oder einer pro Zeile."""
+        scaled = self.scale_features(features)
+        if clusters is None or isinstance(clusters, str):
+            return scaled[:, None, :] * self.coef[self.model_index(clusters)]
+        lookup = {cluster: self.model_index(cluster) for cluster in set(clusters)}
+        idx = np.fromiter((lookup[cluster] for cluster in clusters), dtype=int, count=len(scaled))
+        return scaled[:, None, :] * self.coef[idx]
+
+    def same_scaling(self, other) -> bool:
+        """True, wenn beide Predictors skalierte Features teilen können."""
+        return np.array_equal(self.mean, other.mean) and np.array_equal(self.scale, other.scale)
+
+    def predict_interval(self, features: np.ndarray, cluster=None, z=Z_90) -> dict:
+        """
+        Vorhersage mit Intervall: Target → (Wert, untere Grenze, obere Grenze).
+
+        Ohne gespeicherte Kovarianzen fallen die Grenzen auf den Wert zusammen.
+        """
+        scaled = self.scale_features(features)
+        mean = self.predict_scaled(scaled, cluster)
+        std = self.predict_std(scaled[None, :], cluster)
+        std = np.zeros_like(mean) if std is None else std[0]
+        return {
+            target: (float(mean[t]), float(mean[t] - z * std[t]), float(mean[t] + z * std[t]))
+            for t, target in enumerate(TARGETS)
+        }
+
+    def predict_batch(self, features: np.ndarray, cluster=None):
+        """
+        Vorhersage für eine (n, Features)-Matrix.
+
+        Gibt (Werte, Standardabweichungen) als (n, Targets)-Arrays zurück;
+        die Standardabweichungen sind None, wenn das Artefakt keine
+        Kovarianzen enthält.
+        """
+        scaled = self.scale_features(features)
+        if self.trees is not None:
+            mean = self.predict_trees(features, cluster)
+        else:
+            idx = self.model_index(cluster)
+            mean = scaled @ self.coef[idx].T + self.intercept[idx]
+        return mean, self.predict_std(scaled, cluster)
+
+    def predict_std(self, scaled: np.ndarray, cluster=None):
+        """Standardabweichungen für (n, Features) skalierte Features, None ohne Kovarianzen."""
+        if self.cov is None:
+            return None
+        idx = self.model_index(cluster)
+        augmented = np.hstack([np.ones((len(scaled), 1)), scaled])
+        # Var = Rauschen + a' Σ a, für alle Targets und Zeilen auf einmal
+        param_var = np.einsum('ni,tij,nj->nt', augmented, self.cov[idx], augmented)
+        return np.sqrt(self.noise_var[idx] + param_var)
+
+    def predict_rating_batch(self, features: np.ndarray) -> np.ndarray:
+        """Erwartetes Rating für eine (n, Features)-Matrix – ein Matrix-Vektor-Produkt."""
+        extra = np.column_stack([
+            features[:, self.rating_duration_index] > 150,
+            features[:, self.rating_days_since_index] == 0
+        ])
+        scaled = (np.hstack([features, extra]) - self.rating_mean) / self.rating_scale
+        return scaled @ self.rating_coef + self.rating_intercept
+
+
+def expected_concentration_score(total_duration, time_of_day, concentration, days_since, previous_rating):
+    """
+    Deterministischer Teil des concentration_score (ohne Rauschen), wie ihn
+    die Trainingsdaten annehmen. time_of_day als Index in TIME_OF_DAY_OPTIONS.
+    """
+    time_factor = TIME_OF_DAY_FACTORS[time_of_day]
+    rest_factor = np.minimum(1.0, days_since / 3.0)
+
+    base_efficiency = (concentration / 10) * time_factor * (0.7 + 0.3 * rest_factor)
+    base_efficiency = np.clip(base_efficiency + previous_rating / 50, 0.3, 1.0)
+
+    concentration_score = base_efficiency * 10
+    concentration_score = np.where(total_duration > 150, concentration_score * 0.85, concentration_score)
+    concentration_score = np.where(days_since == 0, concentration_score * 0.9, concentration_score)
+    return np.clip(concentration_score, 2, 10)
+
+
+def what_if_grid(predictor: PlanPredictor, concentration, days_since, previous_rating,
+                 durations=DURATION_OPTIONS) -> pd.DataFrame:
+    """
+    Bewertet alle Kombinationen Tageszeit × Session-Dauer für die aktuellen
+    Eingaben in einem einzigen Batch.
+    """
+    n_times = len(TIME_OF_DAY_OPTIONS)
+    features = np.zeros((n_times * len(durations), 8))
+    features[:, 0] = np.tile(durations, n_times)
+    features[np.arange(len(features)), 1 + np.repeat(np.arange(n_times), len(durations))] = 1
+    features[:, 5] = concentration
+    features[:, 6] = days_since
+    features[:, 7] = previous_rating
+
+    return pd.DataFrame({
+        'time_of_day': np.repeat(TIME_OF_DAY_OPTIONS, len(durations)),
+        'total_duration': features[:, 0].astype(int),
+        'expected_rating': np.clip(predictor.predict_rating_batch(features), 1, 10)
+    })
+
+
+def best_slot(grid: pd.DataFrame, preferred_duration, tolerance=0.1) -> pd.Series:
+    """
+    Kombination mit dem höchsten erwarteten Rating. Liegen mehrere innerhalb
+    von tolerance, gewinnt die Dauer, die am nächsten an der Wunschdauer liegt.
+    """
+    near_best = grid[grid['expected_rating'] >= grid['expected_rating'].max() - tolerance]
+    distance = (near_best['total_duration'] - preferred_duration).abs()
+    return near_best.loc[distance.idxmin()]
+
+
+def explain_prediction(predictor: PlanPredictor, features: np.ndarray, cluster=None) -> pd.DataFrame:
+    """Beiträge je Faktor (Zeilen) und Target (Spalten) für einen Feature-Vektor."""
+    grouped = predictor.contributions(features, cluster) @ GROUP_MATRIX
+    return pd.DataFrame(grouped.T, index=list(FEATURE_GROUPS), columns=TARGETS)
+
+
+def main_factors(predictor: PlanPredictor, features: np.ndarray, clusters=None, target='work_duration'):
+    """
+    Batch: stärkster Faktor für target je Zeile.
+    Gibt (Faktor-Namen, Beiträge) als Arrays zurück.
+    """
+    grouped = predictor.contributions_batch(features, clusters)[:, TARGETS.index(target), :] @ GROUP_MATRIX
+    strongest = np.abs(grouped).argmax(axis=1)
+    return np.asarray(list(FEATURE_GROUPS))[strongest], grouped[np.arange(len(grouped)), strongest]
+
+
+def contribution_tips(explanation: pd.DataFrame) -> list:
+    """
+    Tipps aus den Beiträgen: was die Lernblöcke am stärksten verkürzt bzw.
+    verlängert, die Pausen verlängert und die nächste Session hinausschiebt.
+    """
+    tips = []
+    work = explanation['work_duration']
+    if work.min() <= -TIP_MIN_EFFECT['work_duration']:
+        factor = work.idxmin()
+        tips.append(f"📉 {factor} verkürzt deine Lernblöcke um {-work[factor]:.0f} min. {GROUP_ADVICE[factor]}")
+    breaks = explanation['break_duration']
+    if breaks.max() >= TIP_MIN_EFFECT['break_duration']:
+        factor = breaks.idxmax()
+        tips.append(f"☕ {factor} verlängert deine Pausen um {breaks[factor]:.0f} min. {GROUP_ADVICE[factor]}")
+    next_session = explanation['next_session']
+    if next_session.max() >= TIP_MIN_EFFECT['next_session']:
+        factor = next_session.idxmax()
+        tips.append(f"🕒 {factor} schiebt deine nächste Session um {next_session[factor]:.1f} h nach hinten.")
+    if work.max() >= TIP_MIN_EFFECT['work_duration']:
+        factor = work.idxmax()
+        tips.append(f"💪 {factor} verlängert deine Lernblöcke um {work[factor]:.0f} min – nutze das für schwierige Themen.")
+    return tips
+
+
+def low_confidence_targets(interval: dict) -> list:
+    """Targets, deren Intervall breiter ist als in LOW_CONFIDENCE_HALF_WIDTH erlaubt."""
+    return [
+        target for target, limit in LOW_CONFIDENCE_HALF_WIDTH.items()
+        if (interval[target][2] - interval[target][1]) / 2 > limit
+    ]
@@ -0,0 +1,464 @@
+# reminder_scheduler.py
+"""
+Erinnerungen an die nächste Lernsession.
+
+Aus jedem Plan wird eine Erinnerung zum vorhergesagten Zeitpunkt
+(next_session_hours nach Ende der Session). Offene Erinnerungen liegen in
+einem Timer-Wheel: Slots zu je resolution Sekunden in einem Dict, dazu ein
+Heap der belegten Slot-Nummern. Einfügen ist ein dict-Lookup plus append
+(der Heap wächst nur, wenn ein Slot neu belegt wird), Löschen markiert nur
+die ID. Der Scheduler-Thread schläft bis zum nächsten belegten Slot und
+braucht im Leerlauf keine CPU.
+
+Jede Änderung landet als Record fester Länge in einem Journal
+(data/reminders/journal.bin); beim Start wird es eingelesen, verpasste
+Erinnerungen werden sofort zugestellt. Zugestellt wird über austauschbare
+Sinks (alles mit einer Methode send(reminders)); erledigt ist eine
+Erinnerung erst nach erfolgreicher Zustellung (mindestens einmal).
+
+Das Journal gehört genau einem Scheduler: er hält solange einen exklusiven
+Datei-Lock (journal.bin.lock). Die App und `python reminder_scheduler.py run`
+schließen sich also gegenseitig aus; der zweite Start bricht mit
+JournalLocked ab, statt Erinnerungen doppelt zuzustellen.
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from file_lock import FileLock
+
+REMINDER_DIR = os.path.join('data', 'reminders')
+REMINDER_JOURNAL_PATH = os.path.join(REMINDER_DIR, 'journal.bin')
+OUTBOX_PATH = os.path.join(REMINDER_DIR, 'outbox.jsonl')
+
+# Nach einem Fehler im Sink wird so viele Sekunden später erneut zugestellt
+RETRY_DELAY = 60.0
+
+# So lange wartet eine zugestellte Erinnerung in der App darauf, angezeigt zu werden
+INBOX_MAX_AGE = 24 * 3600.0
+
+KIND_ADD = 0
+KIND_DONE = 1
+KIND_CANCEL = 2
+
+USER_ID_BYTES = 64
+
+logger = logging.getLogger(__name__)
+
+# 81 Bytes pro Record
+REMINDER_RECORD = np.dtype([
+    ('kind', 'u1'),
+    ('reminder_id', 'u8'),
+    ('due', 'f8'),
+    ('user', f'S{USER_ID_BYTES}')
+])
+
+
+@dataclass
+class Reminder:
+    reminder_id: int
+    user_id: str
+    due: float
+
+    @property
+    def message(self) -> str:
+        return "⏰ Zeit für deine nächste Lernsession!"
+
+    def to_dict(self) -> dict:
+        return {
+            'reminder_id': self.reminder_id,
+            'user_id': self.user_id,
+            'due': datetime.fromtimestamp(self.due).isoformat(timespec='seconds'),
+            'message': self.message
+        }
+
+
+class JsonlSink:
+    """Hängt zugestellte Erinnerungen als JSON-Zeilen an eine lokale Outbox-Datei."""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+
+    def send(self, reminders):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(r.to_dict(), ensure_ascii=False) + '\n' for r in reminders)
+
+
+class MemorySink:
+    """
+    Hält zugestellte Erinnerungen pro User, bis die App sie anzeigt.
+    Nicht abgeholte Erinnerungen verfallen nach max_age Sekunden.
+    """
+
+    def __init__(self, max_age=INBOX_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._delivered = defaultdict(list)   # user_id → [(Zustellzeit, Reminder)]
+        self._order = deque()                 # (Zustellzeit, user_id) in Zustell-Reihenfolge
+
+    def _expire(self, now):
+        cutoff = now - self.max_age
+        while self._order and self._order[0][0] <= cutoff:
+            _, user_id = self._order.popleft()
+            entries = [entry for entry in self._delivered.get(user_id, []) if entry[0] > cutoff]
+            if entries:
+                self._delivered[user_id] = entries
+            else:
+                self._delivered.pop(user_id, None)
+
+    def send(self, reminders):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            for reminder in reminders:
+                self._delivered[reminder.user_id].append((now, reminder))
+                self._order.append((now, reminder.user_id))
+
+    def pop(self, user_id) -> list:
+        with self._lock:
+            self._expire(time.time())
+            return [reminder for _, reminder in self._delivered.pop(user_id, [])]
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._delivered.values())
+
+
+class PrintSink:
+    """Für den Betrieb als eigener Prozess (python reminder_scheduler.py run)."""
+
+    def send(self, reminders):
+        for reminder in reminders:
+            print(f"{datetime.now():%H:%M:%S} {reminder.message} (User {reminder.user_id})")
+
+
+class JournalLocked(RuntimeError):
+    """Ein anderer Scheduler (App oder CLI) besitzt das Journal bereits."""
+
+
+class ReminderScheduler:
+    """
+    Offene Erinnerungen mit Journal; pro User gibt es höchstens eine
+    (ein neuer Plan ersetzt die alte Erinnerung).
+    """
+
+    def __init__(self, journal_path=REMINDER_JOURNAL_PATH, sinks=None, resolution=60.0, compact_min_records=10000,
+                 retry_delay=RETRY_DELAY, exclusive=True):
+        self.journal_path = journal_path
+        # Nur lesende Nutzung (z.B. `list`) darf ohne Lock laufen
+        self._journal_lock = FileLock(journal_path + '.lock') if exclusive else None
+        if self._journal_lock is not None and not self._journal_lock.acquire(blocking=False):
+            raise JournalLocked(f"Journal {journal_path} wird bereits von einem anderen Scheduler benutzt")
+        self.sinks = list(sinks) if sinks is not None else [JsonlSink()]
+        self.resolution = resolution
+        self.compact_min_records = compact_min_records
+        self.retry_delay = retry_delay
+        self.pending = {}    # reminder_id → Reminder
+        self.in_flight = {}  # reminder_id → Reminder, fällig aber noch nicht zugestellt
+        self.by_user = {}    # user_id → reminder_id
+        self._slots = {}     # Slot-Nummer → Liste von Reminder-IDs
+        self._slot_heap = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self._stopped = False
+        self._journal_records = 0
+        self._file = None
+        self._replay()
+
+    # Timer-Wheel
+
+    def _slot(self, due: float) -> int:
+        return int(due // self.resolution)
+
+    def _insert(self, reminder: Reminder):
+        self.pending[reminder.reminder_id] = reminder
+        self.by_user[reminder.user_id] = reminder.reminder_id
+        slot = self._slot(reminder.due)
+        ids = self._slots.get(slot)
+        if ids is None:
+            self._slots[slot] = [reminder.reminder_id]
+            heapq.heappush(self._slot_heap, slot)
+        else:
+            ids.append(reminder.reminder_id)
+
+    def _remove(self, reminder_id) -> Reminder | None:
+        """Nur aus pending/by_user; die ID im Slot wird beim Auslösen übersprungen."""
+        reminder = self.pending.pop(reminder_id, None)
+        if reminder is not None and self.by_user.get(reminder.user_id) == reminder_id:
+            del self.by_user[reminder.user_id]
+        return reminder
+
+    # Journal
+
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return
+        records = np.fromfile(self.journal_path, dtype=REMINDER_RECORD)
+        self._journal_records = len(records)
+        finished = records['reminder_id'][records['kind'] != KIND_ADD]
+        added = records[(records['kind'] == KIND_ADD) & ~np.isin(records['reminder_id'], finished)]
+        for reminder_id, due, user in zip(added['reminder_id'].tolist(), added['due'].tolist(), added['user'].tolist()):
+            previous = self.by_user.get(user.decode())
+            if previous is not None:
+                self._remove(previous)
+            self._insert(Reminder(reminder_id, user.decode(), due))
+
+    def _append(self, kind, reminders):
+        records = np.zeros(len(reminders), dtype=REMINDER_RECORD)
+        records['kind'] = kind
+        records['reminder_id'] = [r.reminder_id for r in reminders]
+        records['due'] = [r.due for r in reminders]
+        records['user'] = [r.user_id.encode() for r in reminders]
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            self._file = open(self.journal_path, 'ab')
+        self._file.write(records.tobytes())
+        self._file.flush()
+        self._journal_records += len(records)
+
+    def compact(self):
+        """Schreibt das Journal neu, nur noch mit den offenen Erinnerungen."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.journal_path) or '.', suffix='.tmp')
+        # Gerade in Zustellung befindliche bleiben drin, bis ihr DONE geschrieben ist
+        open_reminders = [*self.pending.values(), *self.in_flight.values()]
+        records = np.zeros(len(open_reminders), dtype=REMINDER_RECORD)
+        records['kind'] = KIND_ADD
+        records['reminder_id'] = [r.reminder_id for r in open_reminders]
+        records['due'] = [r.due for r in open_reminders]
+        records['user'] = [r.user_id.encode() for r in open_reminders]
+        with os.fdopen(fd, 'wb') as f:
+            f.write(records.tobytes())
+        os.replace(tmp_path, self.journal_path)
+        self._journal_records = len(records)
+
+    # Öffentliche API
+
+    def schedule(self, user_id, due: float) -> int:
+        """Plant eine Erinnerung (Unix-Zeit) und ersetzt eine offene des Users."""
+        user_id = str(user_id)
+        if len(user_id.encode()) > USER_ID_BYTES:
+            raise ValueError(f"user_id ist länger als {USER_ID_BYTES} Bytes.")
+        reminder = Reminder(int.from_bytes(os.urandom(8), 'little'), user_id, float(due))
+        with self._lock:
+            previous = self.by_user.get(user_id)
+            if previous is not None:
+                self._append(KIND_CANCEL, [self._remove(previous)])
+            self._append(KIND_ADD, [reminder])
+            earliest = self._slot_heap[0] if self._slot_heap else None
+            self._insert(reminder)
+            if earliest is None or self._slot(reminder.due) <= earliest:
+                self._wakeup.notify()
+        return reminder.reminder_id
+
+    def cancel_user(self, user_id) -> bool:
+        with self._lock:
+            reminder_id = self.by_user.get(str(user_id))
+            if reminder_id is None:
+                return False
+            self._append(KIND_CANCEL, [self._remove(reminder_id)])
+            return True
+
+    def pending_for(self, user_id) -> Reminder | None:
+        with self._lock:
+            reminder_id = self.by_user.get(str(user_id))
+            return self.pending.get(reminder_id) if reminder_id is not None else None
+
+    def __len__(self):
+        return len(self.pending)
+
+    def next_due(self) -> float | None:
+        """Beginn des frühesten belegten Slots (früher wird nichts fällig)."""
+        with self._lock:
+            return self._slot_heap[0] * self.resolution if self._slot_heap else None
+
+    def dispatch_due(self, now=None) -> list:
+        """
+        Stellt alle fälligen Erinnerungen zu und gibt sie zurück.
+
+        DONE kommt erst nach der Zustellung ins Journal; ein Absturz dazwischen
+        führt beim Neustart zu erneuter Zustellung statt zu Verlust. Schlägt
+        ein Sink fehl, werden die Erinnerungen nach retry_delay erneut fällig.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            due = self._pop_due(now)
+            self.in_flight.update((r.reminder_id, r) for r in due)
+        if not due:
+            return due
+        try:
+            for sink in self.sinks:
+                sink.send(due)
+        except Exception:
+            logger.exception("Erinnerungen konnten nicht zugestellt werden, neuer Versuch in %.0f s", self.retry_delay)
+            with self._lock:
+                for reminder in due:
+                    del self.in_flight[reminder.reminder_id]
+                    if reminder.user_id in self.by_user:
+                        # Inzwischen neu geplant: die neue Erinnerung gilt
+                        self._append(KIND_CANCEL, [reminder])
+                    else:
+                        self._insert(Reminder(reminder.reminder_id, reminder.user_id, now + self.retry_delay))
+            return []
+        with self._lock:
+            for reminder in due:
+                del self.in_flight[reminder.reminder_id]
+            self._append(KIND_DONE, due)
+            if self._journal_records > max(self.compact_min_records, 2 * len(self.pending)):
+                self._compact()
+        return due
+
+    def _pop_due(self, now) -> list:
+        due = []
+        current = self._slot(now)
+        while self._slot_heap and self._slot_heap[0] <= current:
+            slot = self._slot_heap[0]
+            later = []
+            for reminder_id in self._slots[slot]:
+                reminder = self.pending.get(reminder_id)
+                if reminder is None:
+                    continue  # gelöscht oder ersetzt
+                if reminder.due <= now:
+                    due.append(self._remove(reminder_id))
+                else:
+                    later.append(reminder_id)
+            if later:
+                self._slots[slot] = later  # aktueller Slot, Rest wird noch fällig
+                break
+            del self._slots[slot]
+            heapq.heappop(self._slot_heap)
+        return due
+
+    # Hintergrund-Thread
+
+    def start(self):
+        """Startet den Scheduler-Thread (einmal pro Prozess)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='reminders', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Beendet den Thread, schließt das Journal und gibt es frei."""
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._journal_lock is not None:
+            self._journal_lock.release()
+
+    def _run(self):
+        while True:
+            self.dispatch_due()
+            with self._lock:
+                if self._stopped:
+                    return
+                if not self._slot_heap:
+                    timeout = None
+                else:
+                    slot = self._slot_heap[0]
+                    ids = self._slots[slot]
+                    # Im aktuellen Slot auf die genaue Zeit warten, sonst bis zum Slot-Beginn
+                    if slot <= self._slot(time.time()):
+                        dues = [self.pending[i].due for i in ids if i in self.pending]
+                        wake_at = min(dues) if dues else time.time()
+                    else:
+                        wake_at = slot * self.resolution
+                    timeout = max(0.0, wake_at - time.time())
+                if timeout is None or timeout > 0:
+                    self._wakeup.wait(timeout)
+
+
+def benchmark(n=300_000, journal_path=None):
+    """Einfügen, Neustart (Journal einlesen), Leerlauf-CPU und Zustellung."""
+    journal_path = journal_path or os.path.join(tempfile.mkdtemp(), 'journal.bin')
+    rng = np.random.default_rng(42)
+    now = time.time()
+    dues = (now + rng.uniform(60, 7 * 24 * 3600, n)).tolist()
+
+    class CountingSink:
+        delivered = 0
+
+        def send(self, reminders):
+            CountingSink.delivered += len(reminders)
+
+    scheduler = ReminderScheduler(journal_path, sinks=[CountingSink()])
+    start = time.perf_counter()
+    for i, due in enumerate(dues):
+        scheduler.schedule(f"user-{i}", due)
+    insert_us = (time.perf_counter() - start) / n * 1e6
+    print(f"➕ {n} Erinnerungen eingefügt: {insert_us:.2f} µs pro Einfügen (inkl. Journal)")
+
+    start = time.perf_counter()
+    for i in range(0, n, 10):
+        scheduler.schedule(f"user-{i}", dues[i] + 3600)
+    print(f"🔁 {n // 10} ersetzt: {(time.perf_counter() - start) / (n // 10) * 1e6:.2f} µs pro Ersetzen")
+    scheduler.stop()
+
+    start = time.perf_counter()
+    restarted = ReminderScheduler(journal_path, sinks=[CountingSink()])
+    print(f"♻️ Neustart: {len(restarted)} offene Erinnerungen aus dem Journal in "
+          f"{time.perf_counter() - start:.2f} s")
+
+    restarted.start()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    time.sleep(2.0)
+    cpu = time.process_time() - cpu_start
+    print(f"😴 Leerlauf: {cpu * 1000:.1f} ms CPU in {time.perf_counter() - wall_start:.1f} s")
+    restarted.stop()
+
+    start = time.perf_counter()
+    restarted.dispatch_due(now + 7 * 24 * 3600 + 3600)
+    elapsed = time.perf_counter() - start
+    print(f"📬 {CountingSink.delivered} zugestellt in {elapsed:.2f} s "
+          f"({elapsed / max(1, CountingSink.delivered) * 1e6:.2f} µs pro Erinnerung)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scheduler für Lern-Erinnerungen.")
+    parser.add_argument('command', choices=['run', 'list', 'bench'])
+    parser.add_argument('--n', type=int, default=300_000, help="bench: Anzahl Erinnerungen")
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        benchmark(args.n)
+    elif args.command == 'list':
+        scheduler = ReminderScheduler(sinks=[], exclusive=False)
+        for reminder in sorted(scheduler.pending.values(), key=lambda r: r.due):
+            print(f"{datetime.fromtimestamp(reminder.due):%d.%m.%Y %H:%M}  {reminder.user_id}")
+        print(f"{len(scheduler)} offene Erinnerungen")
+    else:
+        try:
+            scheduler = ReminderScheduler(sinks=[PrintSink(), JsonlSink()]).start()
+        except JournalLocked:
+            raise SystemExit("❌ Die App (oder ein anderer `run`) stellt bereits Erinnerungen zu – nur einer darf laufen.")
+        print(f"⏰ Scheduler läuft mit {len(scheduler)} offenen Erinnerungen (Strg+C beendet)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -0,0 +1,192 @@
+# schedule_solver.py
+"""
+Optimiert die Abfolge von Lernblöcken und Pausen für eine Wunschdauer.
+
+Statt n identischer Blöcke dürfen Block- und Pausenlängen um einige Minuten
+von der Modell-Vorhersage abweichen, und nach jeweils N Blöcken gibt es eine
+lange Pause. Gesucht wird der Plan, dessen Gesamtdauer innerhalb einer
+Toleranz an der Wunschdauer liegt und dabei möglichst wenig von den
+vorhergesagten Längen abweicht. Reicht der Spielraum nicht, weichen Blöcke
+und Pausen weiter ab (bis zu ihren Grenzen), erst dann die Gesamtdauer.
+
+Die Abweichungskosten werden per DP über das Minutenraster vorberechnet:
+cost[n, delta] = minimale Kosten, um n Einheiten (Blöcke oder Pausen)
+zusammen um delta Minuten zu verschieben. Ein Solve ist danach nur noch
+eine Handvoll NumPy-Operationen pro möglicher Blockanzahl.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+WORK_RANGE = (15, 45)
+BREAK_RANGE = (5, 15)
+WORK_SLACK = 5         # max. Abweichung eines Lernblocks von der Vorhersage (min)
+BREAK_SLACK = 3        # max. Abweichung einer Pause von der Vorhersage (min)
+MAX_UNITS = 24         # max. Anzahl Blöcke bzw. Pausen pro Session
+BREAK_WEIGHT = 2.0     # Pausen-Abweichungen stärker gewichten als Block-Abweichungen
+MISS_WEIGHT = 4.0      # Kosten pro Minute² Abweichung von der Wunschdauer
+MAX_TOLERANCE = 30     # weiter wird die Toleranz um die Wunschdauer nicht aufgeweicht (min)
+
+
+def _unit_cost(d: np.ndarray) -> np.ndarray:
+    """Kosten einer einzelnen Abweichung: Verlängern ist teurer als Kürzen."""
+    return np.where(d > 0, 1.5, 1.0) * d.astype(float) ** 2
+
+
+@lru_cache(maxsize=None)
+def deviation_table(lo: int, hi: int):
+    """
+    DP-Tabelle für Einheiten mit erlaubter Abweichung lo..hi Minuten.
+
+    Gibt (cost, choice, offset) zurück: cost[n, delta + offset] sind die
+    minimalen Kosten für n Einheiten mit Gesamtabweichung delta, choice die
+    Abweichung der letzten Einheit (für die Rekonstruktion).
+    """
+    offset = MAX_UNITS * max(-lo, hi, 0)
+    width = 2 * offset + 1
+    cost = np.full((MAX_UNITS + 1, width), np.inf)
+    choice = np.zeros((MAX_UNITS + 1, width), dtype=np.int8)
+    cost[0, offset] = 0.0
+
+    for n in range(1, MAX_UNITS + 1):
+        for d in range(lo, hi + 1):
+            shifted = np.full(width, np.inf)
+            if d >= 0:
+                shifted[d:] = cost[n - 1, :width - d]
+            else:
+                shifted[:d] = cost[n - 1, -d:]
+            candidate = shifted + _unit_cost(np.array(d))
+            better = candidate < cost[n]
+            cost[n, better] = candidate[better]
+            choice[n, better] = d
+    return cost, choice, offset
+
+
+def _reconstruct(table, n: int, delta: int) -> list:
+    """Liest die einzelnen Abweichungen aus der choice-Tabelle zurück."""
+    _, choice, offset = table
+    deviations = []
+    for k in range(n, 0, -1):
+        d = int(choice[k, delta + offset])
+        deviations.append(d)
+        delta -= d
+    return deviations
+
+
+def _slack(pred: int, slack: int, bounds: tuple) -> tuple:
+    """Erlaubtes Abweichungsfenster, ohne die absoluten Grenzen zu verlassen."""
+    return max(-slack, bounds[0] - pred), min(slack, bounds[1] - pred)
+
+
+def _search(total_duration, tolerance, pred_work, pred_break, long_break, long_break_every, work_window, break_window):
+    """Bester Plan mit Gesamtdauer in total_duration ± tolerance oder None."""
+    best = None
+    targets = np.arange(total_duration - tolerance, total_duration + tolerance + 1)
+    w_cost, _, w_off = deviation_table(*work_window)
+    b_cost, _, b_off = deviation_table(*break_window)
+    dw = np.arange(-w_off, w_off + 1)
+    for n_blocks in range(1, MAX_UNITS + 1):
+        n_long = (n_blocks - 1) // long_break_every if long_break_every else 0
+        n_short = n_blocks - 1 - n_long
+        base = n_blocks * pred_work + n_short * pred_break + n_long * long_break
+        # Mehr Blöcke machen den Plan nur länger, sobald er selbst maximal gekürzt zu lang ist
+        if base - total_duration > n_blocks * -work_window[0] + n_short * -break_window[0] + tolerance:
+            break
+
+        # Alle Kombinationen (Zielsumme × Block-Abweichung) auf einmal bewerten
+        delta = (targets - base)[:, None] - dw[None, :]
+        b_idx = delta + b_off
+        valid = (b_idx >= 0) & (b_idx < b_cost.shape[1])
+        cost = np.where(
+            valid,
+            w_cost[n_blocks][None, :] + BREAK_WEIGHT * b_cost[n_short][np.clip(b_idx, 0, b_cost.shape[1] - 1)],
+            np.inf
+        ) + MISS_WEIGHT * ((targets - total_duration) ** 2)[:, None]
+
+        flat = int(np.argmin(cost))
+        if np.isfinite(cost.flat[flat]) and (best is None or cost.flat[flat] < best[0]):
+            t_i, w_i = divmod(flat, cost.shape[1])
+            best = (cost.flat[flat], n_blocks, n_short, int(dw[w_i]), int(delta[t_i, w_i]))
+    return best
+
+
+def solve_schedule(total_duration, pred_work, pred_break, long_break_every=4, long_break=None, tolerance=5,
+                   max_tolerance=MAX_TOLERANCE):
+    """
+    Sucht den besten Plan für total_duration Minuten.
+
+    Passt kein Plan in die Toleranz, dürfen Blöcke und Pausen zuerst im
+    ganzen erlaubten Bereich (WORK_RANGE, BREAK_RANGE) von der Vorhersage
+    abweichen; erst danach wird die Toleranz verdoppelt, höchstens bis
+    max_tolerance (sonst ValueError). Die tatsächliche Abweichung von der
+    Wunschdauer ist die Summe der Einträge minus total_duration.
+
+    Gibt eine Liste von Schedule-Einträgen im Format von app.py zurück
+    ({'type', 'duration', 'block'}; lange Pausen zusätzlich mit 'long': True).
+    """
+    pred_work = int(np.clip(pred_work, *WORK_RANGE))
+    pred_break = int(np.clip(pred_break, *BREAK_RANGE))
+    if long_break is None:
+        long_break = min(30, 2 * pred_break + 5)
+
+    windows = [
+        (_slack(pred_work, WORK_SLACK, WORK_RANGE), _slack(pred_break, BREAK_SLACK, BREAK_RANGE)),
+        # Ganzer erlaubter Bereich, bevor die Wunschdauer aufgeweicht wird
+        (
+            (WORK_RANGE[0] - pred_work, WORK_RANGE[1] - pred_work),
+            (BREAK_RANGE[0] - pred_break, BREAK_RANGE[1] - pred_break)
+        )
+    ]
+    best = None
+    while best is None:
+        for work_window, break_window in windows:
+            best = _search(total_duration, tolerance, pred_work, pred_break, long_break, long_break_every,
+                           work_window, break_window)
+            if best is not None:
+                break
+        if best is None:
+            if tolerance >= max_tolerance:
+                raise ValueError(
+                    f"Kein Plan für {total_duration} min innerhalb von ±{max_tolerance} min "
+                    f"(Blöcke {WORK_RANGE[0]}–{WORK_RANGE[1]} min, Pausen {BREAK_RANGE[0]}–{BREAK_RANGE[1]} min)."
+                )
+            tolerance = min(max(1, 2 * tolerance), max_tolerance)
+            windows = windows[-1:]
+
+    _, n_blocks, n_short, work_delta, break_delta = best
+    work_table = deviation_table(*work_window)
+    break_table = deviation_table(*break_window)
+    # Längere Blöcke an den Anfang (frisch), längere Pausen ans Ende (müde)
+    work = sorted((pred_work + d for d in _reconstruct(work_table, n_blocks, work_delta)), reverse=True)
+    breaks = sorted(pred_break + d for d in _reconstruct(break_table, n_short, break_delta))
+
+    schedule = []
+    for block in range(n_blocks):
+        schedule.append({'type': 'Lernen', 'duration': work[block], 'block': block + 1})
+        if block < n_blocks - 1:
+            if long_break_every and (block + 1) % long_break_every == 0:
+                schedule.append({'type': 'Pause', 'duration': long_break, 'block': block + 1, 'long': True})
+            else:
+                schedule.append({'type': 'Pause', 'duration': breaks.pop(0), 'block': block + 1})
+    return schedule
+
+
+# Tabellen für alle möglichen Abweichungsfenster beim Import vorberechnen
+for _pred in range(WORK_RANGE[0], WORK_RANGE[1] + 1):
+    deviation_table(*_slack(_pred, WORK_SLACK, WORK_RANGE))
+for _pred in range(BREAK_RANGE[0], BREAK_RANGE[1] + 1):
+    deviation_table(*_slack(_pred, BREAK_SLACK, BREAK_RANGE))
+
+
+if __name__ == "__main__":
+    import time
+
+    # Kurzer Benchmark über das gesamte Eingaberaster der App
+    cases = [(t, w, b) for t in range(30, 241, 15) for w in range(15, 46, 5) for b in range(5, 16, 2)]
+    worst = 0
+    start = time.perf_counter()
+    for t, w, b in cases:
+        schedule = solve_schedule(t, w, b)
+        worst = max(worst, abs(sum(item['duration'] for item in schedule) - t))
+    elapsed = time.perf_counter() - start
+    print(f"{len(cases)} Solves, Ø {elapsed / len(cases) * 1000:.3f} ms, max. Abweichung {worst} min")
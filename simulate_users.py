@@ -0,0 +1,335 @@
+# simulate_users.py
+"""
+Simuliert viele synthetische User über mehrere Monate.
+
+Anders als generate_training_data.py, das jede Session unabhängig zieht,
+hat hier jeder User einen festen Lerntyp, eine Tageszeit-Präferenz und
+einen Ermüdungszustand. Sessions folgen aufeinander: days_since_last_session
+und previous_session_rating ergeben sich aus der eigenen Historie.
+
+Alle User werden pro simuliertem Tag gemeinsam als NumPy-Arrays
+fortgeschrieben, größere Populationen werden in Chunks auf mehrere
+Prozesse verteilt.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from cohort_analytics import CohortWriter
+from generate_training_data import CLUSTER_EFFECTS, RAW_BREAK_RANGE, RAW_WORK_RANGE, cluster_labels, scale_to_range
+from history_aggregates import HistoryAggregates, save_aggregates
+from history_store import REASON_BITS, append_history, list_users, load_history, to_typed_history
+from plan_model import TIME_OF_DAY_FACTORS, TIME_OF_DAY_OPTIONS, expected_concentration_score
+
+TIME_LABELS = np.array(TIME_OF_DAY_OPTIONS)
+TIME_FACTORS = TIME_OF_DAY_FACTORS
+DURATIONS = np.array([30, 60, 90, 120, 150, 180, 210, 240])
+
+# Obergrenze für automatisch gewählte Chunks (Speicher pro Worker)
+MAX_CHUNK_SIZE = 5000
+
+# Startstunde und Länge des Zeitfensters je Tageszeit
+TIME_WINDOWS = np.array([[7, 5], [12, 6], [18, 4], [22, 2]])
+
+# Pro Cluster: Lernwahrscheinlichkeit pro Tag und Verteilung der Session-Dauer
+CLUSTER_LEARN_PROB = {'sprinter': 0.7, 'marathoner': 0.15, 'planner': 0.45}
+CLUSTER_DURATION_P = {
+    'sprinter': [0.3, 0.3, 0.2, 0.1, 0.05, 0.05, 0.0, 0.0],
+    'marathoner': [0.0, 0.0, 0.05, 0.1, 0.2, 0.25, 0.2, 0.2],
+    'planner': [0.05, 0.15, 0.25, 0.25, 0.15, 0.1, 0.05, 0.0],
+}
+
+# Chronotypen: Dirichlet-Parameter für die Tageszeit-Präferenz
+CHRONOTYPES = np.array([
+    [6.0, 3.0, 1.5, 0.3],   # Lerche
+    [2.0, 4.0, 3.0, 0.8],   # Normal
+    [0.8, 2.5, 4.0, 2.5],   # Eule
+])
+
+# Spalten der simulierten Sessions (wie learning_sessions_data.csv plus user_id/timestamp/Feedback)
+SESSION_COLUMNS = [
+    'user_id', 'timestamp', 'total_session_duration', 'time_of_day', 'time_of_day_encoded',
+    'concentration_baseline', 'days_since_last_session', 'previous_session_rating', 'cluster',
+    'optimal_work_blocks', 'work_block_duration', 'break_duration', 'concentration_score',
+    'next_session_recommendation_hours', 'actual_rating', 'feedback'
+]
+
+# (3, 2): Bereich (von, bis) pro Cluster-Index
+CLUSTER_WORK_RANGE = np.array([CLUSTER_EFFECTS[c][0] for c in cluster_labels])
+CLUSTER_BREAK_RANGE = np.array([CLUSTER_EFFECTS[c][1] for c in cluster_labels])
+
+
+def _sample_categorical(rng, probs: np.ndarray) -> np.ndarray:
+    """Zieht pro Zeile eine Kategorie aus einer (n, k)-Wahrscheinlichkeitsmatrix."""
+    cum = probs.cumsum(axis=1)
+    u = rng.random(len(probs)) * cum[:, -1]
+    return (u[:, None] > cum).sum(axis=1)
+
+
+def compute_labels(rng, total_duration, time_of_day, concentration, days_since, previous_rating, cluster):
+    """
+    Vektorisierte Version der Label-Formeln aus generate_training_data.py.
+    Alle Argumente sind gleich lange Arrays, cluster als Index in cluster_labels.
+    """
+    time_factor = TIME_FACTORS[time_of_day]
+
+    work_block_base = np.where(concentration > 7, 30, np.where(concentration > 5, 25, 20))
+    work_block_duration = scale_to_range(
+        work_block_base * time_factor, RAW_WORK_RANGE, CLUSTER_WORK_RANGE[cluster].T
+    )
+    break_duration = scale_to_range(
+        5 + (10 - concentration) * 1.5, RAW_BREAK_RANGE, CLUSTER_BREAK_RANGE[cluster].T
+    )
+    optimal_blocks = np.maximum(1, total_duration // (work_block_duration + break_duration))
+
+    concentration_score = expected_concentration_score(
+        total_duration, time_of_day, concentration, days_since, previous_rating
+    )
+
+    low = np.where(concentration_score > 7, 4, np.where(concentration_score > 5, 6, 12))
+    high = np.where(concentration_score > 7, 8, np.where(concentration_score > 5, 12, 24))
+    next_session_hours = low + rng.random(len(low)) * (high - low)
+
+    concentration_score = np.clip(concentration_score + rng.normal(0, 0.5, len(low)), 1, 10)
+
+    return {
+        'optimal_work_blocks': optimal_blocks,
+        'work_block_duration': work_block_duration,
+        'break_duration': break_duration,
+        'concentration_score': concentration_score,
+        'next_session_recommendation_hours': next_session_hours
+    }
+
+
+def _feedback_masks(rng, rating, time_of_day, chronotype, fatigue, work_block_duration, break_duration):
+    """Leitet pro Session plausible Feedback-Gründe ab (ein bool-Array pro Grund)."""
+    bad = rating < 6.5
+    n = len(rating)
+    return [
+        bad & (work_block_duration >= 35),
+        bad & (break_duration <= 6),
+        bad & (time_of_day == 3),
+        bad & (time_of_day == 0) & (chronotype == 2),
+        fatigue > 1.5,
+        bad & (rng.random(n) < 0.3),
+        bad & (rng.random(n) < 0.2),
+        bad & (rng.random(n) < 0.05),
+    ]
+
+
+def _simulate_chunk(args) -> pd.DataFrame:
+    """Simuliert einen Chunk von Usern über n_days Tage (läuft im Worker-Prozess)."""
+    first_user_id, n_users, n_days, start, seed = args
+    rng = np.random.default_rng(seed)
+    user_ids = np.arange(first_user_id, first_user_id + n_users)
+
+    # Feste Eigenschaften pro User
+    cluster = rng.choice(len(cluster_labels), size=n_users, p=[0.35, 0.2, 0.45])
+    chronotype = rng.choice(3, size=n_users, p=[0.3, 0.45, 0.25])
+    time_pref = np.vstack([rng.dirichlet(CHRONOTYPES[c]) for c in chronotype])
+    duration_p = np.array([CLUSTER_DURATION_P[c] for c in cluster_labels])[cluster]
+    learn_prob = np.array([CLUSTER_LEARN_PROB[c] for c in cluster_labels])[cluster]
+    base_concentration = rng.uniform(4, 9, n_users)
+
+    # Zustand, der von Session zu Session weitergegeben wird
+    last_day = -rng.integers(1, 8, n_users)
+    last_rating = rng.uniform(4, 8, n_users)
+    fatigue = np.zeros(n_users)
+
+    chunks = []
+    for day in range(n_days):
+        date = start + timedelta(days=day)
+        weekend = date.weekday() >= 5
+        gap = day - last_day
+
+        p = np.minimum(0.95, learn_prob * (0.7 if weekend else 1.0) + 0.04 * np.maximum(0, gap - 2))
+        learns = rng.random(n_users) < p
+        fatigue *= 0.6
+        if not learns.any():
+            continue
+
+        idx = np.flatnonzero(learns)
+        n = len(idx)
+        tod = _sample_categorical(rng, time_pref[idx])
+        total_duration = DURATIONS[_sample_categorical(rng, duration_p[idx])]
+        days_since = np.minimum(gap[idx], 30)
+        previous_rating = last_rating[idx]
+
+        # Zirkadianer Bonus, wenn die Tageszeit zur Präferenz passt, abzüglich Ermüdung
+        circadian = 1.5 * (time_pref[idx, tod] - 0.25)
+        concentration = np.clip(
+            base_concentration[idx] + circadian - 0.8 * fatigue[idx] + rng.normal(0, 0.7, n), 1, 10
+        )
+
+        labels = compute_labels(rng, total_duration, tod, concentration, days_since, previous_rating, cluster[idx])
+        rating = np.round(labels['concentration_score'] * 2) / 2
+
+        start_hour = TIME_WINDOWS[tod, 0] + rng.random(n) * TIME_WINDOWS[tod, 1]
+        timestamps = pd.Timestamp(date) + pd.to_timedelta(start_hour * 60, unit='min').round('min')
+
+        reasons = _feedback_masks(
+            rng, rating, tod, chronotype[idx], fatigue[idx],
+            labels['work_block_duration'], labels['break_duration']
+        )
+        # Feedback-Gründe direkt als Bitmaske (siehe history_store.py)
+        feedback = np.zeros(n, dtype=np.uint8)
+        for bit, mask in zip(REASON_BITS, reasons):
+            feedback[mask] |= bit
+
+        chunks.append(pd.DataFrame({
+            'user_id': user_ids[idx],
+            'timestamp': timestamps,
+            'total_session_duration': total_duration,
+            'time_of_day': TIME_LABELS[tod],
+            'time_of_day_encoded': tod,
+            'concentration_baseline': np.round(concentration, 2),
+            'days_since_last_session': days_since,
+            'previous_session_rating': np.round(previous_rating, 2),
+            'cluster': np.array(cluster_labels)[cluster[idx]],
+            'optimal_work_blocks': labels['optimal_work_blocks'],
+            'work_block_duration': labels['work_block_duration'],
+            'break_duration': labels['break_duration'],
+            'concentration_score': np.round(labels['concentration_score'], 2),
+            'next_session_recommendation_hours': np.round(labels['next_session_recommendation_hours'], 2),
+            'actual_rating': rating,
+            'feedback': feedback
+        }))
+
+        # Zustand fortschreiben: Rating wird zum previous_rating der nächsten Session
+        last_day[idx] = day
+        last_rating[idx] = rating
+        fatigue[idx] += total_duration / 120
+
+    if not chunks:
+        return pd.DataFrame(columns=SESSION_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def simulate_population(n_users=1000, n_days=90, n_workers=1, seed=42, chunk_size=None, start=None) -> pd.DataFrame:
+    """
+    Simuliert n_users User über n_days Tage.
+
+    Ohne chunk_size wird gleichmäßig auf die n_workers verteilt (höchstens
+    MAX_CHUNK_SIZE User pro Chunk). Jeder Chunk bekommt einen eigenen, aus
+    seed abgeleiteten RNG-Stream; bei festem chunk_size ist das Ergebnis
+    daher unabhängig von n_workers reproduzierbar.
+    """
+    if n_users <= 0 or n_days <= 0:
+        return pd.DataFrame(columns=SESSION_COLUMNS)
+    if chunk_size is None:
+        chunk_size = min(MAX_CHUNK_SIZE, -(-n_users // max(1, n_workers)))
+    start = start or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=n_days)
+    seeds = np.random.SeedSequence(seed).spawn((n_users + chunk_size - 1) // chunk_size)
+    jobs = [
+        (first, min(chunk_size, n_users - first), n_days, start, chunk_seed)
+        for first, chunk_seed in zip(range(0, n_users, chunk_size), seeds)
+    ]
+
+    if n_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            frames = list(pool.map(_simulate_chunk, jobs))
+    else:
+        frames = [_simulate_chunk(job) for job in jobs]
+
+    sessions = pd.concat(frames, ignore_index=True)
+    return sessions.sort_values(['user_id', 'timestamp'], ignore_index=True)
+
+
+def to_training_frame(sessions: pd.DataFrame) -> pd.DataFrame:
+    """Spalten wie learning_sessions_data.csv (plus user_id/timestamp)."""
+    return sessions.drop(columns=['actual_rating', 'feedback'])
+
+
+def to_history_frame(sessions: pd.DataFrame) -> pd.DataFrame:
+    """Kompaktes History-Schema aus history_store.py (plus user_id)."""
+    return to_typed_history(sessions.rename(columns={
+        'total_session_duration': 'total_duration',
+        'days_since_last_session': 'days_since_last',
+        'previous_session_rating': 'previous_rating'
+    })[[
+        'user_id', 'timestamp', 'total_duration', 'time_of_day', 'concentration_baseline',
+        'days_since_last', 'previous_rating', 'actual_rating', 'feedback'
+    ]])
+
+
+def feedback_stream(history: pd.DataFrame, batch_size=1000):
+    """Liefert die History zeitlich sortiert in Batches, z.B. für Lasttests."""
+    ordered = history.sort_values('timestamp', kind='stable')
+    for start in range(0, len(ordered), batch_size):
+        yield ordered.iloc[start:start + batch_size]
+
+
+def replay_feedback(history: pd.DataFrame, target_dir, batch_size=1000) -> dict:
+    """
+    Lasttest für den Feedback-Pfad der App: jede Session läuft wie ein
+    abgeschicktes Feedback durch append_history, die Kennzahlen
+    (save_aggregates) und den CohortWriter, zeitlich sortiert über
+    feedback_stream. Gibt Durchsatz und Latenzen pro Feedback zurück.
+    """
+    history_dir = os.path.join(target_dir, 'history')
+    writer = CohortWriter(os.path.join(target_dir, 'cohort'), flush_interval=0)
+    aggregates = {}
+    latencies = []
+    started = time.perf_counter()
+    for batch in feedback_stream(history, batch_size):
+        for i in range(len(batch)):
+            # Simulierte IDs sind Zahlen, in der App sind es Strings (Dateinamen)
+            user_id = str(batch['user_id'].iat[i])
+            row = batch.iloc[i:i + 1].assign(user_id=user_id)
+            t0 = time.perf_counter()
+            append_history(user_id, row.drop(columns='user_id'), history_dir)
+            user_aggregates = aggregates.setdefault(user_id, HistoryAggregates())
+            user_aggregates.update(
+                row['timestamp'].iat[0], row['total_duration'].iat[0], row['time_of_day'].iat[0],
+                row['actual_rating'].iat[0], row['feedback'].iat[0]
+            )
+            save_aggregates(user_id, user_aggregates, history_dir)
+            writer.append(row)
+            latencies.append(time.perf_counter() - t0)
+    writer.flush()
+    seconds = time.perf_counter() - started
+
+    stored = sum(len(load_history(user_id, history_dir)) for user_id in list_users(history_dir))
+    if stored != len(history):
+        raise RuntimeError(f"{stored} von {len(history)} Sessions in der Historie angekommen")
+    latencies = np.array(latencies) * 1000
+    return {
+        'feedbacks': len(history),
+        'seconds': seconds,
+        'per_second': len(history) / seconds if seconds else float('nan'),
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else float('nan'),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetische User-Verläufe simulieren")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--training-out', default='simulated_sessions_data.csv')
+    parser.add_argument('--history-out', default='simulated_history.csv')
+    parser.add_argument('--replay', metavar='DIR',
+                        help="Feedback-Pfad der App (Historie, Kennzahlen, Kohorten) in DIR unter Last durchspielen")
+    args = parser.parse_args()
+
+    print(f"🔄 Simuliere {args.users} User über {args.days} Tage...")
+    sessions = simulate_population(args.users, args.days, n_workers=args.workers, seed=args.seed)
+
+    to_training_frame(sessions).to_csv(args.training_out, index=False)
+    to_history_frame(sessions).to_csv(args.history_out, index=False)
+    print(f"✅ {len(sessions)} Sessions von {sessions['user_id'].nunique()} Usern gespeichert!")
+    print(f"   Trainingsdaten: {args.training_out}")
+    print(f"   Feedback-Historie: {args.history_out}")
+
+    if args.replay:
+        print(f"🔄 Spiele das Feedback in '{args.replay}' ein...")
+        result = replay_feedback(to_history_frame(sessions), args.replay)
+        print(f"✅ {result['feedbacks']} Feedbacks in {result['seconds']:.1f} s "
+              f"({result['per_second']:.0f}/s, p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms)")
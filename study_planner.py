@@ -0,0 +1,212 @@
+# study_planner.py
+"""
+Mehrwöchige Lernplanung auf Basis der Vorhersage-Modelle.
+
+Statt nur "Nächste Session in X h" anzuzeigen, werden die Modelle Session
+für Session fortgeschrieben: Die next_session-Vorhersage (gestreckt nach
+dem Spaced-Repetition-Prinzip) bestimmt den frühesten nächsten Termin, der
+dann in das nächste passende Verfügbarkeitsfenster gelegt wird.
+
+Für Batch-Jobs laufen alle User über eine gemeinsame Priority-Queue, und
+Vorhersagen werden pro diskretisiertem Zustand memoisiert. Mit
+explain=True bekommt jede Session den stärksten Einflussfaktor auf die
+Blocklänge, berechnet in einem Batch über alle Sessions.
+"""
+import heapq
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from plan_model import GROUP_MATRIX, build_feature_vector, main_factors
+from schedule_solver import solve_schedule
+
+# Verfügbarkeit pro Wochentag (0 = Montag) als Liste von (Startstunde, Endstunde)
+DEFAULT_AVAILABILITY = {weekday: [(8, 22)] for weekday in range(7)}
+
+SPACING_GROWTH = 1.15   # Intervall wächst pro Wiederholung um 15 %
+MAX_SPACING = 3.0       # ... aber höchstens auf das Dreifache
+MIN_GAP_HOURS = 2.0
+
+
+@dataclass
+class UserProfile:
+    user_id: object
+    concentration: float
+    cluster: object = None
+    preferred_times: tuple = ('morning', 'afternoon')
+    session_duration: int = 90
+    availability: dict = field(default_factory=lambda: DEFAULT_AVAILABILITY)
+    days_since: int = 1
+    previous_rating: float = 7.0
+
+
+def time_of_day_for_hour(hour: float) -> str:
+    """Ordnet eine Uhrzeit den Tageszeiten aus der App zu."""
+    if 6 <= hour < 12:
+        return 'morning'
+    if 12 <= hour < 18:
+        return 'afternoon'
+    if 18 <= hour < 22:
+        return 'evening'
+    return 'night'
+
+
+def round_up_to_grid(moment: datetime, minutes=15) -> datetime:
+    """Rundet auf das nächste Kalender-Raster auf (Standard: Viertelstunde)."""
+    if moment.second or moment.microsecond:
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    return moment + timedelta(minutes=-moment.minute % minutes)
+
+
+def next_slot(earliest: datetime, duration: int, availability: dict, preferred_times, horizon_days=14):
+    """
+    Sucht den ersten Termin ab earliest, an dem duration Minuten in ein
+    Verfügbarkeitsfenster passen. Am selben Tag werden bevorzugte
+    Tageszeiten vorgezogen.
+    """
+    hours_needed = duration / 60
+    earliest = round_up_to_grid(earliest)
+    for day_offset in range(horizon_days + 1):
+        day = (earliest + timedelta(days=day_offset)).replace(hour=0, minute=0, second=0, microsecond=0)
+        candidates = []
+        for start_hour, end_hour in availability.get(day.weekday(), []):
+            start = max(day + timedelta(hours=start_hour), earliest)
+            # Zur Bevorzugung auch spätere Startpunkte im Fenster prüfen (Tageszeit-Grenzen)
+            for boundary in (start_hour, 6, 12, 18, 22):
+                candidate = max(start, day + timedelta(hours=boundary))
+                if candidate + timedelta(hours=hours_needed) <= day + timedelta(hours=end_hour):
+                    candidates.append(candidate)
+        if candidates:
+            candidates.sort()
+            preferred = [c for c in candidates if time_of_day_for_hour(c.hour + c.minute / 60) in preferred_times]
+            return (preferred or candidates)[0]
+    return None
+
+
+class StudyPlanner:
+    """Schreibt die Modelle über mehrere Sessions fort (mit Memoisierung pro Zustand)."""
+
+    def __init__(self, predictor, cache_size=100_000):
+        self.predictor = predictor
+        self._predict = lru_cache(maxsize=cache_size)(self._predict_state)
+
+    def _predict_state(self, duration, time_of_day, concentration, days_since, previous_rating, cluster):
+        features = build_feature_vector(duration, time_of_day, concentration, days_since, previous_rating)
+        predictions = self.predictor.predict(features, cluster)
+        pred_work = int(np.clip(round(predictions['work_duration']), 15, 45))
+        pred_break = int(np.clip(round(predictions['break_duration']), 5, 15))
+        schedule = solve_schedule(duration, pred_work, pred_break)
+        blocks = sum(1 for item in schedule if item['type'] == 'Lernen')
+        actual = sum(item['duration'] for item in schedule)
+        # Erwartetes Rating dieser Session = previous_rating der nächsten (ohne Rating-Modell konstant)
+        if self.predictor.has_rating:
+            rating = float(np.clip(self.predictor.predict_rating_batch(features[None, :])[0], 1, 10))
+        else:
+            rating = previous_rating
+        return pred_work, pred_break, blocks, actual, float(predictions['next_session']), rating
+
+    @staticmethod
+    def state(user: UserProfile, time_of_day, days_since, previous_rating) -> tuple:
+        """Auf das Eingaberaster der App gerundeter Zustand (Cache-Schlüssel)."""
+        return (
+            user.session_duration,
+            time_of_day,
+            round(user.concentration * 2) / 2,
+            min(int(days_since), 30),
+            round(previous_rating * 2) / 2,
+            user.cluster
+        )
+
+    def predict(self, user: UserProfile, time_of_day, days_since, previous_rating):
+        """Vorhersage für einen auf das Eingaberaster der App gerundeten Zustand."""
+        return self._predict(*self.state(user, time_of_day, days_since, previous_rating))
+
+    def explain(self, states) -> tuple:
+        """Stärkster Faktor auf die Blocklänge je Zustand (Name, Beitrag in min)."""
+        features = np.array([build_feature_vector(*state[:5]) for state in states]).reshape(len(states), len(GROUP_MATRIX))
+        return main_factors(self.predictor, features, [state[5] for state in states], 'work_duration')
+
+    def plan(self, users, start: datetime = None, days=30, explain=False) -> pd.DataFrame:
+        """
+        Plant für alle users die Sessions der nächsten days Tage.
+
+        Die Priority-Queue enthält pro User den frühesten nächsten Termin;
+        es wird immer der global früheste abgearbeitet. Das erwartete Rating
+        einer Session geht als previous_rating in die nächste ein.
+        explain=True ergänzt die Spalten main_factor und main_factor_effect.
+        """
+        start = start or datetime.now()
+        end = start + timedelta(days=days)
+        queue = [(start, i, 0, None, users[i].previous_rating) for i in range(len(users))]
+        heapq.heapify(queue)
+        rows = []
+        states = []
+
+        while queue:
+            earliest, i, n_sessions, last_start, previous_rating = heapq.heappop(queue)
+            user = users[i]
+            slot = next_slot(earliest, user.session_duration, user.availability, user.preferred_times)
+            if slot is None or slot >= end:
+                continue
+
+            time_of_day = time_of_day_for_hour(slot.hour + slot.minute / 60)
+            days_since = user.days_since if last_start is None else (slot - last_start).days
+            state = self.state(user, time_of_day, days_since, previous_rating)
+            pred_work, pred_break, blocks, actual, next_hours, rating = self._predict(*state)
+            states.append(state)
+            rows.append({
+                'user_id': user.user_id,
+                'start': slot,
+                'end': slot + timedelta(minutes=actual),
+                'time_of_day': time_of_day,
+                'duration': actual,
+                'blocks': blocks,
+                'work_duration': pred_work,
+                'break_duration': pred_break
+            })
+
+            # Spaced Repetition: Abstand wächst mit jeder Wiederholung
+            gap_hours = max(MIN_GAP_HOURS, next_hours) * min(MAX_SPACING, SPACING_GROWTH ** n_sessions)
+            heapq.heappush(queue, (slot + timedelta(minutes=actual, hours=gap_hours), i, n_sessions + 1, slot, rating))
+
+        columns = ['user_id', 'start', 'end', 'time_of_day', 'duration', 'blocks', 'work_duration', 'break_duration']
+        calendar = pd.DataFrame(rows, columns=columns)
+        if explain:
+            calendar['main_factor'], calendar['main_factor_effect'] = self.explain(states)
+        return calendar.sort_values(['user_id', 'start'], ignore_index=True)
+
+
+if __name__ == "__main__":
+    import pickle
+    import time
+
+    from plan_model import PlanPredictor
+
+    with open('learning_models.pkl', 'rb') as f:
+        planner = StudyPlanner(PlanPredictor(pickle.load(f)))
+
+    rng = np.random.default_rng(0)
+    users = [
+        UserProfile(
+            user_id=i,
+            concentration=rng.uniform(4, 9),
+            cluster=rng.choice(['sprinter', 'marathoner', 'planner']),
+            preferred_times=(rng.choice(['morning', 'afternoon', 'evening']),),
+            session_duration=int(rng.choice([60, 90, 120, 180]))
+        )
+        for i in range(2000)
+    ]
+    t0 = time.perf_counter()
+    calendar = planner.plan(users, days=30)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(calendar)} Sessions für {len(users)} User in {elapsed:.2f} s geplant")
+    print(f"Cache: {planner._predict.cache_info()}")
+
+    t0 = time.perf_counter()
+    calendar = planner.plan(users, days=30, explain=True)
+    elapsed = time.perf_counter() - t0
+    print(f"Mit Erklärungen: {elapsed:.2f} s")
+    print(calendar['main_factor'].value_counts().to_string())
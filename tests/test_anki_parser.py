@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from anki_parser import extract_features_from_text, sample_statistics_text
+
+
+@pytest.mark.parametrize('locale', ['de', 'en'])
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_ground_truth(locale, seed):
+    text, expected = sample_statistics_text(np.random.default_rng(seed), locale, filler_lines=20)
+    assert extract_features_from_text(text) == pytest.approx(expected)
+
+
+def test_german_number_formats():
+    text = "\n".join([
+        "Wiederholungen",
+        "Lerntage: 120 von 1.461 (8%)",
+        "Insgesamt: 12.345 Wiederholungen",
+        "Antwortknöpfe",
+        "Korrekt: 1.800/2.000 (90,0 %)",
+    ])
+    features = extract_features_from_text(text)
+    assert features['total_reviews'] == 12345
+    assert (features['days_active'], features['days_total']) == (120, 1461)
+    assert features['accuracy'] == pytest.approx(0.9)
+
+
+def test_review_section_has_priority():
+    # "Insgesamt" aus "Zukünftig fällig" darf die Wiederholungen nicht überschreiben
+    text = "\n".join([
+        "Zukünftig fällig",
+        "Insgesamt: 99.999 Wiederholungen",
+        "Wiederholungen",
+        "Insgesamt: 5.000 Wiederholungen",
+        "Lerntage: 50 von 100 (50%)",
+        "Antwortknöpfe",
+        "Korrekt: 80/100 (80,0 %)",
+    ])
+    assert extract_features_from_text(text)['total_reviews'] == 5000
+
+
+def test_average_fallback_estimates_period():
+    text = "\n".join([
+        "Reviews",
+        "Total: 3,000 reviews",
+        "Average for days studied: 30.0 reviews/day",
+        "Answer Buttons",
+        "Correct: 75/100 (75.0%)",
+    ])
+    features = extract_features_from_text(text)
+    assert (features['days_active'], features['days_total']) == (100, 100)
+    assert features['learning_days_ratio'] == 1.0
+
+
+def test_percent_fallback_without_answer_counts():
+    text = "Insgesamt: 1.000 Wiederholungen\nLerntage: 10 von 20\nQuote 12,5 % und 87,5 %"
+    assert extract_features_from_text(text)['accuracy'] == pytest.approx(0.875)
+
+
+def test_missing_total_raises():
+    with pytest.raises(ValueError):
+        extract_features_from_text("Lerntage: 10 von 20\nKorrekt: 8/10 (80,0 %)")
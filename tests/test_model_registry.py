@@ -0,0 +1,103 @@
+import os
+import pickle
+import threading
+
+import pytest
+
+import model_registry
+from model_registry import (
+    ARTIFACT_NAME, ModelRegistry, activate_version, publish_version, read_manifest, read_metadata, rollback,
+    set_candidate
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def models():
+    with open(os.path.join(ROOT, ARTIFACT_NAME), 'rb') as f:
+        return pickle.load(f)
+
+
+@pytest.fixture
+def registry_dir(tmp_path):
+    (tmp_path / 'data.csv').write_text('x\n1\n')
+    return str(tmp_path / 'models')
+
+
+def publish(models, registry_dir, **kwargs):
+    return publish_version(models, {}, os.path.join(os.path.dirname(registry_dir), 'data.csv'), registry_dir, **kwargs)
+
+
+def bump_manifest(registry_dir, _counter=iter(range(1, 1 << 30))):
+    """Eindeutige mtime, damit der Reload auch bei grober mtime-Auflösung greift."""
+    os.utime(os.path.join(registry_dir, model_registry.MANIFEST_NAME), ns=(0, next(_counter) * 10**9))
+
+
+def test_publish_and_activate(models, registry_dir):
+    assert publish(models, registry_dir) == 'v0001'
+    assert publish(models, registry_dir, activate=False) == 'v0002'
+    manifest = read_manifest(registry_dir)
+    assert manifest['versions'] == ['v0001', 'v0002']
+    assert (manifest['current'], manifest['previous']) == ('v0001', None)
+    assert read_metadata('v0002', registry_dir)['feature_columns'] == list(models['feature_columns'])
+
+    activate_version('v0002', registry_dir)
+    manifest = read_manifest(registry_dir)
+    assert (manifest['current'], manifest['previous']) == ('v0002', 'v0001')
+    assert rollback(registry_dir) == 'v0001'
+    assert read_manifest(registry_dir)['current'] == 'v0001'
+
+    with pytest.raises(ValueError):
+        activate_version('v0099', registry_dir)
+    with pytest.raises(ValueError):
+        set_candidate('v0002', 1.5, registry_dir)
+
+
+def test_concurrent_publish_gets_unique_versions(models, registry_dir):
+    versions = []
+    threads = [threading.Thread(target=lambda: versions.append(publish(models, registry_dir))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(versions) == [f"v{i:04d}" for i in range(1, 7)]
+    assert sorted(read_manifest(registry_dir)['versions']) == sorted(versions)
+
+
+def test_orphaned_version_directory_is_skipped(models, registry_dir):
+    os.makedirs(os.path.join(registry_dir, 'v0001'))
+    assert publish(models, registry_dir) == 'v0002'
+
+
+def test_hot_reload_and_candidate(models, registry_dir):
+    publish(models, registry_dir)
+    registry = ModelRegistry(registry_dir, check_interval=0)
+    first = registry.current()
+    assert first.version == 'v0001'
+
+    publish(models, registry_dir)
+    bump_manifest(registry_dir)
+    assert registry.current().version == 'v0002'
+
+    set_candidate('v0001', 0.25, registry_dir)
+    bump_manifest(registry_dir)
+    assert registry.candidate() is first
+    assert registry.candidate_fraction == 0.25
+
+    set_candidate(None, 0.0, registry_dir)
+    bump_manifest(registry_dir)
+    assert registry.candidate() is None
+    assert rollback(registry_dir) == 'v0001'
+    bump_manifest(registry_dir)
+    assert registry.current() is first
+
+
+def test_broken_version_keeps_serving(models, registry_dir):
+    publish(models, registry_dir)
+    registry = ModelRegistry(registry_dir, check_interval=0)
+    version = publish(models, registry_dir)
+    with open(os.path.join(registry_dir, version, ARTIFACT_NAME), 'wb') as f:
+        f.write(b'kaputt')
+    bump_manifest(registry_dir)
+    assert registry.current().version == 'v0001'
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from anki_parser import ParsingCancelled
+from pdf_jobs import CANCELLED, DONE, FAILED, RUNNING, PdfJobQueue
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timeout"
+        time.sleep(0.005)
+
+
+def paged_parser(pages=3, release=None):
+    """Parser-Attrappe: meldet Seiten, wartet optional auf release und prüft vor jeder Seite den Abbruch."""
+    def parser(file, on_page=None, cancel_event=None):
+        for page in range(1, pages + 1):
+            if release is not None:
+                release.wait(5.0)
+            if cancel_event.is_set():
+                raise ParsingCancelled()
+            on_page(page, pages)
+        return {'bytes': len(file.read())}
+    return parser
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(**kwargs):
+        queues.append(PdfJobQueue(**kwargs))
+        return queues[-1]
+    yield make
+    for queue in queues:
+        queue.shutdown()
+
+
+def test_done_lifecycle(make_queue):
+    queue = make_queue(parser=paged_parser())
+    job_id = queue.submit(b'%PDF-1.4', 'stats.pdf')
+    job = queue.get(job_id)
+    wait_for(lambda: job.finished)
+    assert job.status == DONE
+    assert job.result == {'bytes': 8}
+    assert job.progress == 1.0
+    assert job.finished_at is not None
+    assert queue.pending() == 0
+    assert not queue.cancel(job_id)
+
+
+def test_failed_job_keeps_error(make_queue):
+    def broken(file, on_page=None, cancel_event=None):
+        raise ValueError("kaputt")
+    queue = make_queue(parser=broken)
+    job = queue.get(queue.submit(b''))
+    wait_for(lambda: job.finished)
+    assert (job.status, job.error) == (FAILED, "kaputt")
+
+
+def test_cancel_running_job(make_queue):
+    release = threading.Event()
+    queue = make_queue(parser=paged_parser(release=release))
+    job = queue.get(queue.submit(b''))
+    wait_for(lambda: job.status == RUNNING)
+    assert queue.cancel(job.job_id)
+    release.set()
+    wait_for(lambda: job.finished)
+    assert job.status == CANCELLED
+    assert job.result is None
+
+
+def test_cancel_queued_job_finishes_immediately(make_queue):
+    release = threading.Event()
+    queue = make_queue(max_workers=1, parser=paged_parser(release=release))
+    running = queue.get(queue.submit(b''))
+    wait_for(lambda: running.status == RUNNING)
+    queued = queue.get(queue.submit(b''))
+    assert queue.cancel(queued.job_id)
+    assert queued.status == CANCELLED and queued.finished_at is not None
+    assert queue.pending() == 1
+    release.set()
+    wait_for(lambda: running.finished)
+    assert running.status == DONE
+
+
+def test_prune_keeps_unfinished_jobs(make_queue):
+    release = threading.Event()
+    queue = make_queue(max_workers=1, result_ttl=0, parser=paged_parser(release=release))
+    first = queue.submit(b'')
+    wait_for(lambda: queue.get(first).status == RUNNING)
+    second = queue.submit(b'')
+    # Beide noch offen: das Aufräumen beim Einreihen darf sie nicht entfernen
+    assert queue.get(first) is not None and queue.get(second) is not None
+    release.set()
+    wait_for(lambda: queue.pending() == 0)
+    time.sleep(0.01)
+    third = queue.submit(b'')
+    assert queue.get(first) is None and queue.get(second) is None
+    assert queue.get(third) is not None
+
+
+def test_finished_at_is_set_before_status():
+    # Wer einen Endzustand sieht, sieht auch finished_at (sonst scheitert _prune an None > cutoff)
+    queue = PdfJobQueue(max_workers=2, result_ttl=0, parser=paged_parser(pages=1))
+    try:
+        jobs = [queue.get(queue.submit(b'')) for _ in range(200)]
+        for job in jobs:
+            while not job.finished:
+                pass
+            assert job.finished_at is not None
+            queue._prune()
+    finally:
+        queue.shutdown()
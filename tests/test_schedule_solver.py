@@ -0,0 +1,50 @@
+import pytest
+
+from schedule_solver import BREAK_RANGE, WORK_RANGE, solve_schedule
+
+# Eingaberaster der App (Dauer-Slider, vorhergesagte Block-/Pausenlängen)
+APP_GRID = [(t, w, b) for t in range(30, 241, 15) for w in range(15, 46, 5) for b in range(5, 16, 2)]
+
+
+def total(schedule):
+    return sum(item['duration'] for item in schedule)
+
+
+@pytest.mark.parametrize('total_duration, pred_work, pred_break', APP_GRID)
+def test_app_grid_stays_in_bounds(total_duration, pred_work, pred_break):
+    schedule = solve_schedule(total_duration, pred_work, pred_break)
+    assert abs(total(schedule) - total_duration) <= 5
+    for item in schedule:
+        if item['type'] == 'Lernen':
+            assert WORK_RANGE[0] <= item['duration'] <= WORK_RANGE[1]
+        elif not item.get('long'):
+            assert BREAK_RANGE[0] <= item['duration'] <= BREAK_RANGE[1]
+
+
+def test_blocks_and_breaks_alternate():
+    schedule = solve_schedule(180, 25, 5)
+    assert [item['type'] for item in schedule] == ['Lernen', 'Pause'] * (len(schedule) // 2) + ['Lernen']
+    assert [item['block'] for item in schedule if item['type'] == 'Lernen'] == list(range(1, len(schedule) // 2 + 2))
+    # Nach jedem vierten Block eine lange Pause
+    assert all(bool(item.get('long')) == (item['block'] % 4 == 0) for item in schedule if item['type'] == 'Pause')
+
+
+def test_zero_tolerance_terminates():
+    # 10 min sind mit Blöcken ab 15 min nicht erreichbar: die Toleranz muss von 0 aus wachsen
+    schedule = solve_schedule(10, 25, 5, tolerance=0)
+    assert schedule == [{'type': 'Lernen', 'duration': WORK_RANGE[0], 'block': 1}]
+
+
+def test_exact_total_with_zero_tolerance():
+    assert total(solve_schedule(120, 25, 5, tolerance=0)) == 120
+
+
+def test_raises_beyond_max_tolerance():
+    with pytest.raises(ValueError):
+        solve_schedule(5, 25, 5, tolerance=1, max_tolerance=5)
+
+
+def test_predictions_outside_range_are_clipped():
+    schedule = solve_schedule(90, 90, 1)
+    assert all(WORK_RANGE[0] <= item['duration'] <= WORK_RANGE[1] for item in schedule if item['type'] == 'Lernen')
+    assert all(item['duration'] >= BREAK_RANGE[0] for item in schedule if item['type'] == 'Pause')
@@ -0,0 +1,372 @@
+# timer_log.py
+"""
+Event-Log für den Lernblock-Timer.
+
+Jeder Timer-Übergang (Start, Pause, Weiter, Skip, Reset, Beenden, nächster
+Block) wird als Record fester Länge festgehalten. record() hängt nur an
+einen Puffer im Speicher an; geschrieben wird gesammelt (write-behind),
+sobald batch_size Events anliegen, spätestens alle flush_interval Sekunden
+über einen Hintergrund-Thread und beim Beenden des Prozesses.
+
+Aus dem Log werden vektorisiert Kennzahlen pro Block und pro Session
+abgeleitet: tatsächliche Fokuszeit, Skip-Rate und Pausen-Overhead. Über
+export_training_data() landen sie auch als Trainingsdaten im Format von
+learning_sessions_data.csv.
+"""
+import argparse
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ab_testing import user_hash
+
+TIMER_LOG_PATH = os.path.join('logs', 'timer_log.bin')
+
+START = 0
+PAUSE = 1
+RESUME = 2
+SKIP = 3
+RESET = 4
+STOP = 5
+COMPLETE = 6
+
+EVENT_LABELS = ['Start', 'Pause', 'Weiter', 'Skip', 'Reset', 'Beenden', 'Nächster Block']
+
+BLOCK_TYPES = ['Lernen', 'Pause']
+
+# Zustand des Timers nach dem jeweiligen Event (Index = Event-Code)
+IDLE, RUNNING, PAUSED = 0, 1, 2
+EVENT_STATE = np.array([RUNNING, PAUSED, RUNNING, IDLE, IDLE, IDLE, IDLE], dtype=np.uint8)
+
+# Ausgang eines Blocks nach seinem letzten Event
+EVENT_OUTCOME = np.array(['open', 'open', 'open', 'skipped', 'open', 'stopped', 'completed'], dtype=object)
+
+# 32 Bytes pro Record; session = request_id des Plans (siehe ab_testing.py)
+TIMER_RECORD = np.dtype([
+    ('timestamp', 'f8'),
+    ('user', 'u8'),
+    ('session', 'u8'),
+    ('block', 'u2'),
+    ('block_type', 'u1'),
+    ('event', 'u1'),
+    ('planned', 'f4')  # geplante Blockdauer in Minuten
+])
+
+TRAINING_COLUMNS = [
+    'total_session_duration', 'time_of_day', 'time_of_day_encoded', 'concentration_baseline',
+    'days_since_last_session', 'previous_session_rating', 'cluster', 'optimal_work_blocks',
+    'work_block_duration', 'break_duration', 'concentration_score', 'next_session_recommendation_hours'
+]
+
+
+class TimerLog:
+    """Gepuffertes Append-only-Log, ein Objekt pro Server-Prozess."""
+
+    def __init__(self, log_path=TIMER_LOG_PATH, batch_size=64, flush_interval=5.0, max_indexed_users=1024):
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_indexed_users = max_indexed_users
+        self._buffer = []
+        self._lock = threading.Lock()
+        # Hält flush() während des Schreibens; record() wartet nie auf Datei-I/O
+        self._write_lock = threading.Lock()
+        self._flusher = None
+        # Lese-Index: bereits gelesene Bytes und die Events der zuletzt gefragten User (LRU)
+        self._read_lock = threading.Lock()
+        self._read_offset = 0
+        self._by_user = OrderedDict()
+        atexit.register(self.flush)
+
+    def record(self, user_id, session, block, block_type, event, planned_minutes, timestamp=None):
+        """Merkt sich einen Timer-Übergang; kostet nur ein list.append."""
+        row = (
+            time.time() if timestamp is None else timestamp, user_hash(user_id), int(session or 0),
+            int(block), BLOCK_TYPES.index(block_type), int(event), float(planned_minutes)
+        )
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+            if self._flusher is None and self.flush_interval:
+                self._flusher = threading.Thread(target=self._flush_loop, name='timer-log', daemon=True)
+                self._flusher.start()
+        if full:
+            # Schreibt gerade ein anderer Thread, nimmt der nächste Flush den Puffer mit
+            self.flush(wait=False)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self, wait=True) -> int:
+        """
+        Schreibt alle gepufferten Events in einem write(); gibt deren Anzahl zurück.
+        Unter _lock wird nur der Puffer getauscht, geschrieben wird außerhalb.
+        """
+        if not self._write_lock.acquire(blocking=wait):
+            return 0
+        try:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            records = np.array(rows, dtype=TIMER_RECORD)
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            with open(self.log_path, 'ab') as f:
+                f.write(records.tobytes())
+            return len(records)
+        finally:
+            self._write_lock.release()
+
+    def _snapshot(self) -> np.ndarray:
+        """Puffer-Kopie; nur mit _write_lock aufrufen, dann liegt jedes Event entweder im Puffer oder in der Datei."""
+        with self._lock:
+            return np.array(self._buffer, dtype=TIMER_RECORD)
+
+    def _index_new_records(self):
+        """Liest nur die seit dem letzten Aufruf angehängten Records und sortiert sie pro User ein."""
+        size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        size -= size % TIMER_RECORD.itemsize  # halb geschriebenen Record ignorieren
+        if size < self._read_offset:  # Log wurde gekürzt oder ersetzt
+            self._read_offset, self._by_user = 0, OrderedDict()
+        if size == self._read_offset:
+            return
+        new = np.fromfile(self.log_path, dtype=TIMER_RECORD, offset=self._read_offset,
+                          count=(size - self._read_offset) // TIMER_RECORD.itemsize)
+        self._read_offset = size
+        # Nur User im Index fortschreiben; alle anderen werden beim nächsten Zugriff komplett gelesen
+        new = new[np.isin(new['user'], np.fromiter(self._by_user, dtype=np.uint64, count=len(self._by_user)))]
+        order = np.argsort(new['user'], kind='stable')
+        users, starts = np.unique(new['user'][order], return_index=True)
+        for user, chunk in zip(users, np.split(new[order], starts[1:])):
+            self._by_user[int(user)] = np.concatenate([self._by_user[int(user)], chunk])
+
+    def _user_events(self, user: int) -> np.ndarray:
+        """Geschriebene Events eines Users bis _read_offset; LRU mit höchstens max_indexed_users Einträgen."""
+        if user in self._by_user:
+            self._by_user.move_to_end(user)
+            return self._by_user[user]
+        events = np.zeros(0, dtype=TIMER_RECORD)
+        if self._read_offset:
+            written = np.fromfile(self.log_path, dtype=TIMER_RECORD, count=self._read_offset // TIMER_RECORD.itemsize)
+            events = written[written['user'] == user]
+        self._by_user[user] = events
+        while len(self._by_user) > self.max_indexed_users:
+            self._by_user.popitem(last=False)
+        return events
+
+    def read(self, user_id=None) -> np.ndarray:
+        """Geschriebene plus noch gepufferte Events, optional nur für einen User."""
+        # Unter _write_lock läuft kein flush(): keine Doppelten und keine Lücken zwischen Puffer und Datei
+        if user_id is None:
+            with self._write_lock:
+                buffered = self._snapshot()
+                return np.concatenate([read_log(self.log_path), buffered])
+        user = user_hash(user_id)
+        with self._read_lock:
+            with self._write_lock:
+                buffered = self._snapshot()
+                self._index_new_records()
+            written = self._user_events(user)
+        return np.concatenate([written, buffered[buffered['user'] == user]])
+
+
+def read_log(log_path=TIMER_LOG_PATH) -> np.ndarray:
+    if not os.path.exists(log_path):
+        return np.zeros(0, dtype=TIMER_RECORD)
+    return np.fromfile(log_path, dtype=TIMER_RECORD)
+
+
+def _local_datetimes(seconds) -> pd.Series:
+    """Unix-Sekunden → lokale Zeit ohne Zeitzone (wie datetime.now() in der Historie)."""
+    local_tz = datetime.now().astimezone().tzinfo
+    return pd.Series(pd.to_datetime(seconds, unit='s', utc=True).tz_convert(local_tz).tz_localize(None))
+
+
+def block_metrics(events: np.ndarray) -> pd.DataFrame:
+    """
+    Eine Zeile pro (User, Session, Block).
+
+    Die Zeit zwischen zwei Events eines Blocks zählt für den Zustand nach
+    dem ersten davon (läuft / pausiert). active_min ist die gelaufene Zeit,
+    höchstens die geplante Dauer (der Countdown hört bei 0 auf); bei
+    Lernblöcken also die Fokuszeit, bei Pausen die tatsächliche Pause.
+    Nach dem letzten Event eines Blocks zählt nichts mehr.
+    """
+    if len(events) == 0:
+        return pd.DataFrame(columns=[
+            'user', 'session', 'block', 'block_type', 'start', 'end', 'planned_min',
+            'active_min', 'pause_min', 'pauses', 'outcome'
+        ])
+    events = events[np.lexsort((events['timestamp'], events['block'], events['session'], events['user']))]
+    n = len(events)
+
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = (
+        (events['user'][1:] != events['user'][:-1])
+        | (events['session'][1:] != events['session'][:-1])
+        | (events['block'][1:] != events['block'][:-1])
+    )
+    group = np.cumsum(new_group) - 1
+    first = np.flatnonzero(new_group)
+    last = np.append(first[1:] - 1, n - 1)
+
+    state = EVENT_STATE[events['event']]
+    dt = np.zeros(n)
+    dt[:-1] = np.diff(events['timestamp'])
+    dt[last] = 0.0
+    running = np.bincount(group, weights=dt * (state == RUNNING), minlength=len(first))
+    paused = np.bincount(group, weights=dt * (state == PAUSED), minlength=len(first))
+    pauses = np.bincount(group, weights=events['event'] == PAUSE, minlength=len(first))
+    planned = events['planned'][first].astype(np.float64) * 60
+
+    return pd.DataFrame({
+        'user': events['user'][first],
+        'session': events['session'][first],
+        'block': events['block'][first],
+        'block_type': np.asarray(BLOCK_TYPES, dtype=object)[events['block_type'][first]],
+        'start': _local_datetimes(events['timestamp'][first]),
+        'end': _local_datetimes(events['timestamp'][last]),
+        'planned_min': planned / 60,
+        'active_min': np.minimum(running, planned) / 60,
+        'pause_min': paused / 60,
+        'pauses': pauses.astype(int),
+        'outcome': EVENT_OUTCOME[events['event'][last]]
+    })
+
+
+def session_metrics(blocks: pd.DataFrame) -> pd.DataFrame:
+    """
+    Eine Zeile pro Session: geplante vs. tatsächliche Fokuszeit, Skip-Rate
+    und Pausen-Overhead (pausierte Minuten in Lernblöcken) pro Block.
+    """
+    learn = blocks['block_type'] == 'Lernen'
+    completed = learn & (blocks['outcome'] == 'completed')
+    frame = pd.DataFrame({
+        'user': blocks['user'],
+        'session': blocks['session'],
+        'start': blocks['start'],
+        'end': blocks['end'],
+        'planned_min': blocks['planned_min'].where(learn, 0.0),
+        'focus_min': blocks['active_min'].where(learn, 0.0),
+        'completed_focus_min': blocks['active_min'].where(completed, 0.0),
+        'break_min': blocks['active_min'].where(~learn, 0.0),
+        'pause_min': blocks['pause_min'].where(learn, 0.0),
+        'blocks': learn,
+        'completed': completed,
+        'skipped': learn & (blocks['outcome'] == 'skipped'),
+        'breaks': ~learn & (blocks['active_min'] > 0)
+    })
+    sessions = frame.groupby(['user', 'session'], sort=False).agg(
+        start=('start', 'min'), end=('end', 'max'),
+        **{column: (column, 'sum') for column in [
+            'planned_min', 'focus_min', 'completed_focus_min', 'break_min', 'pause_min',
+            'blocks', 'completed', 'skipped', 'breaks'
+        ]}
+    ).reset_index()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sessions['focus_ratio'] = sessions['focus_min'] / sessions['planned_min']
+        sessions['skip_rate'] = sessions['skipped'] / sessions['blocks']
+        sessions['pause_per_block'] = sessions['pause_min'] / sessions['blocks']
+    return sessions.sort_values('start', ignore_index=True)
+
+
+def focus_summary(sessions: pd.DataFrame) -> dict:
+    """Kennzahlen über alle Sessions (gewichtet nach Blöcken bzw. Minuten)."""
+    blocks = sessions['blocks'].sum()
+    planned = sessions['planned_min'].sum()
+    return {
+        'sessions': len(sessions),
+        'focus_min': float(sessions['focus_min'].sum()),
+        'planned_min': float(planned),
+        'focus_ratio': float(sessions['focus_min'].sum() / planned) if planned else np.nan,
+        'skip_rate': float(sessions['skipped'].sum() / blocks) if blocks else np.nan,
+        'pause_per_block': float(sessions['pause_min'].sum() / blocks) if blocks else np.nan
+    }
+
+
+def training_rows(history: pd.DataFrame, sessions: pd.DataFrame, cluster='planner',
+                  tolerance=pd.Timedelta(hours=12)) -> pd.DataFrame:
+    """
+    Historie + Timer-Sessions eines Users → Zeilen wie learning_sessions_data.csv.
+
+    Jedes Feedback wird mit der letzten Timer-Session davor verknüpft
+    (merge_asof). Die Labels kommen aus dem tatsächlichen Verhalten:
+    abgeschlossene Lernblöcke, Ø Fokuszeit pro abgeschlossenem Block,
+    Ø tatsächliche Pause, Rating und Stunden bis zur nächsten Session.
+    """
+    if len(history) == 0 or len(sessions) == 0:
+        return pd.DataFrame(columns=TRAINING_COLUMNS)
+    history = history.sort_values('timestamp', ignore_index=True)
+    history['next_hours'] = (history['timestamp'].shift(-1) - history['timestamp']).dt.total_seconds() / 3600
+    merged = pd.merge_asof(
+        history, sessions.sort_values('end'), left_on='timestamp', right_on='end',
+        direction='backward', tolerance=tolerance
+    )
+    merged = merged[(merged['completed'] > 0) & (merged['breaks'] > 0) & merged['next_hours'].notna()]
+
+    return pd.DataFrame({
+        'total_session_duration': merged['total_duration'].astype(int),
+        'time_of_day': merged['time_of_day'].astype(str),
+        'time_of_day_encoded': merged['time_of_day'].cat.codes.astype(int),
+        'concentration_baseline': merged['concentration_baseline'].astype(float).round(2),
+        'days_since_last_session': merged['days_since_last'].astype(int),
+        'previous_session_rating': merged['previous_rating'].astype(float).round(2),
+        'cluster': cluster,
+        'optimal_work_blocks': merged['completed'].astype(int),
+        'work_block_duration': (merged['completed_focus_min'] / merged['completed']).round().astype(int),
+        'break_duration': (merged['break_min'] / merged['breaks']).round().astype(int),
+        'concentration_score': merged['actual_rating'].astype(float).round(2),
+        'next_session_recommendation_hours': merged['next_hours'].round(2)
+    }, columns=TRAINING_COLUMNS).reset_index(drop=True)
+
+
+def export_training_data(out_path, log_path=TIMER_LOG_PATH, history_dir=None) -> pd.DataFrame:
+    """Trainingszeilen für alle User mit gespeicherter Historie (CSV nach out_path)."""
+    from clusters import assign_cluster_from_history
+    from history_store import HISTORY_DIR, list_users, load_history
+
+    history_dir = history_dir or HISTORY_DIR
+    events = read_log(log_path)
+    frames = []
+    for user_id in list_users(history_dir):
+        user_events = events[events['user'] == user_hash(user_id)]
+        if len(user_events) == 0:
+            continue
+        history = load_history(user_id, history_dir)
+        cluster = assign_cluster_from_history(history)
+        frames.append(training_rows(
+            history, session_metrics(block_metrics(user_events)),
+            cluster.value if cluster is not None else 'planner'
+        ))
+    rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=TRAINING_COLUMNS)
+    rows.to_csv(out_path, index=False)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auswertung des Timer-Event-Logs.")
+    parser.add_argument('--export', metavar='CSV', help="Trainingsdaten aus Timer-Log + Historie schreiben")
+    args = parser.parse_args()
+
+    events = read_log()
+    if len(events) == 0:
+        print("Noch keine Einträge im Timer-Log.")
+    else:
+        sessions = session_metrics(block_metrics(events))
+        summary = focus_summary(sessions)
+        print(f"⏱️ {len(events)} Events, {summary['sessions']} Sessions")
+        print(f"   Fokuszeit: {summary['focus_min']:.0f} von {summary['planned_min']:.0f} min geplant "
+              f"({summary['focus_ratio']:.0%})")
+        print(f"   Skip-Rate: {summary['skip_rate']:.0%}   Ø Pause je Lernblock: {summary['pause_per_block']:.1f} min")
+
+    if args.export:
+        rows = export_training_data(args.export)
+        print(f"✅ {len(rows)} Trainingszeilen gespeichert in '{args.export}'")
@@ -1,144 +1,402 @@
+import argparse
+import pickle
+
 import pandas as pd
 import numpy as np
+import sklearn
 from sklearn.linear_model import Ridge
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
-import pickle
 
-# Daten laden
-print("📂 Lade Trainingsdaten...")
-df = pd.read_csv('learning_sessions_data.csv')
-print(f"✅ {len(df)} Trainingsbeispiele geladen\n")
-
-# FEATURE ENGINEERING
-# One-Hot Encoding für time_of_day
-df_encoded = pd.get_dummies(df, columns=['time_of_day'], prefix='time')
-
-# Features auswählen (X)
-feature_columns = [
-    'total_session_duration',
-    'time_morning', 'time_afternoon', 'time_evening', 'time_night',
-    'concentration_baseline',
-    'days_since_last_session',
-    'previous_session_rating'
-]
-
-X = df_encoded[feature_columns]
-
-# Targets auswählen (y)
-y_work_blocks = df['optimal_work_blocks']
-y_work_duration = df['work_block_duration']
-y_break_duration = df['break_duration']
-y_next_session = df['next_session_recommendation_hours']
-
-# Train-Test Split (80% Training, 20% Test)
-X_train, X_test, y_wb_train, y_wb_test = train_test_split(
-    X, y_work_blocks, test_size=0.2, random_state=42
-)
-_, _, y_wd_train, y_wd_test = train_test_split(
-    X, y_work_duration, test_size=0.2, random_state=42
-)
-_, _, y_bd_train, y_bd_test = train_test_split(
-    X, y_break_duration, test_size=0.2, random_state=42
-)
-_, _, y_ns_train, y_ns_test = train_test_split(
-    X, y_next_session, test_size=0.2, random_state=42
-)
-
-# Feature Scaling (wichtig für Ridge Regression!)
-print("🔧 Skaliere Features...")
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-# MODELLE TRAINIEREN
-print("\n🤖 Trainiere Ridge Regression Modelle...\n")
-
-# Modell 1: Optimale Anzahl Arbeitsblöcke
-print("1️⃣ Modell für Arbeitsblöcke...")
-model_work_blocks = Ridge(alpha=1.0)  # alpha = Regularisierungsstärke
-model_work_blocks.fit(X_train_scaled, y_wb_train)
-y_wb_pred = model_work_blocks.predict(X_test_scaled)
-print(f"   R² Score: {r2_score(y_wb_test, y_wb_pred):.3f}")
-print(f"   RMSE: {np.sqrt(mean_squared_error(y_wb_test, y_wb_pred)):.3f}")
-
-# Modell 2: Arbeitsblock-Dauer
-print("\n2️⃣ Modell für Arbeitsblock-Dauer...")
-model_work_duration = Ridge(alpha=1.0)
-model_work_duration.fit(X_train_scaled, y_wd_train)
-y_wd_pred = model_work_duration.predict(X_test_scaled)
-print(f"   R² Score: {r2_score(y_wd_test, y_wd_pred):.3f}")
-print(f"   RMSE: {np.sqrt(mean_squared_error(y_wd_test, y_wd_pred)):.3f}")
-
-# Modell 3: Pausen-Dauer
-print("\n3️⃣ Modell für Pausen-Dauer...")
-model_break_duration = Ridge(alpha=1.0)
-model_break_duration.fit(X_train_scaled, y_bd_train)
-y_bd_pred = model_break_duration.predict(X_test_scaled)
-print(f"   R² Score: {r2_score(y_bd_test, y_bd_pred):.3f}")
-print(f"   RMSE: {np.sqrt(mean_squared_error(y_bd_test, y_bd_pred)):.3f}")
-
-# Modell 4: Nächste Session Empfehlung
-print("\n4️⃣ Modell für nächste Session...")
-model_next_session = Ridge(alpha=1.0)
-model_next_session.fit(X_train_scaled, y_ns_train)
-y_ns_pred = model_next_session.predict(X_test_scaled)
-print(f"   R² Score: {r2_score(y_ns_test, y_ns_pred):.3f}")
-print(f"   RMSE: {np.sqrt(mean_squared_error(y_ns_test, y_ns_pred)):.3f}")
-
-# MODELLE SPEICHERN
-print("\n💾 Speichere Modelle und Scaler...")
-
-models = {
-    'scaler': scaler,
-    'work_blocks': model_work_blocks,
-    'work_duration': model_work_duration,
-    'break_duration': model_break_duration,
-    'next_session': model_next_session,
-    'feature_columns': feature_columns
+from generate_training_data import CLUSTER_EFFECTS, generate_learning_sessions, scale_to_range
+from model_registry import file_hash, publish_version
+from pipeline import CACHE_DIR, Pipeline, Stage
+from plan_model import FEATURE_COLUMNS
+from tree_model import DEFAULT_TREE_PARAMS, EXPORT_DEPS, BoostedTrees, fit_boosted_trees
+
+DATA_PATH = 'learning_sessions_data.csv'
+ARTIFACT_PATH = 'learning_models.pkl'
+
+# Features auswählen (X), Reihenfolge wie plan_model.build_feature_vector
+feature_columns = list(FEATURE_COLUMNS)
+rating_feature_columns = feature_columns + ['long_session', 'same_day_session']
+
+# Targets (y): Name im Artefakt → Spalte in den Trainingsdaten
+TARGET_COLUMNS = {
+    'work_blocks': 'optimal_work_blocks',
+    'work_duration': 'work_block_duration',
+    'break_duration': 'break_duration',
+    'next_session': 'next_session_recommendation_hours'
+}
+
+DEFAULT_PARAMS = {
+    'generate': {'n_samples': 500, 'seed': 42},
+    'split': {'test_size': 0.2, 'random_state': 42},
+    'alpha': {target: 1.0 for target in [*TARGET_COLUMNS, 'rating', 'clusters']},
+    'trees': DEFAULT_TREE_PARAMS
 }
 
-with open('learning_models.pkl', 'wb') as f:
-    pickle.dump(models, f)
-
-print("✅ Alle Modelle gespeichert in 'learning_models.pkl'")
-
-# BEISPIEL-VORHERSAGE
-print("\n" + "="*60)
-print("📊 BEISPIEL-VORHERSAGE")
-print("="*60)
-
-# Beispiel: 120 Minuten Session, morgens, hohe Konzentration
-example = pd.DataFrame([{
-    'total_session_duration': 120,
-    'time_morning': 1,
-    'time_afternoon': 0,
-    'time_evening': 0,
-    'time_night': 0,
-    'concentration_baseline': 8.0,
-    'days_since_last_session': 1,
-    'previous_session_rating': 7.5
-}])
-
-example_scaled = scaler.transform(example)
-
-pred_blocks = model_work_blocks.predict(example_scaled)[0]
-pred_work = model_work_duration.predict(example_scaled)[0]
-pred_break = model_break_duration.predict(example_scaled)[0]
-pred_next = model_next_session.predict(example_scaled)[0]
-
-print(f"\n📥 INPUT:")
-print(f"   Geplante Session: 120 Minuten")
-print(f"   Tageszeit: Morgen")
-print(f"   Konzentration: 8.0/10")
-print(f"   Tage seit letzter Session: 1")
-
-print(f"\n📤 VORHERSAGE:")
-print(f"   Empfohlene Anzahl Lernblöcke: {int(round(pred_blocks))}")
-print(f"   Länge pro Lernblock: {int(round(pred_work))} Minuten")
-print(f"   Länge pro Pause: {int(round(pred_break))} Minuten")
-print(f"   Nächste Session in: {pred_next:.1f} Stunden")
-
-print("\n" + "="*60)
-print("✅ Training abgeschlossen!")
\ No newline at end of file
+# Geht in jeden Cache-Schlüssel ein: Modul-Konstanten, die die Stages lesen, und Bibliotheksversionen
+PIPELINE_CONTEXT = {
+    'feature_columns': feature_columns,
+    'rating_feature_columns': rating_feature_columns,
+    'target_columns': TARGET_COLUMNS,
+    'cluster_effects': CLUSTER_EFFECTS,
+    'numpy': np.__version__,
+    'pandas': pd.__version__,
+    'sklearn': sklearn.__version__
+}
+
+
+def posterior_covariance(X_scaled, y, model, alpha=1.0):
+    """
+    Bayes-Ridge-Näherung der Koeffizienten-Unsicherheit.
+
+    Gibt die Kovarianz von [Intercept, Koeffizienten] und die Rauschvarianz
+    zurück. Die Vorhersage-Varianz für x ist dann
+    noise_var + [1, x] @ cov @ [1, x] (ein kleines Matrix-Vektor-Produkt).
+    """
+    A = np.hstack([np.ones((len(X_scaled), 1)), X_scaled])
+    residuals = np.asarray(y) - model.predict(X_scaled)
+    noise_var = residuals @ residuals / max(1, len(A) - A.shape[1])
+    penalty = alpha * np.eye(A.shape[1])
+    penalty[0, 0] = 0.0  # Intercept wird bei Ridge nicht bestraft
+    cov = noise_var * np.linalg.inv(A.T @ A + penalty)
+    return cov, noise_var
+
+
+def evaluate(y_true, y_pred) -> dict:
+    return {
+        'r2': float(r2_score(y_true, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred)))
+    }
+
+
+# PIPELINE-STAGES
+# Jede Funktion bekommt nur ihre Eingänge und Parameter, damit der Cache
+# in pipeline.py sie anhand von Code, Parametern und Eingängen wiedererkennt.
+
+def generate_data(n_samples, seed):
+    """Synthetische Trainingsdaten (wie generate_training_data.py)."""
+    np.random.seed(seed)
+    return generate_learning_sessions(n_samples=n_samples)
+
+
+def load_data(data_path, data_hash):
+    """CSV laden; data_hash sorgt dafür, dass geänderte Daten neu geladen werden."""
+    df = pd.read_csv(data_path)
+    print(f"   {len(df)} Trainingsbeispiele geladen")
+    return df
+
+
+def encode_features(df):
+    """One-Hot Encoding für time_of_day plus Zusatz-Features fürs Rating-Modell."""
+    df_encoded = pd.get_dummies(df, columns=['time_of_day'], prefix='time')
+    X = df_encoded[feature_columns]
+    # Zwei Zusatz-Features bilden die Sprünge der Daten ab (>150 min, gleicher Tag)
+    X_rating = X.assign(
+        long_session=(df['total_session_duration'] > 150).astype(int),
+        same_day_session=(df['days_since_last_session'] == 0).astype(int)
+    )
+    return {
+        'X': X,
+        'X_rating': X_rating,
+        'y': df[list(TARGET_COLUMNS.values())].rename(columns={v: k for k, v in TARGET_COLUMNS.items()}),
+        'rating': df['concentration_score'],
+        'cluster': df['cluster']
+    }
+
+
+def split_rows(encoded, test_size, random_state):
+    """Train-Test Split als Zeilen-Indizes (für alle Targets derselbe)."""
+    train_idx, test_idx = train_test_split(
+        np.arange(len(encoded['X'])), test_size=test_size, random_state=random_state
+    )
+    return {'train': train_idx, 'test': test_idx}
+
+
+def fit_scaler(encoded, split):
+    """Feature Scaling (wichtig für Ridge Regression!)"""
+    scaler = StandardScaler()
+    scaler.fit(encoded['X'].iloc[split['train']])
+    return scaler
+
+
+def fit_target(encoded, split, scaler, target, alpha):
+    """Ridge-Modell für ein Target plus Posterior-Kovarianz für die Intervalle."""
+    X_train_scaled = scaler.transform(encoded['X'].iloc[split['train']])
+    X_test_scaled = scaler.transform(encoded['X'].iloc[split['test']])
+    y_train = encoded['y'][target].iloc[split['train']]
+    y_test = encoded['y'][target].iloc[split['test']]
+
+    model = Ridge(alpha=alpha)  # alpha = Regularisierungsstärke
+    model.fit(X_train_scaled, y_train)
+    metrics = evaluate(y_test, model.predict(X_test_scaled))
+    print(f"   R² Score: {metrics['r2']:.3f}")
+    print(f"   RMSE: {metrics['rmse']:.3f}")
+    cov, noise_var = posterior_covariance(X_train_scaled, y_train, model, alpha=alpha)
+    return {'model': model, 'metrics': metrics, 'cov': cov, 'noise_var': noise_var}
+
+
+def fit_rating(encoded, split, alpha):
+    """Erwartetes Rating (concentration_score) für die What-if-Optimierung."""
+    Xr_train = encoded['X_rating'].iloc[split['train']]
+    Xr_test = encoded['X_rating'].iloc[split['test']]
+    rating_scaler = StandardScaler()
+    Xr_train_scaled = rating_scaler.fit_transform(Xr_train)
+    Xr_test_scaled = rating_scaler.transform(Xr_test)
+    model_rating = Ridge(alpha=alpha)
+    model_rating.fit(Xr_train_scaled, encoded['rating'].iloc[split['train']])
+    metrics = evaluate(encoded['rating'].iloc[split['test']], model_rating.predict(Xr_test_scaled))
+    print(f"   R² Score: {metrics['r2']:.3f}")
+    print(f"   RMSE: {metrics['rmse']:.3f}")
+    return {'scaler': rating_scaler, 'model': model_rating, 'metrics': metrics}
+
+
+def fit_clusters(encoded, split, scaler, alpha):
+    """
+    Pro Lerntyp eigene Koeffizienten auf denselben skalierten Features,
+    gefittet auf den Train-Zeilen und pro Lerntyp auf dem Test-Split bewertet.
+    Alles wird in ein Array gepackt, damit die App zur Laufzeit nur per Index auswählt.
+    """
+    cluster_keys = sorted(encoded['cluster'].unique())
+    X_all_scaled = scaler.transform(encoded['X'])
+    in_train = np.zeros(len(X_all_scaled), dtype=bool)
+    in_train[split['train']] = True
+    n_targets, n_features = len(TARGET_COLUMNS), len(feature_columns)
+    cluster_coef = np.zeros((len(cluster_keys), n_targets, n_features))
+    cluster_intercept = np.zeros((len(cluster_keys), n_targets))
+    cluster_cov = np.zeros((len(cluster_keys), n_targets, n_features + 1, n_features + 1))
+    cluster_noise = np.zeros((len(cluster_keys), n_targets))
+    metrics = {}
+
+    for c, cluster_key in enumerate(cluster_keys):
+        in_cluster = (encoded['cluster'] == cluster_key).to_numpy()
+        train, test = in_cluster & in_train, in_cluster & ~in_train
+        for t, target in enumerate(TARGET_COLUMNS):
+            y_train = encoded['y'].loc[train, target]
+            cluster_model = Ridge(alpha=alpha)
+            cluster_model.fit(X_all_scaled[train], y_train)
+            cluster_coef[c, t] = cluster_model.coef_
+            cluster_intercept[c, t] = cluster_model.intercept_
+            cluster_cov[c, t], cluster_noise[c, t] = posterior_covariance(
+                X_all_scaled[train], y_train, cluster_model, alpha=alpha
+            )
+            if test.sum() > 1:
+                metrics[f'{target} ({cluster_key})'] = evaluate(
+                    encoded['y'].loc[test, target], cluster_model.predict(X_all_scaled[test])
+                )
+        r2 = ', '.join(
+            f"{target} {metrics[f'{target} ({cluster_key})']['r2']:.3f}"
+            for target in TARGET_COLUMNS if f'{target} ({cluster_key})' in metrics
+        )
+        print(f"   {cluster_key}: {train.sum()} Train-/{test.sum()} Test-Sessions" + (f", R² {r2}" if r2 else ""))
+
+    return {
+        'keys': cluster_keys,
+        'targets': list(TARGET_COLUMNS),
+        'coef': cluster_coef,
+        'intercept': cluster_intercept,
+        'cov': cluster_cov,
+        'noise_var': cluster_noise,
+        'metrics': metrics
+    }
+
+
+def fit_trees(encoded, split, **params):
+    """Optionales Gradient-Boosting (siehe tree_model.py) auf demselben Train-Split."""
+    X = encoded['X'].to_numpy(dtype=float)
+    Y = encoded['y'][list(TARGET_COLUMNS)].to_numpy(dtype=float)
+    clusters = encoded['cluster'].to_numpy()
+    train, test = split['train'], split['test']
+    arrays = fit_boosted_trees(
+        X[train], Y[train], clusters[train], sorted(encoded['cluster'].unique()), list(TARGET_COLUMNS), **params
+    )
+    trees = BoostedTrees(arrays)
+    # Test-Zeilen mit ihrem jeweiligen Lerntyp auswerten
+    predictions = np.zeros((len(test), len(TARGET_COLUMNS)))
+    for cluster_key in trees.cluster_keys:
+        rows = clusters[test] == cluster_key
+        predictions[rows] = trees.predict(X[test][rows], cluster_key)
+    metrics = {}
+    for t, target in enumerate(TARGET_COLUMNS):
+        metrics[f'{target} (trees)'] = evaluate(Y[test, t], predictions[:, t])
+        print(f"   {target}: R² {metrics[f'{target} (trees)']['r2']:.3f}")
+    return {'arrays': arrays, 'metrics': metrics}
+
+
+def assemble_artifact(scaler, work_blocks, work_duration, break_duration, next_session, rating, cluster_models,
+                      trees=None):
+    """Artefakt im bisherigen Format von learning_models.pkl plus Metriken für die Registry."""
+    cluster_models = dict(cluster_models)
+    cluster_metrics = cluster_models.pop('metrics', {})
+    fits = {
+        'work_blocks': work_blocks,
+        'work_duration': work_duration,
+        'break_duration': break_duration,
+        'next_session': next_session
+    }
+    models = {
+        'scaler': scaler,
+        **{target: fit['model'] for target, fit in fits.items()},
+        'feature_columns': feature_columns,
+        'cluster_models': cluster_models,
+        'uncertainty': {
+            'targets': list(fits),
+            'cov': np.stack([fit['cov'] for fit in fits.values()]),
+            'noise_var': np.array([fit['noise_var'] for fit in fits.values()])
+        },
+        'rating': {
+            'scaler': rating['scaler'],
+            'model': rating['model'],
+            'feature_columns': rating_feature_columns
+        }
+    }
+    metrics = {target: fit['metrics'] for target, fit in fits.items()}
+    metrics['rating'] = rating['metrics']
+    metrics.update(cluster_metrics)
+    if trees is not None:
+        # PlanPredictor nimmt dann die Bäume für die Werte, Ridge nur noch für die Intervalle
+        models['boosted_trees'] = trees['arrays']
+        metrics.update(trees['metrics'])
+    return {'models': models, 'metrics': metrics}
+
+
+def build_pipeline(data_path=DATA_PATH, params=DEFAULT_PARAMS, cache_dir=None, trees=False) -> Pipeline:
+    """Stages von den Rohdaten bis zum Artefakt (trees=True: mit Gradient-Boosting)."""
+    alpha = params['alpha']
+    tree_stages = [Stage('trees', fit_trees, inputs=('encode', 'split'), params=params['trees'],
+                         deps=(*EXPORT_DEPS, evaluate))] if trees else []
+    stages = [
+        Stage('data', load_data, params={'data_path': data_path, 'data_hash': file_hash(data_path)}),
+        Stage('encode', encode_features, inputs=('data',)),
+        Stage('split', split_rows, inputs=('encode',), params=params['split']),
+        Stage('scale', fit_scaler, inputs=('encode', 'split')),
+        *[
+            Stage(target, fit_target, inputs=('encode', 'split', 'scale'),
+                  params={'target': target, 'alpha': alpha[target]}, deps=(posterior_covariance, evaluate))
+            for target in TARGET_COLUMNS
+        ],
+        Stage('rating', fit_rating, inputs=('encode', 'split'), params={'alpha': alpha['rating']}, deps=(evaluate,)),
+        Stage('clusters', fit_clusters, inputs=('encode', 'split', 'scale'), params={'alpha': alpha['clusters']},
+              deps=(posterior_covariance, evaluate)),
+        *tree_stages,
+        Stage('artifact', assemble_artifact,
+              inputs=('scale', *TARGET_COLUMNS, 'rating', 'clusters', *[stage.name for stage in tree_stages]))
+    ]
+    return Pipeline(stages, cache_dir or CACHE_DIR, context=PIPELINE_CONTEXT)
+
+
+def refresh_training_data(data_path=DATA_PATH, n_samples=500, seed=42, cache_dir=None):
+    """Generiert die Trainingsdaten (gecacht) und schreibt die CSV nur bei Änderungen."""
+    stage = Stage('generate', generate_data, params={'n_samples': n_samples, 'seed': seed},
+                  deps=(generate_learning_sessions, scale_to_range))
+    pipeline = Pipeline([stage], cache_dir or CACHE_DIR, context=PIPELINE_CONTEXT)
+    csv_text = pipeline.run()['generate'].to_csv(index=False)
+    try:
+        with open(data_path, encoding='utf-8') as f:
+            unchanged = f.read() == csv_text
+    except FileNotFoundError:
+        unchanged = False
+    if not unchanged:
+        with open(data_path, 'w', encoding='utf-8') as f:
+            f.write(csv_text)
+        print(f"✅ Trainingsdaten neu geschrieben: {data_path}")
+
+
+def parse_alpha(values) -> dict:
+    """['work_duration=0.5', ...] → {'work_duration': 0.5, ...}"""
+    alpha = dict(DEFAULT_PARAMS['alpha'])
+    for value in values or []:
+        target, number = value.split('=')
+        if target not in alpha:
+            raise ValueError(f"Unbekanntes Modell für alpha: {target}")
+        alpha[target] = float(number)
+    return alpha
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trainiert die Lernplan-Modelle (mit Stage-Cache).")
+    parser.add_argument('--data', default=DATA_PATH, help="Trainingsdaten (CSV), z.B. aus timer_log.py --export")
+    parser.add_argument('--generate', action='store_true', help=f"Synthetische Daten vorher (gecacht) nach {DATA_PATH} generieren")
+    parser.add_argument('--alpha', nargs='*', metavar='MODELL=WERT', help="Regularisierung pro Modell")
+    parser.add_argument('--trees', action='store_true', help="Zusätzlich Gradient-Boosting trainieren (tree_model.py)")
+    parser.add_argument('--force', action='store_true', help="Alle Stages neu rechnen")
+    parser.add_argument('--no-publish', action='store_true', help="Keine neue Registry-Version anlegen")
+    args = parser.parse_args()
+
+    if args.generate:
+        # Immer in die synthetische CSV, damit --data mit exportierten Echtdaten nie überschrieben wird
+        print("🔄 Generiere synthetische Trainingsdaten...")
+        refresh_training_data(DATA_PATH, **DEFAULT_PARAMS['generate'])
+
+    print("📂 Pipeline: Daten → Encoding → Split → Scaling → Modelle → Artefakt\n")
+    pipeline = build_pipeline(args.data, {**DEFAULT_PARAMS, 'alpha': parse_alpha(args.alpha)}, trees=args.trees)
+    artifact = pipeline.run(force=list(pipeline.stages) if args.force else ())['artifact']
+    models, metrics = artifact['models'], artifact['metrics']
+
+    print("\n📊 Metriken (Test-Split):")
+    for target, values in metrics.items():
+        print(f"   {target:<28} R² = {values['r2']:.3f}   RMSE = {values['rmse']:.3f}")
+
+    # MODELLE SPEICHERN (nur wenn sich das Artefakt geändert hat, z.B. auch beim
+    # Zurückwechseln auf ein schon gecachtes alpha)
+    artifact_bytes = pickle.dumps(models)
+    try:
+        with open(ARTIFACT_PATH, 'rb') as f:
+            unchanged = f.read() == artifact_bytes
+    except FileNotFoundError:
+        unchanged = False
+
+    if not unchanged:
+        print("\n💾 Speichere Modelle und Scaler...")
+        with open(ARTIFACT_PATH, 'wb') as f:
+            f.write(artifact_bytes)
+        print(f"✅ Alle Modelle gespeichert in '{ARTIFACT_PATH}'")
+
+        # Neue Version in der Registry veröffentlichen (laufende App lädt sie automatisch)
+        if not args.no_publish:
+            version = publish_version(models, metrics, args.data)
+            print(f"✅ Als Version {version} in der Modell-Registry veröffentlicht")
+    else:
+        print(f"\n✅ Artefakt unverändert – '{ARTIFACT_PATH}' und Registry bleiben wie sie sind")
+
+    # BEISPIEL-VORHERSAGE
+    print("\n" + "="*60)
+    print("📊 BEISPIEL-VORHERSAGE")
+    print("="*60)
+
+    # Beispiel: 120 Minuten Session, morgens, hohe Konzentration
+    example = pd.DataFrame([{
+        'total_session_duration': 120,
+        'time_morning': 1,
+        'time_afternoon': 0,
+        'time_evening': 0,
+        'time_night': 0,
+        'concentration_baseline': 8.0,
+        'days_since_last_session': 1,
+        'previous_session_rating': 7.5
+    }])
+
+    example_scaled = models['scaler'].transform(example)
+
+    pred_blocks = models['work_blocks'].predict(example_scaled)[0]
+    pred_work = models['work_duration'].predict(example_scaled)[0]
+    pred_break = models['break_duration'].predict(example_scaled)[0]
+    pred_next = models['next_session'].predict(example_scaled)[0]
+
+    print(f"\n📥 INPUT:")
+    print(f"   Geplante Session: 120 Minuten")
+    print(f"   Tageszeit: Morgen")
+    print(f"   Konzentration: 8.0/10")
+    print(f"   Tage seit letzter Session: 1")
+
+    print(f"\n📤 VORHERSAGE:")
+    print(f"   Empfohlene Anzahl Lernblöcke: {int(round(pred_blocks))}")
+    print(f"   Länge pro Lernblock: {int(round(pred_work))} Minuten")
+    print(f"   Länge pro Pause: {int(round(pred_break))} Minuten")
+    print(f"   Nächste Session in: {pred_next:.1f} Stunden")
+
+    print("\n" + "="*60)
+    print("✅ Training abgeschlossen!")
@@ -0,0 +1,283 @@
+# tree_model.py
+"""
+Optionales Gradient-Boosting-Modell mit Auswertung ohne sklearn.
+
+Die Trainingsdaten haben klare Nicht-Linearitäten (Konzentrations-Schwellen
+bei 5 und 7, Clipping, Tageszeit-Faktoren), die Ridge nur annähert. Trainiert
+wird mit sklearn (GradientBoostingRegressor pro Target), danach werden alle
+Bäume als vollständige Binärbäume in flache NumPy-Arrays exportiert.
+BoostedTrees wertet sie für alle Zeilen und alle Bäume gleichzeitig aus:
+Jede der (wenigen) verschiedenen Bedingungen Feature > Schwelle wird pro
+Zeile einmal geprüft, danach wählen Bit-Operationen pro Ebene den
+erreichten Knoten aus; nur die Blattwerte werden per np.take geholt. Kein
+Python-Loop über Bäume oder Knoten, Zeilen laufen in cache-großen Blöcken.
+
+Der Lerntyp geht als One-Hot-Feature ein. Jede Trainingszeile kommt
+zusätzlich ohne Cluster vor, damit dasselbe Ensemble auch für unbekannte
+Lerntypen passt.
+"""
+import numpy as np
+
+DEFAULT_TREE_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 3,
+    'learning_rate': 0.05,
+    'random_state': 42
+}
+
+
+def cluster_one_hot(cluster_keys, clusters) -> np.ndarray:
+    """(n, Cluster)-Matrix; unbekannte/None-Cluster ergeben eine Nullzeile."""
+    clusters = np.asarray(clusters, dtype=object)
+    return np.stack([clusters == key for key in cluster_keys], axis=1).astype(float)
+
+
+def fit_estimators(X, Y, clusters, cluster_keys, n_estimators=200, max_depth=3,
+                   learning_rate=0.05, random_state=42) -> list:
+    """Ein sklearn-GradientBoostingRegressor pro Target-Spalte von Y."""
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    one_hot = cluster_one_hot(cluster_keys, clusters)
+    # Jede Zeile einmal mit und einmal ohne Lerntyp
+    X_train = np.vstack([np.hstack([X, one_hot]), np.hstack([X, np.zeros_like(one_hot)])])
+    Y_train = np.vstack([Y, Y])
+
+    estimators = []
+    for t in range(Y.shape[1]):
+        estimator = GradientBoostingRegressor(
+            n_estimators=n_estimators, max_depth=max_depth,
+            learning_rate=learning_rate, random_state=random_state
+        )
+        estimator.fit(X_train, Y_train[:, t])
+        estimators.append(estimator)
+    return estimators
+
+
+def fit_boosted_trees(X, Y, clusters, cluster_keys, targets, **params) -> dict:
+    """Trainiert die Ensembles und exportiert sie (Format von export_ensembles)."""
+    return export_ensembles(fit_estimators(X, Y, clusters, cluster_keys, **params), targets, cluster_keys)
+
+
+def _complete_tree(structure, depth):
+    """
+    Bringt einen sklearn-Baum in die Form eines vollständigen Binärbaums der
+    Tiefe depth (Kinder von i bei 2i+1 und 2i+2). Frühe Blätter werden mit
+    Schwelle +inf aufgefüllt (immer links) und ihr Wert auf alle Blätter
+    darunter kopiert.
+    """
+    n_internal = 2 ** depth - 1
+    feature = np.zeros(n_internal, dtype=np.int32)
+    threshold = np.full(n_internal, np.inf)
+    leaves = np.zeros(2 ** depth)
+
+    stack = [(0, 0, 0)]  # (sklearn-Knoten, Position im vollständigen Baum, Tiefe)
+    while stack:
+        node, position, level = stack.pop()
+        if structure.children_left[node] == -1:
+            # Alle Blätter unterhalb dieser Position bekommen den Blattwert
+            width = 2 ** (depth - level)
+            first = (position + 1) * width - 1 - n_internal
+            leaves[first:first + width] = structure.value[node, 0, 0]
+            continue
+        feature[position] = structure.feature[node]
+        threshold[position] = structure.threshold[node]
+        stack.append((structure.children_left[node], 2 * position + 1, level + 1))
+        stack.append((structure.children_right[node], 2 * position + 2, level + 1))
+    return feature, threshold, leaves
+
+
+def _round_down_float32(values: np.ndarray) -> np.ndarray:
+    """
+    Größter float32-Wert ≤ value. Für float32-Features gilt dann exakt
+    x > value ⇔ x > Ergebnis, die Auswertung kommt also ohne float64 aus.
+    """
+    rounded = values.astype(np.float32)
+    too_big = rounded.astype(np.float64) > values
+    rounded[too_big] = np.nextafter(rounded[too_big], np.float32(-np.inf))
+    return rounded
+
+
+def export_ensembles(estimators, targets, cluster_keys) -> dict:
+    """
+    Exportiert alle Bäume aller Targets als vollständige Binärbäume in
+    gemeinsame Arrays: (Bäume, Knoten) für Features/Schwellen und
+    (Bäume, Blätter) für die Blattwerte. Die Lernrate ist eingerechnet.
+    """
+    depth = max(e.max_depth for e in estimators)
+    n_trees = {len(e.estimators_) for e in estimators}
+    if len(n_trees) != 1:
+        raise ValueError("Alle Targets brauchen gleich viele Bäume.")
+
+    feature, threshold, leaves = [], [], []
+    for estimator in estimators:
+        for tree in estimator.estimators_[:, 0]:
+            tree_feature, tree_threshold, tree_leaves = _complete_tree(tree.tree_, depth)
+            feature.append(tree_feature)
+            threshold.append(tree_threshold)
+            leaves.append(tree_leaves * estimator.learning_rate)
+
+    return {
+        'targets': list(targets),
+        'cluster_keys': list(cluster_keys),
+        'depth': depth,
+        'n_trees': n_trees.pop(),
+        'feature': np.stack(feature),
+        'threshold': _round_down_float32(np.stack(threshold)),
+        'leaves': np.stack(leaves),
+        'init': np.array([float(np.ravel(e.init_.constant_)[0]) for e in estimators])
+    }
+
+
+class BoostedTrees:
+    """Vektorisierte Auswertung der exportierten Ensembles (ohne sklearn)."""
+
+    # Zellen (Baum × Zeile) pro Block: die Zwischenergebnisse bleiben im Cache
+    CHUNK_CELLS = 2 ** 16
+
+    def __init__(self, arrays: dict):
+        self.targets = arrays['targets']
+        self.cluster_keys = arrays['cluster_keys']
+        self.depth = int(arrays['depth'])
+        self.n_trees = int(arrays['n_trees'])
+        self.init = arrays['init']
+        n_total, n_internal = arrays['feature'].shape
+        # Viele Knoten teilen sich dieselbe Bedingung (Feature, Schwelle): jede wird
+        # pro Zeile nur einmal ausgewertet, Knoten verweisen per Index darauf
+        conditions, node_condition = np.unique(
+            np.stack([arrays['feature'].ravel(), arrays['threshold'].ravel()], axis=1).astype(np.float64),
+            axis=0, return_inverse=True
+        )
+        node_condition = node_condition.reshape(n_total, n_internal)
+        self.condition_feature = conditions[:, 0].astype(np.intp)
+        self.condition_threshold = conditions[:, 1].astype(np.float32)[:, None]
+        # Pro Ebene die Bedingungen aller Knoten, Position in der Ebene vor Baum
+        self.level_condition = [
+            node_condition[:, 2 ** d - 1:2 ** (d + 1) - 1].T.ravel().astype(np.intp)
+            for d in range(self.depth)
+        ]
+        self.leaves = arrays['leaves'].ravel()
+        self.leaf_offset = (np.arange(n_total) * 2 ** self.depth).astype(np.intp)[:, None]
+        self.chunk_rows = max(1, self.CHUNK_CELLS // n_total)
+
+    def augment(self, features: np.ndarray, cluster=None) -> np.ndarray:
+        """Hängt die Cluster-One-Hot-Spalten an eine (n, Features)-Matrix."""
+        one_hot = np.zeros((len(features), len(self.cluster_keys)))
+        key = getattr(cluster, 'value', cluster)  # ClusterKey oder String
+        if key in self.cluster_keys:
+            one_hot[:, self.cluster_keys.index(key)] = 1.0
+        return np.hstack([features, one_hot])
+
+    def predict(self, features: np.ndarray, cluster=None) -> np.ndarray:
+        """(n, Features) → (n, Targets)."""
+        # sklearn vergleicht in float32 (Schwellen beim Export passend abgerundet)
+        X = self.augment(np.asarray(features, dtype=float), cluster).astype(np.float32)
+        if len(X) <= self.chunk_rows:
+            return self._predict_chunk(X.T)
+        return np.vstack([
+            self._predict_chunk(X[start:start + self.chunk_rows].T) for start in range(0, len(X), self.chunk_rows)
+        ])
+
+    def _predict_chunk(self, X_t: np.ndarray) -> np.ndarray:
+        """(Features, n) → (n, Targets); alle Arrays liegen als (Bäume, Zeilen) vor."""
+        n = X_t.shape[1]
+        n_total = len(self.leaf_offset)
+        # Alle Bedingungen in einem Vergleich, danach nur noch Bits
+        satisfied = X_t[self.condition_feature] > self.condition_threshold
+        # bits[d]: an Ebene d rechts abgebogen. Die Bedingungen einer Ebene werden
+        # gesammelt geholt und per Bit-Auswahl auf den erreichten Knoten reduziert
+        bits = [satisfied[self.level_condition[0]]]
+        for level in range(1, self.depth):
+            reached = satisfied[self.level_condition[level]].reshape(2 ** level, n_total, n)
+            for bit in bits:
+                half = len(reached) // 2
+                low, high = reached[:half], reached[half:]
+                reached = low ^ (bit & (low ^ high))
+            bits.append(reached[0])
+
+        leaf = bits[0].view(np.uint8)
+        for bit in bits[1:]:
+            leaf = (leaf << 1) | bit.view(np.uint8)
+        index = leaf.astype(np.intp)
+        index += self.leaf_offset
+        leaf_values = np.take(self.leaves, index)
+        return leaf_values.reshape(len(self.targets), self.n_trees, n).sum(axis=1).T + self.init
+
+
+# Code, von dem die exportierten Arrays abhängen (Cache-Schlüssel der Pipeline-Stage)
+EXPORT_DEPS = (fit_boosted_trees, fit_estimators, export_ensembles, _complete_tree, _round_down_float32, BoostedTrees)
+
+
+if __name__ == "__main__":
+    import time
+
+    import pandas as pd
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    from plan_model import TARGETS, PlanPredictor
+    from train_model import (
+        DATA_PATH, DEFAULT_PARAMS, TARGET_COLUMNS, assemble_artifact, encode_features, fit_clusters,
+        fit_rating, fit_scaler, fit_target, split_rows
+    )
+    import contextlib
+    import io
+
+    # Gleicher Split wie train_model.py, Ausgaben der Stages unterdrücken
+    with contextlib.redirect_stdout(io.StringIO()):
+        encoded = encode_features(pd.read_csv(DATA_PATH))
+        split = split_rows(encoded, **DEFAULT_PARAMS['split'])
+        scaler = fit_scaler(encoded, split)
+        fits = [fit_target(encoded, split, scaler, target, 1.0) for target in TARGET_COLUMNS]
+        cluster_models = fit_clusters(encoded, split, scaler, 1.0)
+        artifact = assemble_artifact(scaler, *fits, fit_rating(encoded, split, 1.0), cluster_models)
+
+    train, test = split['train'], split['test']
+    X = encoded['X'].to_numpy(dtype=float)
+    Y = encoded['y'][TARGETS].to_numpy(dtype=float)
+    clusters = encoded['cluster'].to_numpy()
+
+    start = time.perf_counter()
+    estimators = fit_estimators(X[train], Y[train], clusters[train], cluster_models['keys'], **DEFAULT_TREE_PARAMS)
+    arrays = export_ensembles(estimators, TARGETS, cluster_models['keys'])
+    print(f"🌲 Training: {time.perf_counter() - start:.1f} s, {arrays['feature'].shape[0]} Bäume der Tiefe {arrays['depth']}")
+
+    ridge = PlanPredictor(artifact['models'])
+    trees = BoostedTrees(arrays)
+
+    print("\n📊 Genauigkeit auf dem Test-Split (R² / RMSE)")
+    print(f"   {'Target':<15} {'Ridge global':>16} {'Ridge Cluster':>16} {'Trees':>16}")
+    ridge_global = ridge.predict_batch(X[test])[0]
+    ridge_cluster = np.vstack([ridge.predict_batch(X[i:i + 1], clusters[i])[0] for i in test])
+    tree_pred = np.vstack([trees.predict(X[i:i + 1], clusters[i]) for i in test])
+    for t, target in enumerate(TARGETS):
+        cells = [
+            f"{r2_score(Y[test, t], p[:, t]):.3f} / {np.sqrt(mean_squared_error(Y[test, t], p[:, t])):.2f}"
+            for p in (ridge_global, ridge_cluster, tree_pred)
+        ]
+        print(f"   {target:<15} " + " ".join(f"{c:>16}" for c in cells))
+
+    def bench(fn, repeat):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1e6
+
+    def sklearn_predict(rows):
+        augmented = trees.augment(rows, 'planner')
+        return np.column_stack([estimator.predict(augmented) for estimator in estimators])
+
+    batch = np.tile(X[test], (5, 1))
+    print("\n⏱️ Latenz (µs)")
+    for name, predict in (
+        ('Ridge', lambda rows: ridge.predict_batch(rows, 'planner')),
+        ('Trees', lambda rows: trees.predict(rows, 'planner')),
+        ('sklearn', sklearn_predict)
+    ):
+        print(f"   {name:<8} 1 Zeile: {bench(lambda: predict(X[:1]), 1000):8.1f}   "
+              f"{len(batch)} Zeilen: {bench(lambda: predict(batch), 50):9.1f}")
+
+    # Gegenprobe: exportierte Arrays liefern dasselbe wie sklearn
+    deviation = np.abs(trees.predict(X, 'planner') - sklearn_predict(X)).max()
+    print(f"\n✅ Max. Abweichung zu sklearn: {deviation:.2e}")